@@ -21,6 +21,7 @@ from __future__ import print_function
 import json
 import pathlib
 import sys
+import threading
 import uuid
 from datetime import datetime
 from json import JSONDecodeError
@@ -28,12 +29,20 @@ from pprint import pprint
 from time import sleep
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from lex_bot_tester.util.color import Color
+from lex_bot_tester.util.timing import TIMINGS, Transport
 
 DOT_ALEXA_SKILLS = '.alexa_skills'
 HOME_DOT_ALEXA_SKILLS = str(pathlib.Path.home()) + '/' + DOT_ALEXA_SKILLS
 
+# the connections kept alive to the API, enough for a simulation and its polls per thread
+DEFAULT_POOL_SIZE = 10
+
+# the connect and read timeouts of every request, in seconds
+DEFAULT_TIMEOUT = (5, 30)
+
 
 class Request:
     class Method:
@@ -275,10 +284,38 @@ class SimulationResult(object):
 
 
 class AlexaSkillManagementClient:
+    """
+    Alexa Skill Management API client.
+
+    Requests are sent through a pooled HTTP session, so the connections to the API are kept alive and reused by the
+    simulation and all of its polls. By default the session is shared by all the clients of the process, and the
+    connections by their threads.
+    """
+
     ROOT = 'https://api.amazonalexa.com'
 
-    def __init__(self, skill_name, locale='en-US'):
+    __lock = threading.Lock()
+    __shared_session = None
+    __shared_pool_size = 0
+
+    def __init__(self, skill_name, locale='en-US', timings=None, session=None, pool_size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT):
+        """
+        Creates the client.
+
+        :param skill_name: the skill name
+        :param locale: the locale
+        :param timings: the :py:class:Timings where the request times are recorded, or None to use the default ones
+        :param session: the requests.Session, i.e. from :py:meth:create_session to have its own connections, or None
+            to use the one shared by all the clients
+        :param pool_size: the number of connections kept alive by the shared session, it's replaced by a bigger one
+            if needed
+        :param timeout: the timeout of every request, in seconds, or the (connect, read) timeouts
+        """
         self.__interaction_model_slots = None
+        self.timings = timings if timings is not None else TIMINGS
+        self.__session = session if session is not None else AlexaSkillManagementClient.get_shared_session(pool_size)
+        self.timeout = timeout
         self.__conversation_status = None
         if not skill_name:
             raise ValueError('skill_name must be provided')
@@ -306,6 +343,33 @@ to refresh it.""")
         else:
             self.__access_token = cli_config['profiles']['default']['token']['access_token']
 
+    @staticmethod
+    def create_session(pool_size=DEFAULT_POOL_SIZE):
+        """
+        Creates a session keeping alive up to :py:attr:pool_size connections to the API.
+
+        :param pool_size: the maximum number of connections kept alive
+        :return: the requests.Session
+        """
+        session = requests.Session()
+        session.mount(AlexaSkillManagementClient.ROOT, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        return session
+
+    @staticmethod
+    def get_shared_session(pool_size=DEFAULT_POOL_SIZE):
+        """
+        Gets the session shared by the clients, replacing it if its pool is smaller than :py:attr:pool_size. The
+        previous one is still valid for the clients holding it.
+
+        :param pool_size: the minimum number of connections kept alive
+        :return: the requests.Session
+        """
+        with AlexaSkillManagementClient.__lock:
+            if AlexaSkillManagementClient.__shared_pool_size < pool_size:
+                AlexaSkillManagementClient.__shared_session = AlexaSkillManagementClient.create_session(pool_size)
+                AlexaSkillManagementClient.__shared_pool_size = pool_size
+            return AlexaSkillManagementClient.__shared_session
+
     def get_interaction_model(self) -> InteractionModel:
         return InteractionModel(self)
 
@@ -323,12 +387,17 @@ to refresh it.""")
         return r
 
     def get_interaction_model_etag(self):
+        """
+        Gets the ETag of the interaction model, changing whenever the model changes.
+
+        :return: the ETag, or None if not returned
+        """
         # HEAD /v0/skills/{skillId}/interactionModel/locales/{locale}
         method = Request.Method.HEAD
         request = '/v0/skills/{skillId}/interactionModel/locales/{locale}'.format(skillId=self.__skill_id,
                                                                                   locale=self.__locale)
         r = self.__request(request, method=method, debug=False)
-        print(r)
+        return r.get('ETag')
 
     def invocation(self, body_str, slot_values, verbose=False, debug=False):
         """
@@ -546,6 +615,10 @@ to refresh it.""")
         return simulation_result
 
     def __request(self, request, body=None, method=Request.Method.GET, debug=False):
+        with self.timings.time('alexa_request', bot=self.__skill_name, transport=Transport.SIMULATION):
+            return self.__send(request, body, method, debug)
+
+    def __send(self, request, body, method, debug):
         headers = {'Authorization': self.__access_token,
                    'content-Type': 'application/json',
                    'accept': 'application/json',
@@ -554,13 +627,13 @@ to refresh it.""")
             print('DEBUG: __request: headers = {}'.format(headers))
             print('DEBUG: __request: {} {}'.format(method, self.ROOT + request))
         if method == Request.Method.GET:
-            r = requests.get(self.ROOT + request, headers=headers)
+            r = self.__session.get(self.ROOT + request, headers=headers, timeout=self.timeout)
             if r.status_code != 200:
                 print(r, file=sys.stderr)
                 print(json.loads(r.text)['message'], file=sys.stderr)
                 raise RuntimeError('{}: {}'.format(r, r.json()['message']))
         elif method == Request.Method.POST:
-            r = requests.post(self.ROOT + request, headers=headers, data=json.dumps(body))
+            r = self.__session.post(self.ROOT + request, headers=headers, data=json.dumps(body), timeout=self.timeout)
             if debug:
                 print('DEBUG: __request: body = {}'.format(body))
             if r.status_code != 200:
@@ -572,11 +645,11 @@ to refresh it.""")
                     print('ERROR', file=sys.stderr)
                 return None
         elif method == Request.Method.HEAD:
-            r = requests.head(self.ROOT + request, headers=headers)
+            r = self.__session.head(self.ROOT + request, headers=headers, timeout=self.timeout)
             if r.status_code != 200:
+                # the response to HEAD has no body with the message
                 print(r, file=sys.stderr)
-                print(json.loads(r.text)['message'], file=sys.stderr)
-                raise RuntimeError('{}: {}'.format(r, r.json()['message']))
+                raise RuntimeError('{}'.format(r))
             else:
                 return r.headers
         else:
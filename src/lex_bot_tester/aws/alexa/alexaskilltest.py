@@ -22,6 +22,9 @@ from time import sleep
 from unittest import TestCase
 
 from lex_bot_tester.aws.alexa.alexaskillmanagementclient import AlexaSkillManagementClient, SimulationResult
+from lex_bot_tester.aws.coverage import Coverage, CoverageItem, INTENT, SLOT, PROMPT
+from lex_bot_tester.aws.runhistory import RunHistory
+from lex_bot_tester.util.timing import Transport
 
 VERBOSE = False
 DEBUG = False
@@ -38,8 +41,9 @@ class AlexaSkillTest(TestCase):
     def tearDown(self):
         super(AlexaSkillTest, self).tearDown()
 
-    def conversation_text(self, skill_name, intent_name, conversation, verbose=VERBOSE, use_tts=False):
-        # type: (AlexaSkillTest, str, str, list, bool, bool) -> SimulationResult
+    def conversation_text(self, skill_name, intent_name, conversation, verbose=VERBOSE, use_tts=False, coverage=None,
+                          history=None):
+        # type: (AlexaSkillTest, str, str, list, bool, bool, Coverage, RunHistory) -> SimulationResult
         """
         Helper method for tests using text conversations.
 
@@ -48,6 +52,8 @@ class AlexaSkillTest(TestCase):
         :param skill_name: the bot name
         :param conversation: the conversation
         :param verbose: produce verbose output
+        :param coverage: the :py:class:Coverage where every step is recorded, with the test id, or None
+        :param history: the :py:class:RunHistory where the result is recorded and saved, with the test id, or None
 
         Iterates over the list of :py:attr:conversations and each py:class::ConversationItem, sends the corresponding
         text and analyzes the response.
@@ -59,15 +65,37 @@ class AlexaSkillTest(TestCase):
         * the dialog state is as defined in the item
         * the slots contain the specified values, as declared in the item
 
+        When :py:attr:history is set, the test is skipped if it passed the last time and the ETag of the interaction
+        model didn't change since then.
         """
         self.asmc = AlexaSkillManagementClient(skill_name)
+        if history is None:
+            return self.__conversation_text(skill_name, intent_name, conversation, verbose, coverage)
+        if skill_name not in history.fingerprints:
+            history.update_fingerprints({skill_name: self.asmc.get_interaction_model_etag()})
+        if not history.is_selected(self.id(), [skill_name]):
+            self.skipTest('interaction model of {} not changed since it passed'.format(skill_name))
+        passed = False
+        try:
+            simulation_result = self.__conversation_text(skill_name, intent_name, conversation, verbose, coverage)
+            passed = True
+            return simulation_result
+        finally:
+            history.record(self.id(), [skill_name], passed)
+            history.save()
+
+    def __conversation_text(self, skill_name, intent_name, conversation, verbose, coverage):
         self.asmc.conversation_start(intent_name, conversation, verbose)
         simulation_result = None
         fulfilled = False
         for c in conversation:
             if c['text']:
-                simulation_result = self.asmc.conversation_step(c, verbose, debug=False)
+                with self.asmc.timings.time('alexa_skill_test_turn', bot=skill_name, intent=intent_name,
+                                            transport=Transport.SIMULATION):
+                    simulation_result = self.asmc.conversation_step(c, verbose, debug=False)
                 fulfilled = fulfilled or (simulation_result.is_fulfilled() if simulation_result else False)
+                if coverage is not None and simulation_result:
+                    coverage.record(self.__get_step_items(intent_name, c, simulation_result), self.id())
                 sleep(1)
             elif c['prompt']:
                 print('WARNING: prompt but no text: {}'.format(c['prompt']))
@@ -85,6 +113,16 @@ class AlexaSkillTest(TestCase):
         self.assertTrue(fulfilled or not slots, 'Some slots have no values:\n{}\n'.format(msg))
         return simulation_result
 
+    @staticmethod
+    def __get_step_items(intent_name, step, simulation_result):
+        # the simulation result has no dialog state, the prompt answered is the one filled in the step
+        items = [CoverageItem(INTENT, intent_name, None)]
+        slots = simulation_result.get_slots() or {}
+        items.extend(CoverageItem(SLOT, intent_name, s) for s, v in slots.items() if v and v.get('value') is not None)
+        if step['slot'] and step['prompt']:
+            items.append(CoverageItem(PROMPT, intent_name, step['slot']))
+        return items
+
     def assertSimulationResultIsCorrect(self, simulation_result, verbose=False):
         self.assertIsNotNone(simulation_result)
         self.assertTrue(simulation_result.is_fulfilled())
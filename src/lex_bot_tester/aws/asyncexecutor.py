@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONCURRENCY = 32
+
+
+class AsyncExecutor:
+    """
+    Runs blocking calls, i.e. boto3 requests, from coroutines.
+
+    At most :py:attr:concurrency calls are in flight at the same time, coroutines waiting for a slot do not hold a
+    thread, so any number of them can wait on the same event loop. Cancelling a coroutine waiting for a slot, or whose
+    call hasn't started yet, drops the call; a call already running completes in its thread and its result is
+    discarded.
+
+    The same executor is meant to be shared by all the async clients of an event loop. It can be used from any number
+    of event loops, one after the other, i.e. by several asyncio.run calls, or at the same time, the threads being
+    shared by all of them.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY):
+        # type: (int) -> None
+        """
+        :param concurrency: the maximum number of calls running at the same time
+        """
+        self.concurrency = concurrency
+        self.__executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.__lock = threading.Lock()
+        # a semaphore is bound to the loop it's first used in, so there's one per loop
+        self.__semaphores = weakref.WeakKeyDictionary()
+
+    def __get_semaphore(self, loop):
+        with self.__lock:
+            semaphore = self.__semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self.__semaphores[loop] = asyncio.Semaphore(self.concurrency)
+            return semaphore
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Runs the function in a thread of the executor.
+
+        :param function: the blocking function
+        :param args: its arguments
+        :param kwargs: its keyword arguments
+        :return: what the function returns
+        """
+        loop = asyncio.get_running_loop()
+        async with self.__get_semaphore(loop):
+            return await loop.run_in_executor(self.__executor, functools.partial(function, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        self.__executor.shutdown(wait=wait)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import threading
+
+import boto3
+import botocore.session
+from botocore.config import Config
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+# services whose calls are retried by lex_bot_tester.aws.retry.RetryPolicy instead of botocore, which would resend
+# turns that may have already changed the Lex session state
+NO_BOTOCORE_RETRIES = frozenset(['lex-runtime', 'lex-models', 'polly'])
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of boto3 clients.
+
+    Clients are created once per (service, region, profile) and shared by every caller, all of them built from the
+    same botocore session per profile, so service models and endpoint data are loaded only once.
+    boto3 clients are thread-safe, the registry itself is protected by a lock.
+    """
+
+    __lock = threading.Lock()
+    __sessions = {}
+    __clients = {}
+
+    @staticmethod
+    def get_client(service_name, region_name=None, profile_name=None, concurrency=None):
+        """
+        Gets the shared client for the service.
+
+        :param service_name: the service name, i.e. 'lex-runtime'
+        :param region_name: the region, or None to use the configured one
+        :param profile_name: the profile, or None to use the default one
+        :param concurrency: the number of threads expected to use the client at the same time
+        :return: the client
+        """
+        max_pool_connections = max(DEFAULT_MAX_POOL_CONNECTIONS, concurrency or 0)
+        key = (service_name, region_name, profile_name)
+        with ClientRegistry.__lock:
+            entry = ClientRegistry.__clients.get(key)
+            # a client whose connection pool is too small for the requested concurrency is replaced, the
+            # previous one is still valid for those already holding it
+            if entry is None or entry[1] < max_pool_connections:
+                session = ClientRegistry.__get_session(profile_name)
+                config = Config(max_pool_connections=max_pool_connections)
+                if service_name in NO_BOTOCORE_RETRIES:
+                    config = config.merge(Config(retries={'max_attempts': 0}))
+                client = session.client(service_name, region_name=region_name, config=config)
+                entry = (client, max_pool_connections)
+                ClientRegistry.__clients[key] = entry
+            return entry[0]
+
+    @staticmethod
+    def __get_session(profile_name):
+        session = ClientRegistry.__sessions.get(profile_name)
+        if session is None:
+            session = boto3.session.Session(botocore_session=botocore.session.Session(profile=profile_name))
+            ClientRegistry.__sessions[profile_name] = session
+        return session
+
+    @staticmethod
+    def clear():
+        """
+        Removes all the clients and sessions from the registry.
+        """
+        with ClientRegistry.__lock:
+            ClientRegistry.__clients.clear()
+            ClientRegistry.__sessions.clear()
+
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import threading
+from collections import namedtuple, OrderedDict
+
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+
+INTENT = 'intent'
+SLOT = 'slot'
+PROMPT = 'prompt'
+TRANSITION = 'transition'
+
+KINDS = (INTENT, SLOT, PROMPT, TRANSITION)
+
+# the dialog state before the first turn of an intent
+START = 'Start'
+
+
+class CoverageItem(namedtuple('CoverageItem', ('kind', 'intent', 'detail'))):
+    """
+    Something a turn can exercise: an intent, a slot filled, the elicitation prompt of a slot or a dialog state
+    transition, as 'from -> to'.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        if self.kind == INTENT:
+            return self.intent
+        if self.kind == TRANSITION:
+            return '{}: {}'.format(self.intent, self.detail)
+        if self.kind == PROMPT:
+            return '{}.{} prompt'.format(self.intent, self.detail)
+        return '{}.{}'.format(self.intent, self.detail)
+
+
+def transition(intent_name, from_state, to_state):
+    return CoverageItem(TRANSITION, intent_name, '{} -> {}'.format(from_state, to_state))
+
+
+class Coverage(object):
+    """
+    The intents, slots, elicitation prompts and dialog state transitions of a bot, or skill, and the ones exercised by
+    the turns run so far.
+
+    The model is created from the intent definitions and filled in as the turns are recorded, by any number of threads.
+    Anything exercised and not in the model, i.e. a transition to Failed, is kept as unexpected. The items exercised
+    by each conversation are kept too, to select the smallest set of conversations exercising all of them.
+    """
+
+    def __init__(self, name):
+        # type: (str) -> None
+        """
+        :param name: the bot or skill name
+        """
+        self.name = name
+        self.turns = 0
+        self.__lock = threading.Lock()
+        # the turns exercising each item of the model
+        self.__model = OrderedDict()
+        self.__unexpected = OrderedDict()
+        # the turns and items of each conversation, by key
+        self.__conversations = OrderedDict()
+
+    @staticmethod
+    def for_bot(lmc, bot_name, bot_alias):
+        # type: (LexModelsClient, str, str) -> Coverage
+        """
+        Creates the coverage of the intents of the bot, in the versions used by the alias.
+
+        :param lmc: the :py:class:LexModelsClient
+        :param bot_name: the bot name
+        :param bot_alias: the bot alias
+        """
+        return Coverage.from_intents(bot_name, lmc.get_intents_schemas(bot_name, bot_alias))
+
+    @staticmethod
+    def from_intents(name, intents):
+        # type: (str, list) -> Coverage
+        """
+        Creates the coverage of the intents, as get_intent returns them.
+
+        The transitions expected are the ones from the start of the intent to the elicitation of the required slots,
+        the confirmation if there's a confirmation prompt, and ReadyForFulfillment or Fulfilled, depending on the
+        fulfillment activity. Failed is expected after the confirmation if there's a rejection statement.
+
+        :param name: the bot name
+        :param intents: the intent definitions
+        """
+        coverage = Coverage(name)
+        for intent in intents:
+            intent_name = intent['name']
+            slots = intent.get('slots') or []
+            required = [s['name'] for s in slots if s.get('slotConstraint') == 'Required']
+            states = [START]
+            if required:
+                states.append(DialogState.ELICIT_SLOT)
+            if intent.get('confirmationPrompt'):
+                states.append(DialogState.CONFIRM_INTENT)
+            fulfillment = (intent.get('fulfillmentActivity') or {}).get('type')
+            states.append(DialogState.READY_FOR_FULFILLMENT if fulfillment == 'ReturnIntent' else DialogState.FULFILLED)
+            transitions = list(zip(states, states[1:]))
+            if len(required) > 1:
+                transitions.append((DialogState.ELICIT_SLOT, DialogState.ELICIT_SLOT))
+            if intent.get('confirmationPrompt') and intent.get('rejectionStatement'):
+                transitions.append((DialogState.CONFIRM_INTENT, DialogState.FAILED))
+            coverage.add_intent(intent_name, [s['name'] for s in slots],
+                                [s['name'] for s in slots if s.get('valueElicitationPrompt')], transitions)
+        return coverage
+
+    @staticmethod
+    def for_interaction_model(name, interaction_model):
+        # type: (str, InteractionModel) -> Coverage
+        """
+        Creates the coverage of the intents of the skill.
+        The simulations don't report the dialog state, so there are no transitions.
+
+        :param name: the skill name
+        :param interaction_model: the :py:class:InteractionModel
+        """
+        coverage = Coverage(name)
+        for intent in interaction_model.get_intents():
+            slots = interaction_model.get_slots_by_intent(intent['name']) or []
+            coverage.add_intent(intent['name'], [s.get_name() for s in slots],
+                                [s.get_name() for s in slots if s.is_elicitation_required()])
+        return coverage
+
+    def add_intent(self, intent_name, slots=(), prompts=(), transitions=()):
+        """
+        Adds the intent to the model.
+
+        :param intent_name: the intent name
+        :param slots: the slot names
+        :param prompts: the names of the slots having an elicitation prompt
+        :param transitions: the (from, to) dialog states
+        """
+        items = [CoverageItem(INTENT, intent_name, None)]
+        items.extend(CoverageItem(SLOT, intent_name, s) for s in slots)
+        items.extend(CoverageItem(PROMPT, intent_name, s) for s in prompts)
+        items.extend(transition(intent_name, f, t) for f, t in transitions)
+        with self.__lock:
+            for item in items:
+                self.__model.setdefault(item, 0)
+
+    @staticmethod
+    def get_turn_items(intent_name, dialog_state, slots, slot_to_elicit=None, before_intent_name=None,
+                       before_dialog_state=None):
+        # type: (str, str, dict, str, str, str) -> list
+        """
+        Gets the items exercised by a turn.
+
+        :param intent_name: the intent name in the response
+        :param dialog_state: the dialog state in the response
+        :param slots: the slots in the response
+        :param slot_to_elicit: the slot to elicit in the response
+        :param before_intent_name: the intent name before sending
+        :param before_dialog_state: the dialog state before sending
+        :return: the list of :py:class:CoverageItem
+        """
+        if not intent_name:
+            return []
+        items = [CoverageItem(INTENT, intent_name, None)]
+        items.extend(CoverageItem(SLOT, intent_name, s) for s, v in (slots or {}).items() if v is not None)
+        if dialog_state == DialogState.ELICIT_SLOT and slot_to_elicit:
+            items.append(CoverageItem(PROMPT, intent_name, slot_to_elicit))
+        if dialog_state:
+            from_state = before_dialog_state if before_intent_name == intent_name and before_dialog_state else START
+            items.append(transition(intent_name, from_state, dialog_state))
+        return items
+
+    def record_turn(self, csc, before_intent_name, before_dialog_state, conversation=None):
+        """
+        Records the turn just sent by the runtime client.
+
+        :param csc: the :py:class:LexRuntimeClient
+        :param before_intent_name: the intent name before sending
+        :param before_dialog_state: the dialog state before sending
+        :param conversation: the key of the conversation the turn belongs to, or None
+        """
+        self.record(Coverage.get_turn_items(csc.get_intent_name(), csc.get_dialog_state(), csc.get_slots(),
+                                            csc.get_slot_to_elicit(), before_intent_name, before_dialog_state),
+                    conversation)
+
+    def record(self, items, conversation=None):
+        """
+        Records the items exercised by one turn.
+
+        :param items: the :py:class:CoverageItem exercised
+        :param conversation: the key of the conversation the turn belongs to, or None
+        """
+        with self.__lock:
+            self.turns += 1
+            for item in items:
+                counts = self.__model if item in self.__model else self.__unexpected
+                counts[item] = counts.get(item, 0) + 1
+            if conversation is not None:
+                c = self.__conversations.get(conversation)
+                if c is None:
+                    c = self.__conversations[conversation] = [0, set()]
+                c[0] += 1
+                c[1].update(items)
+
+    def get_count(self, item):
+        # type: (CoverageItem) -> int
+        with self.__lock:
+            return self.__model.get(item, self.__unexpected.get(item, 0))
+
+    def get_covered(self, kind=None):
+        # type: (str) -> list
+        with self.__lock:
+            return [i for i, n in self.__model.items() if n and (kind is None or i.kind == kind)]
+
+    def get_uncovered(self, kind=None):
+        # type: (str) -> list
+        with self.__lock:
+            return [i for i, n in self.__model.items() if not n and (kind is None or i.kind == kind)]
+
+    def get_unexpected(self):
+        # type: () -> list
+        with self.__lock:
+            return list(self.__unexpected)
+
+    def get_ratio(self, kind=None):
+        # type: (str) -> float
+        """
+        Gets the ratio of the items of the model covered, 1.0 if there are none.
+        """
+        covered = len(self.get_covered(kind))
+        total = covered + len(self.get_uncovered(kind))
+        return float(covered) / total if total else 1.0
+
+    def get_conversations(self):
+        # type: () -> dict
+        """
+        Gets the number of turns and the set of items exercised of every conversation recorded, by key.
+        """
+        with self.__lock:
+            return OrderedDict((k, (n, set(items))) for k, (n, items) in self.__conversations.items())
+
+    def select(self):
+        # type: () -> list
+        """
+        Selects the conversations exercising all the items exercised by all the conversations recorded, dropping the
+        ones not exercising anything the others don't.
+
+        It's the greedy approximation to the weighted set cover: the conversation exercising the most items not
+        exercised yet per turn is selected until no one exercises anything new.
+
+        :return: the keys of the conversations selected, sorted, i.e. the :py:meth:Conversation.get_key of the
+            conversations sent by :py:class:LexBotTest
+        """
+        conversations = self.get_conversations()
+        keys = sorted(conversations, key=lambda k: (not isinstance(k, int), k))
+        order = dict((k, n) for n, k in enumerate(keys))
+        pending = set().union(*(items for _, items in conversations.values()))
+        selected = []
+        while pending:
+            best = max(keys, key=lambda k: (float(len(conversations[k][1] & pending)) / max(conversations[k][0], 1),
+                                            -order[k]))
+            new = conversations[best][1] & pending
+            if not new:
+                break
+            selected.append(best)
+            keys.remove(best)
+            pending -= new
+        return sorted(selected, key=lambda k: order[k])
+
+    def empty(self):
+        # type: () -> Coverage
+        """
+        Creates a coverage with the same model and nothing recorded.
+        """
+        coverage = Coverage(self.name)
+        with self.__lock:
+            coverage.__model = OrderedDict((item, 0) for item in self.__model)
+        return coverage
+
+    def merge(self, other):
+        # type: (Coverage) -> Coverage
+        """
+        Adds the turns recorded by other.
+
+        :param other: the other coverage, of the same model
+        :return: this coverage
+        """
+        return self.__merge(other.to_dict())
+
+    def to_dict(self):
+        # type: () -> dict
+        with self.__lock:
+            return {
+                'name': self.name,
+                'turns': self.turns,
+                'items': [[list(i), n] for i, n in self.__model.items()],
+                'unexpected': [[list(i), n] for i, n in self.__unexpected.items()],
+                'conversations': [[k, n, sorted(list(i) for i in items)] for k, (n, items) in
+                                  self.__conversations.items()],
+            }
+
+    @staticmethod
+    def from_dict(d):
+        # type: (dict) -> Coverage
+        coverage = Coverage(d['name'])
+        coverage.__model = OrderedDict((CoverageItem(*i), 0) for i, _ in d['items'])
+        return coverage.__merge(d)
+
+    def __merge(self, d):
+        with self.__lock:
+            self.turns += d['turns']
+            for item, n in d['items'] + d['unexpected']:
+                item = CoverageItem(*item)
+                counts = self.__model if item in self.__model else self.__unexpected
+                counts[item] = counts.get(item, 0) + n
+            for key, n, items in d['conversations']:
+                c = self.__conversations.get(key)
+                if c is None:
+                    c = self.__conversations[key] = [0, set()]
+                c[0] += n
+                c[1].update(CoverageItem(*i) for i in items)
+        return self
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+    @staticmethod
+    def load(path):
+        # type: (str) -> Coverage
+        with open(path) as f:
+            return Coverage.from_dict(json.load(f))
+
+    def __getstate__(self):
+        # the lock can't be pickled, i.e. to send the coverage to a shard process
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state['name'])
+        self.__model = OrderedDict((CoverageItem(*i), 0) for i, _ in state['items'])
+        self.__merge(state)
+
+    def __str__(self):
+        items = len(self.get_covered()) + len(self.get_uncovered())
+        s = 'Coverage of {}: {:.0%} of {} items in {} turns'.format(self.name, self.get_ratio(), items, self.turns)
+        for kind in KINDS:
+            covered = self.get_covered(kind)
+            uncovered = self.get_uncovered(kind)
+            if covered or uncovered:
+                s += '\n\t{}s: {}/{}'.format(kind, len(covered), len(covered) + len(uncovered))
+                if uncovered:
+                    s += ', not covered: {}'.format(', '.join(str(i) for i in uncovered))
+        unexpected = self.get_unexpected()
+        if unexpected:
+            s += '\n\tnot in the model: {}'.format(', '.join(str(i) for i in unexpected))
+        return s
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from lex_bot_tester.aws.asyncexecutor import AsyncExecutor
+from lex_bot_tester.aws.lex.lexruntimeclient import LexRuntimeClient
+from lex_bot_tester.aws.polly.asyncpollyclient import AsyncPollyClient
+
+
+class AsyncLexRuntimeClient:
+    """
+    Lex Runtime Client usable from coroutines.
+
+    The requests are made by a :py:class:LexRuntimeClient, so cassettes, retries and timings apply, in the threads of
+    an :py:class:AsyncExecutor. The getters of the last turn, i.e. :py:meth:get_dialog_state, are the ones of
+    :py:attr:client.
+
+    A client holds one Lex session, its turns have to be awaited one after the other. Many clients, one per session,
+    can share the executor.
+
+    If a turn is cancelled once its request has been sent, the session may have moved to the next state.
+    """
+
+    def __init__(self, bot_name, bot_alias, user_id, executor=None, polly_client=None, **kwargs):
+        # type: (str, str, str, AsyncExecutor, AsyncPollyClient, dict) -> None
+        """
+        :param bot_name: the bot name
+        :param bot_alias: the bot alias
+        :param user_id: the user id
+        :param executor: the :py:class:AsyncExecutor, which may be shared with other clients, or None to create one
+        :param polly_client: the :py:class:AsyncPollyClient or :py:class:PollyClient, or None
+        :param kwargs: the other arguments of :py:class:LexRuntimeClient
+        """
+        self.executor = executor if executor is not None else AsyncExecutor()
+        if isinstance(polly_client, AsyncPollyClient):
+            polly_client = polly_client.client
+        kwargs.setdefault('concurrency', self.executor.concurrency)
+        self.client = LexRuntimeClient(bot_name, bot_alias, user_id, polly_client=polly_client, **kwargs)
+
+    @staticmethod
+    def wrap(client, executor=None):
+        # type: (LexRuntimeClient, AsyncExecutor) -> AsyncLexRuntimeClient
+        """
+        Creates the async client for an existing :py:class:LexRuntimeClient.
+
+        :param client: the client
+        :param executor: the :py:class:AsyncExecutor, which may be shared with other clients, or None to create one
+        :return: the async client
+        """
+        acsc = AsyncLexRuntimeClient.__new__(AsyncLexRuntimeClient)
+        acsc.executor = executor if executor is not None else AsyncExecutor()
+        acsc.client = client
+        return acsc
+
+    def __getattr__(self, item):
+        # bot_name, user_id, timings, get_intent_name(), get_slots(), ...
+        if item == 'client':
+            raise AttributeError(item)
+        return getattr(self.client, item)
+
+    async def post_text(self, text, request_attributes=None, session_attributes=None):
+        return await self.executor.run(self.client.post_text, text, request_attributes, session_attributes)
+
+    async def post_text_to_speech(self, text, request_attributes=None, session_attributes=None):
+        return await self.executor.run(self.client.post_text_to_speech, text, request_attributes,
+                                       session_attributes)
+
+    async def post_content(self, content_type, input_stream, accept, request_attributes=None,
+                           session_attributes=None):
+        return await self.executor.run(self.client.post_content, content_type, input_stream, accept,
+                                       request_attributes, session_attributes)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+
+
+class Cassette:
+    """
+    Recording of the Lex runtime requests and responses.
+
+    In :py:attr:Mode.RECORD every response is appended, as one JSON line, to the file. In :py:attr:Mode.REPLAY the
+    responses are answered from the file and no request reaches the network.
+
+    Responses are keyed by bot, alias, the ordered inputs previously sent in the same session and the input, so the
+    same conversation always finds the same answers.
+    """
+
+    class Mode:
+        RECORD = 'record'
+        REPLAY = 'replay'
+
+    def __init__(self, path, mode=Mode.REPLAY):
+        if mode not in (Cassette.Mode.RECORD, Cassette.Mode.REPLAY):
+            raise ValueError('Invalid mode {}'.format(mode))
+        self.path = path
+        self.mode = mode
+        self.__lock = threading.Lock()
+        self.__responses = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.__responses[entry['key']] = entry['response']
+        elif mode == Cassette.Mode.REPLAY:
+            raise IOError('Cannot open cassette {}'.format(path))
+
+    def is_replaying(self):
+        return self.mode == Cassette.Mode.REPLAY
+
+    @staticmethod
+    def key(bot_name, bot_alias, history, request_input):
+        # type: (str, str, list, object) -> str
+        """
+        Gets the key identifying the response.
+
+        :param bot_name: the bot name
+        :param bot_alias: the bot alias
+        :param history: the inputs previously sent in the same session, oldest first
+        :param request_input: the input sent
+        :return: the key
+        """
+        data = json.dumps([bot_name, bot_alias, history, request_input], separators=(',', ':'))
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def get(self, key, description=None):
+        """
+        Gets the recorded response.
+
+        :param key: the key
+        :param description: describes the request in the error message
+        :return: the response
+        :raise RuntimeError: if there's no recorded response
+        """
+        try:
+            return copy.deepcopy(self.__responses[key])
+        except KeyError:
+            raise RuntimeError('No recorded response in cassette {} for {} (key={})'.format(
+                self.path, description, key))
+
+    def put(self, key, response):
+        """
+        Records the response.
+        Streams and the response metadata are not recorded.
+
+        :param key: the key
+        :param response: the response
+        """
+        response = dict((k, v) for k, v in response.items() if k != 'ResponseMetadata' and not hasattr(v, 'read'))
+        line = json.dumps({'key': key, 'response': response}, separators=(',', ':'))
+        with self.__lock:
+            self.__responses[key] = response
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
@@ -16,8 +16,12 @@
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+import hashlib
+import json
+
 from six import string_types
 
+from lex_bot_tester.aws.lex.matcher import MatchPlan, PATTERN_TYPE
 from lex_bot_tester.aws.lex.resultbase import ResultBase
 
 
@@ -33,6 +37,16 @@ class ConversationItem(object):
             raise RuntimeError('receive should be a result')
         self.send = send
         self.receive = receive
+        self.__plan = None
+
+    def get_plan(self):
+        # type: () -> MatchPlan
+        """
+        Gets the plan matching the responses to :py:attr:receive, compiled on first use.
+        """
+        if self.__plan is None:
+            self.__plan = MatchPlan(self.receive)
+        return self.__plan
 
 
 class Conversation(list):
@@ -49,3 +63,28 @@ class Conversation(list):
         if not isinstance(conversation_item, ConversationItem):
             raise RuntimeError('conversation_item should be a ConversationItem')
         super(Conversation, self).append(conversation_item)
+
+    def get_intent_names(self):
+        # type: () -> list
+        """
+        Gets the names of the intents expected in the responses, sorted.
+        """
+        return sorted(set(ci.receive.intent_name for ci in self))
+
+    def get_key(self, bot_name=None, bot_alias=None):
+        # type: (str, str) -> str
+        """
+        Gets the key identifying the conversation across runs, a digest of the bot, the texts sent and the results
+        expected.
+
+        :param bot_name: the name of the bot the conversation runs against
+        :param bot_alias: the alias of the bot
+        """
+        def value_key(v):
+            if isinstance(v, PATTERN_TYPE):
+                return ['re', v.pattern, v.flags]
+            return repr(v)
+
+        definition = [bot_name, bot_alias] + [[ci.send, ci.receive.intent_name, ci.receive.dialog_state,
+                       sorted([k, value_key(v)] for k, v in ci.receive.items())] for ci in self]
+        return hashlib.sha1(json.dumps(definition).encode('utf-8')).hexdigest()
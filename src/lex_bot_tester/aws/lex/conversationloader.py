@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import re
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from lex_bot_tester.aws.lex.conversationplan import ConversationPlan
+
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+
+class ConversationLoader:
+    """
+    Loads conversations from JSON Lines or YAML files, one at a time, so suites of any size can be run without having
+    all of them in memory.
+
+    Each JSON line, or YAML document, is a conversation:
+
+        {"intent": "OrderFlowers", "tags": ["smoke"], "turns": [
+            ["I would like to order some roses", "ElicitSlot", {"FlowerType": "roses"}],
+            ["next Sunday", "ElicitSlot", {"PickupDate": {"regex": "\\\\d+-\\\\d+-\\\\d+"}}]]}
+
+    the turns being the (send, dialog state, slots) items of a conversation definition (see
+    :py:class:ConversationPlan), where slot values given as {"regex": pattern} are regular expressions. Conversations
+    are validated as they are read. YAML files need PyYAML.
+    """
+
+    def __init__(self, lmc, bot_name, bot_alias, intents=None, tags=None):
+        # type: (LexModelsClient, str, str, list, list) -> None
+        """
+        :param lmc: the :py:class:LexModelsClient having the result classes of the bot
+        :param bot_name: the bot name
+        :param bot_alias: the bot alias
+        :param intents: load only the conversations of these intents, or None to load all
+        :param tags: load only the conversations having any of these tags, or None to load all
+        """
+        self.__lmc = lmc
+        self.bot_name = bot_name
+        self.bot_intents = lmc.get_intents_for_bot(bot_name, bot_alias)
+        self.intents = set(intents) if intents is not None else None
+        self.tags = set(tags) if tags is not None else None
+        self.loaded = 0
+        self.skipped = 0
+
+    def load(self, path):
+        """
+        Loads the conversations in the file, .yaml or .yml files are read as YAML and any other as JSON Lines.
+
+        :param path: the path
+        :return: a generator of :py:class:Conversation
+        :raise ValueError: when an invalid conversation, or a line that is not valid JSON, is read
+        """
+        with open(path) as f:
+            if path.endswith(YAML_EXTENSIONS):
+                if yaml is None:
+                    raise RuntimeError('PyYAML is needed to load {}'.format(path))
+                records = ((n + 1, r) for n, r in enumerate(yaml.safe_load_all(f)) if r is not None)
+                where = '{}: document {}'
+            else:
+                records = ((n + 1, ConversationLoader.__parse(path, n + 1, line)) for n, line in enumerate(f)
+                           if line.strip())
+                where = '{}:{}'
+            for n, record in records:
+                conversation = self.__create(where.format(path, n), record)
+                if conversation is not None:
+                    yield conversation
+
+    def __create(self, where, record):
+        if not isinstance(record, dict) or 'intent' not in record or not isinstance(record.get('turns'), list):
+            raise ValueError('{}: expected a conversation with intent and turns, found {!r}'.format(where, record))
+        intent_name = record['intent']
+        if intent_name not in self.bot_intents:
+            raise ValueError('{}: {} not an intent of {}, should be one of {}'.format(where, intent_name,
+                                                                                     self.bot_name, self.bot_intents))
+        if not self.__selected(intent_name, record.get('tags') or []):
+            self.skipped += 1
+            return None
+        errors = []
+        r = self.__lmc.get_result_class_for_intent(intent_name, self.bot_name)
+        conversation = ConversationPlan.create_conversation(where, r, [ConversationLoader.__turn(t) for t in
+                                                                       record['turns']], errors)
+        if errors:
+            raise ValueError('\n'.join(errors))
+        self.loaded += 1
+        return conversation
+
+    @staticmethod
+    def __parse(path, n, line):
+        try:
+            return json.loads(line)
+        except ValueError as ex:
+            raise ValueError('{}:{}: invalid JSON: {}'.format(path, n, ex))
+
+    def __selected(self, intent_name, tags):
+        if self.intents is not None and intent_name not in self.intents:
+            return False
+        return self.tags is None or not self.tags.isdisjoint(tags)
+
+    @staticmethod
+    def __turn(turn):
+        if isinstance(turn, list) and len(turn) == 3 and isinstance(turn[2], dict):
+            slots = {}
+            for k, v in turn[2].items():
+                if isinstance(v, dict) and list(v) == ['regex']:
+                    v = re.compile(v['regex'])
+                slots[k] = v
+            return turn[0], turn[1], slots
+        # anything else is reported by the validation
+        return turn
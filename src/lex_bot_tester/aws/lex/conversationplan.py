@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from six import string_types
+
+from lex_bot_tester.aws.lex.conversation import Conversation, ConversationItem
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+from lex_bot_tester.aws.lex.matcher import PATTERN_TYPE
+from lex_bot_tester.aws.lex.resultbase import normalize
+from lex_bot_tester.util.conversion import to_snake_case
+
+DIALOG_STATES = frozenset(v for k, v in vars(DialogState).items() if not k.startswith('_'))
+
+
+class ConversationPlan(object):
+    """
+    The conversations of a conversation definition, validated against the intents of the bot before anything is sent.
+
+    A conversation definition is a dict keyed by intent name whose values are a conversation, a list of
+    (send, dialog state, slots) tuples, or a list of them. Identical conversations are planned only once.
+    """
+
+    def __init__(self, bot_name, bot_alias):
+        # type: (str, str) -> None
+        self.bot_name = bot_name
+        self.bot_alias = bot_alias
+        self.conversations = []
+        self.intents = []
+        self.duplicates = 0
+        self.__keys = set()
+
+    @staticmethod
+    def create(lmc, bot_name, bot_alias, conversation_definition):
+        # type: (LexModelsClient, str, str, dict) -> ConversationPlan
+        """
+        Creates the plan, validating every item of the definition.
+
+        :param lmc: the :py:class:LexModelsClient having the result classes of the bot
+        :param bot_name: the bot name
+        :param bot_alias: the bot alias
+        :param conversation_definition: the conversation definition
+        :return: the plan
+        :raise ValueError: listing all the errors in the definition
+        """
+        plan = ConversationPlan(bot_name, bot_alias)
+        errors = []
+        intents = lmc.get_intents_for_bot(bot_name, bot_alias)
+        for intent_name in conversation_definition:
+            if intent_name not in intents:
+                errors.append('{}: not an intent of {}, should be one of {}'.format(intent_name, bot_name, intents))
+        for intent_name in intents:
+            if intent_name not in conversation_definition:
+                continue
+            r = lmc.get_result_class_for_intent(intent_name, bot_name)
+            for n, definition in enumerate(ConversationPlan.__split(conversation_definition[intent_name])):
+                where = '{}[{}]'.format(intent_name, n)
+                conversation = ConversationPlan.create_conversation(where, r, definition, errors)
+                if conversation is not None:
+                    plan.add(intent_name, conversation, ConversationPlan.__key(intent_name, definition))
+        if errors:
+            raise ValueError('Invalid conversation definition for {}:\n\t{}'.format(bot_name, '\n\t'.join(errors)))
+        return plan
+
+    @staticmethod
+    def __split(value):
+        # a single conversation starts with an item, whose first element is the text sent
+        if value and isinstance(value[0], (tuple, list)) and value[0] and isinstance(value[0][0], string_types):
+            return [value]
+        return value
+
+    @staticmethod
+    def create_conversation(where, r, definition, errors):
+        # type: (str, type, list, list) -> Conversation
+        """
+        Creates the conversation from its definition, a list of (send, dialog state, slots).
+
+        :param where: where the definition is, used in the error messages
+        :param r: the result class of the intent
+        :param definition: the definition
+        :param errors: the list the errors are appended to
+        :return: the conversation, or None if the definition is not valid
+        """
+        conversation = Conversation()
+        valid = True
+        for m, cdi in enumerate(definition):
+            item = '{}[{}]'.format(where, m)
+            if not isinstance(cdi, (tuple, list)) or len(cdi) != 3:
+                errors.append('{}: expected (send, dialog state, slots), found {!r}'.format(item, cdi))
+                valid = False
+                continue
+            send, dialog_state, slots = cdi
+            if not isinstance(send, string_types):
+                errors.append('{}: send should be a string, found {!r}'.format(item, send))
+                valid = False
+            if dialog_state not in DIALOG_STATES:
+                errors.append('{}: invalid dialog state {!r}, should be one of {}'.format(item, dialog_state,
+                                                                                         sorted(DIALOG_STATES)))
+                valid = False
+            if not isinstance(slots, dict):
+                errors.append('{}: slots should be a dict, found {!r}'.format(item, slots))
+                valid = False
+                continue
+            kwargs = {}
+            for k in slots:
+                # in case the slot name has been specified in CamelCase we convert to snake_case here
+                key = to_snake_case(k)
+                if key not in r._arg_names:
+                    errors.append('{}: invalid slot {}, should be one of {}'.format(item, k, r._arg_names))
+                    valid = False
+                kwargs[key] = slots[k]
+            if valid:
+                conversation.append(ConversationItem(send, r(dialog_state, **kwargs)))
+        return conversation if valid else None
+
+    @staticmethod
+    def __key(intent_name, definition):
+        def value_key(v):
+            if isinstance(v, PATTERN_TYPE):
+                return 're', v.pattern, v.flags
+            return repr(normalize(v))
+
+        return intent_name, tuple((send, dialog_state, tuple(sorted((to_snake_case(k), value_key(v))
+                                                                    for k, v in slots.items())))
+                                  for send, dialog_state, slots in definition)
+
+    def add(self, intent_name, conversation, key=None):
+        # type: (str, Conversation, object) -> bool
+        """
+        Adds the conversation to the plan, unless an identical one was already added.
+
+        :param intent_name: the intent name
+        :param conversation: the conversation
+        :param key: the key identifying identical conversations, or None if it's always added
+        :return: whether it was added
+        """
+        if key is not None:
+            if key in self.__keys:
+                self.duplicates += 1
+                return False
+            self.__keys.add(key)
+        self.conversations.append(conversation)
+        self.intents.append(intent_name)
+        return True
+
+    def get_turns(self):
+        # type: () -> int
+        return sum(len(c) for c in self.conversations)
+
+    def get_requests(self, use_tts=False, resumes=0, lex_models=0):
+        # type: (bool, int, int) -> dict
+        """
+        Gets the number of requests running the plan makes, as the service name and the number of requests.
+        The speech of each distinct text is synthesized once, as it is cached.
+
+        When :py:attr:resumes is set, the Lex session is checkpointed with get_session after every turn. It is only
+        restored with put_session after a failure, which is not counted.
+
+        :param use_tts: whether to use TTS
+        :param resumes: the number of times each conversation is resumed after a transient failure
+        :param lex_models: the number of lex-models requests, get_bot and get_intent, made to create the plan
+        """
+        turns = self.get_turns()
+        return {
+            'lex-models': lex_models,
+            'lex-runtime': turns * 2 if resumes else turns,
+            'polly': len(set(ci.send for c in self.conversations for ci in c)) if use_tts else 0,
+        }
+
+    def __str__(self):
+        s = 'Plan for {}:{}: {} conversations, {} turns ({} duplicates skipped)'.format(
+            self.bot_name, self.bot_alias, len(self.conversations), self.get_turns(), self.duplicates)
+        for intent_name, c in zip(self.intents, self.conversations):
+            s += '\n\t{}: {}'.format(intent_name, ' -> '.join('"{}"'.format(ci.send) for ci in c))
+        return s
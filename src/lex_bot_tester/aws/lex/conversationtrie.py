@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from collections import OrderedDict
+
+
+class TrieNode(object):
+    """
+    A turn shared by the conversations having the same texts sent up to it.
+    """
+
+    __slots__ = ('id', 'send', 'items', 'conversations', 'children')
+
+    def __init__(self, node_id, send):
+        self.id = node_id
+        self.send = send
+        # the ConversationItem of each conversation sending this turn, by conversation index
+        self.items = OrderedDict()
+        # the indices of the conversations going through this node
+        self.conversations = set()
+        self.children = OrderedDict()
+
+
+class ConversationTrie(object):
+    """
+    Conversations merged by the texts they send, so the turns they have in common are sent once.
+
+    Each node is a turn, shared by all the conversations sending the same texts up to it, whose responses are matched
+    against the expected results of every one of them.
+    """
+
+    def __init__(self, conversations=None):
+        # type: (list) -> None
+        """
+        :param conversations: the conversations, or None to add them with :py:meth:add
+        """
+        self.root = TrieNode(0, None)
+        self.nodes = 0
+        self.turns = 0
+        if conversations is not None:
+            for i, c in enumerate(conversations):
+                self.add(i, c)
+
+    def add(self, index, conversation):
+        """
+        Adds the conversation.
+
+        :param index: the conversation index
+        :param conversation: the conversation
+        """
+        node = self.root
+        node.conversations.add(index)
+        for ci in conversation:
+            child = node.children.get(ci.send)
+            if child is None:
+                self.nodes += 1
+                child = node.children[ci.send] = TrieNode(self.nodes, ci.send)
+            child.items[index] = ci
+            child.conversations.add(index)
+            node = child
+        self.turns += len(conversation)
+
+    def get_saved(self):
+        # type: () -> int
+        """
+        Gets the number of turns not sent because they are shared.
+        """
+        return self.turns - self.nodes
+
+    def __str__(self):
+        return '{} turns sharing prefixes in {} ({} saved)'.format(self.turns, self.nodes, self.get_saved())
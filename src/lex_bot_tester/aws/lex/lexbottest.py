@@ -18,18 +18,36 @@
 """
 from __future__ import print_function
 
-import re
+import asyncio
 import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
 from unittest import TestCase
 
+from six import StringIO
+
+from lex_bot_tester.aws.asyncexecutor import AsyncExecutor
+from lex_bot_tester.aws.coverage import Coverage
+from lex_bot_tester.aws.lex.asynclexruntimeclient import AsyncLexRuntimeClient
+from lex_bot_tester.aws.lex.cassette import Cassette
 from lex_bot_tester.aws.lex.conversation import Conversation, ConversationItem
-from lex_bot_tester.aws.lex.lexmodelsclient import LexModelsClient
-from lex_bot_tester.aws.lex.lexruntimeclient import LexRuntimeClient, DialogState
+from lex_bot_tester.aws.lex.conversationplan import ConversationPlan
+from lex_bot_tester.aws.lex.conversationtrie import ConversationTrie
+from lex_bot_tester.aws.lex.lexmodelsclient import LexModelsClient, fingerprint_name
+from lex_bot_tester.aws.lex.lexruntimeclient import LexRuntimeClient, derive_user_id
+from lex_bot_tester.aws.polly.audiocache import AudioCache
+from lex_bot_tester.aws.polly.pollyclient import PollyClient
+from lex_bot_tester.aws.retry import RetryPolicy, RetryStats, get_error_code, is_throttling, is_transient
+from lex_bot_tester.aws.runhistory import RunHistory
 from lex_bot_tester.util.color import Color
-from lex_bot_tester.util.conversion import to_camel_case, to_snake_case
+from lex_bot_tester.util.timing import TIMINGS, Timings, Transport
 
 VERBOSE = False
 DEBUG = False
+MAX_WORKERS = 16
+# conversations waiting to be run, per worker, when running them in parallel
+MAX_PENDING = 2
 
 
 class LexBotTest(TestCase):
@@ -39,8 +57,10 @@ class LexBotTest(TestCase):
     def tearDown(self):
         super(LexBotTest, self).tearDown()
 
-    def conversations_text(self, bot_name, bot_alias, user_id, conversations, verbose=VERBOSE, use_tts=False):
-        # type: (str, str, str, list, bool, bool) -> None
+    def conversations_text(self, bot_name, bot_alias, user_id, conversations, verbose=VERBOSE, use_tts=False,
+                           parallel=False, max_workers=MAX_WORKERS, audio_cache=None, cassette=None, processes=None,
+                           share_prefixes=False, resumes=0, coverage=None, history=None):
+        # type: (str, str, str, list, bool, bool, bool, int, AudioCache, Cassette, int, bool, int, Coverage, RunHistory) -> None
         """
         Helper method for tests using text conversations.
 
@@ -48,8 +68,22 @@ class LexBotTest(TestCase):
         :param bot_name: the bot name
         :param bot_alias: the bot alias
         :param user_id: the user id
-        :param conversations: the list of conversations
+        :param conversations: the list of conversations, or any iterable, i.e. a :py:class:ConversationLoader
+            generator
         :param verbose: produce verbose output
+        :param parallel: run the conversations concurrently
+        :param max_workers: the maximum number of conversations running at the same time when :py:attr:parallel
+        :param audio_cache: the :py:class:AudioCache for the synthesized speech when :py:attr:use_tts, or None
+        :param cassette: the :py:class:Cassette recording or replaying the Lex responses, or None
+        :param processes: the number of processes the conversations are split across, or None to run them all in this
+            process
+        :param share_prefixes: send the turns the conversations have in common only once, see
+            :py:class:ConversationTrie
+        :param resumes: the number of times each conversation is resumed from its last checkpoint after a transient
+            failure
+        :param coverage: the :py:class:Coverage where every turn is recorded, with the conversation key, or None
+        :param history: the :py:class:RunHistory selecting the conversations to run and recording their results, or
+            None to run all of them
 
         Iterates over the list of :py:attr:conversations and each py:class:: ConversationItem, sends the corresponding
         text and analyzes the response.
@@ -61,121 +95,597 @@ class LexBotTest(TestCase):
         * the dialog state is as defined in the item
         * the slots contain the specified values, as declared in the item
 
+        When :py:attr:parallel is set, each conversation runs in its own Lex session, using a user id derived from
+        :py:attr:user_id and the conversation index, and the failures are reported as subtests once all the
+        conversations have finished.
+
+        When :py:attr:processes is set, conversation i runs in shard i % :py:attr:processes, each shard in its own
+        process and its own user id namespace, and each conversation in its own Lex session. Within a shard the
+        conversations run concurrently if :py:attr:parallel is set. The failures, retry counters and timings of all
+        the shards are merged back in this process.
+
+        When :py:attr:use_tts is set, all the texts are synthesized concurrently before the first one is sent, unless
+        the responses are replayed from the :py:attr:cassette or :py:attr:conversations is not a list or tuple, then
+        they are synthesized as they are sent.
+
+        Conversations are taken from :py:attr:conversations as they are run, and only a few more than
+        :py:attr:max_workers are waiting to be run when :py:attr:parallel is set, so iterables of any size can be run
+        without having all of them in memory. Sharding needs all of them, so they are read at once when
+        :py:attr:processes is set.
+
+        When :py:attr:share_prefixes is set, the conversations are merged into a :py:class:ConversationTrie and the
+        turns sending the same texts from the start of the conversations are sent once, matching the response against
+        the expected results of all of them. Where the conversations branch, the Lex session is taken with get_session
+        and put, with put_session, in a new session for each branch, using a user id derived from :py:attr:user_id and
+        the branch. Every conversation runs in its own session, as when :py:attr:parallel is set, and the branches run
+        concurrently if it is. The number of turns saved is left in :py:attr:turns_saved.
+
+        Throttled requests are retried with backoff, the counters are left in :py:attr:retry_stats.
+
+        Turns failing on a transient error, i.e. a network error or a 5xx, are not retried, as Lex may have processed
+        them. When :py:attr:resumes is set, the Lex session is checkpointed with get_session after every turn, and a
+        turn failing on a transient error, or still throttled, is sent again after restoring the checkpoint with
+        put_session, so the conversation resumes at that turn instead of failing. Checkpoints cost one request per turn,
+        and are no longer taken once a conversation has used all its resumes. Resumes are counted as retries.
+
+        When :py:attr:history is set, only the conversations that never ran, failed the last time or expect an intent
+        whose fingerprint changed since then are run, see :py:meth:LexModelsClient.get_intent_fingerprints. The result
+        of every conversation run is recorded in the history, keyed by bot, alias and conversation, which is saved once
+        they finish. The conversation indices are then the ones among the conversations selected. As the conversations
+        skipped would have changed the Lex session the next ones start from, every conversation runs in its own session
+        even if :py:attr:parallel is not set, using a user id derived from :py:attr:user_id and the index as when it
+        is.
+
+        The latency of every turn is recorded in the default :py:class:Timings, tagged by bot, alias, expected intent,
+        dialog state and transport.
         """
-        self.csc = LexRuntimeClient(bot_name, bot_alias, user_id)
-        for c in conversations:
-            if verbose:
-                print("Start conversation")
-                print("------------------")
-            for ci in c:
-                before_message = self.csc.get_message()
-                before_dialog_state = self.csc.get_dialog_state()
-                before_slots = self.csc.get_slots()
-                slot_to_elicit = self.csc.get_slot_to_elicit()
+        if history is not None:
+            conversations = self.__select(history, bot_name, bot_alias, conversations)
+        try:
+            self.__conversations_text(bot_name, bot_alias, user_id, conversations, verbose, use_tts, parallel,
+                                      max_workers, audio_cache, cassette, processes, share_prefixes, resumes, coverage,
+                                      history)
+        finally:
+            if history is not None:
+                history.save()
                 if verbose:
-                    if before_message:
-                        print(Color.colorize(' Bot: {}'.format(before_message), Color.WHITE, Color.BRIGHT_BLUE))
-                    print(Color.colorize('User: {}'.format(ci.send),
-                                         Color.BRIGHT_YELLOW if use_tts else Color.BRIGHT_WHITE, Color.BRIGHT_BLACK))
-                expected_result = ci.receive
-                if DEBUG:
-                    print('** expected_result={}'.format(expected_result))
-                if before_slots:
-                    # if we haven't specified slots that had a value already, we are assuming that their value didn't
-                    #  change and we complete the expected_result with the previous values
-                    for s in before_slots.keys():
-                        if to_snake_case(s) not in expected_result and before_slots[s]:
-                            if DEBUG:
-                                print('** adding key={} to expected_result with value "{}"'.format(to_snake_case(s),
-                                                                                                   before_slots[s]))
-                            expected_result[to_snake_case(s)] = before_slots[s]
-                if DEBUG:
-                    print('Sending: {}'.format(ci.send))
-                if use_tts:
-                    response = self.csc.post_text_to_speech(ci.send)
-                else:
-                    response = self.csc.post_text(ci.send)
-                self.assertEqual(expected_result.intent_name, self.csc.get_intent_name())
-                self.assertIsNotNone(response)
-                slots = self.csc.get_slots()
-                if DEBUG:
-                    print('\tslots={}'.format(slots))
-                self.assertEqual(expected_result.dialog_state, self.csc.get_dialog_state(),
-                                 msg='Invalid dialog state, response={}'.format(response))
-                if DEBUG:
-                    print(expected_result)
-                    print(response)
-                if len(expected_result) > 0:
-                    for rk in expected_result.keys():
-                        try:
-                            e = expected_result[rk]
-                            a = slots[to_camel_case(rk)]
-                            self.assertIsNotNone(a,
-                                                 msg='{} slot is None: rk={} e={} a={} send="{}" elicit={} slots={}'.format(
-                                                     to_camel_case(rk),
-                                                     rk,
-                                                     e,
-                                                     a,
-                                                     ci.send,
-                                                     slot_to_elicit,
-                                                     slots))
-                            if isinstance(e, re._pattern_type):
-                                try:
-                                    # noinspection PyCompatibility
-                                    self.assertRegex(a, e)
-                                except AttributeError as ex:
-                                    # python 2.7.x
-                                    self.assertRegexpMatches(a, e)
-                            else:
-                                self.assertEqual(e, a)
-                        except KeyError as ex:
-                            print('ERROR: rk={} msg={}'.format(rk, str(ex)), file=sys.stderr)
-                            if before_dialog_state == DialogState.ELICIT_SLOT and slot_to_elicit is not None:
-                                self.assertEqual(ci.send.lower(), self.csc.get_slot(slot_to_elicit).lower())
-                            # If it's None we let the slot to be not present
-                            self.assertIsNone(expected_result[rk])
-                else:
-                    # need to know the previous dialog state to know if it was ELICIT_SLOT, however, because
-                    # the only possibility of having an empty results is in the first step of the conversation
-                    # which has no previous dialog state, we may try...
-                    if before_dialog_state == DialogState.ELICIT_SLOT and slot_to_elicit is not None:
-                        self.assertEqual(ci.send.lower(), self.csc.get_slot(slot_to_elicit).lower())
+                    print(history)
+
+    def __conversations_text(self, bot_name, bot_alias, user_id, conversations, verbose, use_tts, parallel,
+                             max_workers, audio_cache, cassette, processes, share_prefixes, resumes, coverage,
+                             history):
+        if share_prefixes:
+            if processes is not None and processes > 1:
+                raise ValueError('share_prefixes cannot be used with processes')
+            self.__conversations_text_shared(bot_name, bot_alias, user_id, conversations, verbose, use_tts, parallel,
+                                             max_workers, audio_cache, cassette, resumes, coverage, history)
+            return
+        if processes is not None and processes > 1:
+            self.__conversations_text_sharded(bot_name, bot_alias, user_id, conversations, verbose, use_tts, parallel,
+                                              max_workers, audio_cache, cassette, processes, resumes, coverage,
+                                              history)
+            return
+        new_client = self.__prepare(bot_name, bot_alias, conversations, verbose, use_tts, parallel, max_workers,
+                                    audio_cache, cassette)
+        if parallel:
+            failures = self.__run_conversations(new_client, user_id, enumerate(conversations), verbose, use_tts,
+                                                max_workers, resumes, coverage, history)
+            for i, ex in failures:
+                with self.subTest(conversation=i, user_id=derive_user_id(user_id, i)):
+                    raise ex
+        else:
+            self.csc = new_client(user_id) if history is None else None
+            for i, c in enumerate(conversations):
+                if history is not None:
+                    # a skipped conversation would have changed the session the next one starts from
+                    self.csc = new_client(derive_user_id(user_id, i))
+                self.__conversation_text(self.csc, c, verbose, use_tts, resumes=resumes, coverage=coverage,
+                                         history=history)
+        if verbose and self.retry_stats.retries:
+            print('Retries: {}'.format(self.retry_stats))
+
+    async def conversations_text_async(self, bot_name, bot_alias, user_id, conversations, verbose=VERBOSE,
+                                       use_tts=False, executor=None, audio_cache=None, cassette=None, resumes=0,
+                                       coverage=None, history=None):
+        # type: (str, str, str, list, bool, bool, AsyncExecutor, AudioCache, Cassette, int, Coverage, RunHistory) -> None
+        """
+        Same as :py:meth:conversations_text with :py:attr:parallel set, but every conversation is a coroutine and all
+        of them are gathered on the running event loop.
+
+        The requests are made in the threads of the :py:attr:executor, which bounds how many are in flight at the same
+        time, so any number of conversations can be waiting for their turn without holding a thread. Cancelling the
+        coroutine cancels all the conversations.
+
+        :param bot_name: the bot name
+        :param bot_alias: the bot alias
+        :param user_id: the user id
+        :param conversations: the list of conversations
+        :param verbose: produce verbose output
+        :param use_tts: whether to use TTS
+        :param executor: the :py:class:AsyncExecutor, or None to create one for this call
+        :param audio_cache: the :py:class:AudioCache for the synthesized speech when :py:attr:use_tts, or None
+        :param cassette: the :py:class:Cassette recording or replaying the Lex responses, or None
+        :param resumes: the number of times each conversation is resumed from its last checkpoint after a transient
+            failure
+        :param coverage: the :py:class:Coverage where every turn is recorded, or None
+        :param history: the :py:class:RunHistory selecting the conversations to run and recording their results, or
+            None to run all of them
+        """
+        if history is not None:
+            conversations = self.__select(history, bot_name, bot_alias, conversations)
+        own_executor = executor is None
+        if own_executor:
+            executor = AsyncExecutor()
+        try:
+            # the speech is synthesized in a thread, not to block the loop
+            new_client = await executor.run(self.__prepare, bot_name, bot_alias, conversations, verbose, use_tts,
+                                            True, executor.concurrency, audio_cache, cassette)
+
+            async def run(index, conversation):
+                out = StringIO() if verbose else None
+                try:
+                    acsc = AsyncLexRuntimeClient.wrap(new_client(derive_user_id(user_id, index)), executor)
+                    await self.__conversation_text_async(acsc, conversation, verbose, use_tts, out, resumes, coverage,
+                                                         history)
+                    return None
+                except Exception as ex:
+                    return ex
+                finally:
+                    if out:
+                        print(out.getvalue(), end='')
+
+            results = await asyncio.gather(*[run(i, c) for i, c in enumerate(conversations)])
+        finally:
+            if own_executor:
+                executor.shutdown(wait=False)
+            if history is not None:
+                history.save()
+        for i, ex in enumerate(results):
+            if ex is not None:
+                with self.subTest(conversation=i, user_id=derive_user_id(user_id, i)):
+                    raise ex
+        if verbose and self.retry_stats.retries:
+            print('Retries: {}'.format(self.retry_stats))
+
+    @staticmethod
+    def __select(history, bot_name, bot_alias, conversations):
+        selected = (c for c in conversations if history.is_selected(c.get_key(bot_name, bot_alias),
+                                                                    [fingerprint_name(bot_name, bot_alias, n) for n in
+                                                                     c.get_intent_names()]))
+        # keep a list a list, so the speech can still be synthesized before the first turn
+        return list(selected) if isinstance(conversations, (list, tuple)) else selected
+
+    @staticmethod
+    def __record(history, bot_name, bot_alias, conversation, passed):
+        if history is not None:
+            history.record(conversation.get_key(bot_name, bot_alias),
+                           [fingerprint_name(bot_name, bot_alias, n) for n in conversation.get_intent_names()], passed)
+
+    def __prepare(self, bot_name, bot_alias, conversations, verbose, use_tts, parallel, max_workers, audio_cache,
+                  cassette):
+        """
+        Creates the retry policy and Polly client shared by the conversations, synthesizing the speech if needed.
+
+        :return: a function creating the runtime client for a user id
+        """
+        retry_policy = RetryPolicy()
+        self.retry_stats = retry_policy.stats
+        polly_client = None
+        if use_tts:
+            polly_client = PollyClient(concurrency=max_workers, audio_cache=audio_cache, retry_policy=retry_policy)
+            # an iterable may be read only once, and it would have to be kept in memory
+            if (cassette is None or not cassette.is_replaying()) and isinstance(conversations, (list, tuple)):
+                self.__presynthesize(polly_client, conversations, verbose, max_workers)
+
+        def new_client(uid):
+            return LexRuntimeClient(bot_name, bot_alias, uid, concurrency=max_workers if parallel else None,
+                                    polly_client=polly_client, cassette=cassette, retry_policy=retry_policy)
+
+        return new_client
+
+    def __presynthesize(self, polly_client, conversations, verbose, max_workers):
+        self.synthesis_report = polly_client.presynthesize([ci.send for c in conversations for ci in c], max_workers)
+        if verbose:
+            print(self.synthesis_report)
+
+    def __run_conversations(self, new_client, user_id, indexed_conversations, verbose, use_tts, max_workers,
+                            resumes=0, coverage=None, history=None):
+        """
+        Runs the conversations concurrently, each one in its own Lex session.
+
+        :param new_client: the function creating the runtime client for a user id
+        :param user_id: the user id the session user ids are derived from
+        :param indexed_conversations: the iterable of (index, conversation)
+        :param verbose: produce verbose output
+        :param use_tts: whether to use TTS
+        :param max_workers: the maximum number of conversations running at the same time
+        :param resumes: the number of times each conversation is resumed after a transient failure
+        :param coverage: the :py:class:Coverage where every turn is recorded, or None
+        :param history: the :py:class:RunHistory recording the results, or None
+        :return: the list of (index, exception) of the failed conversations
+        """
+        def run(index, conversation):
+            out = StringIO() if verbose else None
+            try:
+                self.__conversation_text(new_client(derive_user_id(user_id, index)), conversation, verbose, use_tts,
+                                         out, resumes, coverage, history)
+                return index, None
+            except Exception as ex:
+                return index, ex
+            finally:
+                if out:
+                    print(out.getvalue(), end='')
+
+        failures = []
+
+        def collect(done):
+            failures.extend((i, ex) for i, ex in (f.result() for f in done) if ex is not None)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # conversations are submitted as others finish, not to read all of them at once
+            pending = set()
+            for i, c in indexed_conversations:
+                if len(pending) >= MAX_PENDING * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(executor.submit(run, i, c))
+            collect(wait(pending)[0])
+        return sorted(failures, key=lambda f: f[0])
+
+    def __conversations_text_shared(self, bot_name, bot_alias, user_id, conversations, verbose, use_tts, parallel,
+                                    max_workers, audio_cache, cassette, resumes, coverage, history):
+        conversations = conversations if isinstance(conversations, (list, tuple)) else list(conversations)
+        new_client = self.__prepare(bot_name, bot_alias, conversations, verbose, use_tts, parallel, max_workers,
+                                    audio_cache, cassette)
+        trie = ConversationTrie(conversations)
+        keys = [c.get_key(bot_name, bot_alias) for c in conversations] if coverage is not None else None
+        # the user id and exception of the failed conversations, by index
+        failures = {}
+
+        def run(node, csc, snapshot):
+            """
+            Runs the turns from the node to the next branch.
+
+            :return: the list of (node, client, snapshot) of the branches
+            """
+            out = StringIO() if verbose else None
+            left = resumes
+            try:
+                if csc is None:
+                    csc = new_client(derive_user_id(user_id, 'p{}'.format(node.id)))
+                    if snapshot is not None:
+                        csc.restore(snapshot)
+                checkpoint = snapshot if snapshot is not None or not left else csc.snapshot()
+                while True:
+                    if all(i in failures for i in node.conversations):
+                        return []
+                    left = self.__shared_turn(csc, node, failures, verbose, use_tts, out, checkpoint, left, coverage,
+                                              keys)
+                    children = list(node.children.values())
+                    if len(children) != 1:
+                        break
+                    node = children[0]
+                    if left:
+                        checkpoint = csc.snapshot()
+                if not children:
+                    return []
+                snapshot = csc.snapshot()
+                return [(children[0], csc, snapshot)] + [(child, None, snapshot) for child in children[1:]]
+            except Exception as ex:
+                for i in node.conversations:
+                    failures.setdefault(i, (csc.user_id if csc is not None else user_id, ex))
+                return []
+            finally:
+                if out:
+                    print(out.getvalue(), end='')
+
+        branches = [(child, None, None) for child in trie.root.children.values()]
+        if parallel:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pending = set(executor.submit(run, *b) for b in branches)
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        pending.update(executor.submit(run, *b) for b in f.result())
+        else:
+            # depth first, in the order of the conversations
+            branches.reverse()
+            while branches:
+                branches.extend(reversed(run(*branches.pop())))
+        self.turns_saved = trie.get_saved()
+        for i, c in enumerate(conversations):
+            self.__record(history, bot_name, bot_alias, c, i not in failures)
+        if verbose:
+            print('Shared prefixes: {}'.format(trie))
+            if self.retry_stats.retries:
+                print('Retries: {}'.format(self.retry_stats))
+        for i in sorted(failures):
+            uid, ex = failures[i]
+            with self.subTest(conversation=i, user_id=uid):
+                raise ex
+
+    def __shared_turn(self, csc, node, failures, verbose, use_tts, out, checkpoint=None, resumes=0, coverage=None,
+                      keys=None):
+        """
+        Sends the turn of the node and matches the response against the expected results of the conversations
+        sharing it that haven't failed yet.
+
+        :param keys: the keys of the conversations, by index, the turns are recorded in :py:attr:coverage with
+
+        :return: the resumes left
+        """
+        before_message = csc.get_message()
+        before_dialog_state = csc.get_dialog_state()
+        before_slots = csc.get_slots()
+        before_intent_name = csc.get_intent_name()
+        slot_to_elicit = csc.get_slot_to_elicit()
+        if verbose:
+            self.__print_turn(before_message, node.send, use_tts, out)
+        response, resumes = self.__send(csc, next(iter(node.items.values())), use_tts, checkpoint, resumes)
+        for i, ci in node.items.items():
+            if i in failures:
+                continue
+            if coverage is not None:
+                coverage.record_turn(csc, before_intent_name, before_dialog_state, keys[i])
+            try:
+                ci.get_plan().match(ci.send, response, csc.get_intent_name(), csc.get_dialog_state(), csc.get_slots(),
+                                    before_dialog_state, before_slots, slot_to_elicit, before_intent_name)
+            except AssertionError as ex:
+                failures[i] = (csc.user_id, ex)
+        return resumes
+
+    @staticmethod
+    def __print_turn(before_message, send, use_tts, out):
+        if before_message:
+            print(Color.colorize(' Bot: {}'.format(before_message), Color.WHITE, Color.BRIGHT_BLUE), file=out)
+        print(Color.colorize('User: {}'.format(send), Color.BRIGHT_YELLOW if use_tts else Color.BRIGHT_WHITE,
+                             Color.BRIGHT_BLACK), file=out)
+
+    def __conversations_text_sharded(self, bot_name, bot_alias, user_id, conversations, verbose, use_tts, parallel,
+                                     max_workers, audio_cache, cassette, processes, resumes=0, coverage=None,
+                                     history=None):
+        self.retry_stats = RetryStats()
+        shards = [[] for _ in range(processes)]
+        for i, c in enumerate(conversations):
+            shards[i % processes].append((i, c))
+        cassette_args = (cassette.path, cassette.mode) if cassette is not None else None
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_run_shard, shard, bot_name, bot_alias, user_id, indexed_conversations, verbose,
+                                       use_tts, parallel, max_workers, audio_cache, cassette_args, resumes,
+                                       coverage.empty() if coverage is not None else None, history)
+                       for shard, indexed_conversations in enumerate(shards) if indexed_conversations]
+            results = [f.result() for f in futures]
+        failures = []
+        for result in results:
+            TIMINGS.merge(Timings.from_dict(result['timings']))
+            self.retry_stats.merge(result['retry_stats'])
+            failures.extend(result['failures'])
+            if coverage is not None:
+                coverage.merge(result['coverage'])
+            if history is not None:
+                history.merge(result['history'])
+        if verbose and self.retry_stats.retries:
+            print('Retries: {}'.format(self.retry_stats))
+        for i, shard, uid, failed, text in sorted(failures):
+            with self.subTest(conversation=i, shard=shard, user_id=uid):
+                if failed:
+                    self.fail(text)
+                raise RuntimeError(text)
+
+    def _run_shard(self, shard, bot_name, bot_alias, user_id, indexed_conversations, verbose, use_tts, parallel,
+                   max_workers, audio_cache, cassette_args, resumes=0, coverage=None, history=None):
+        """
+        Runs the conversations of one shard, in the shard process.
+
+        :return: a dict with the failures, as (index, shard, user id, whether it's an assertion failure, traceback),
+            the retry stats, the timings, the coverage and the history
+        """
+        # a forked process starts with a copy of the parent's timings
+        TIMINGS.clear()
+        shard_user_id = derive_user_id(user_id, 'shard{}'.format(shard))
+        cassette = Cassette(*cassette_args) if cassette_args is not None else None
+        workers = max_workers if parallel else 1
+        new_client = self.__prepare(bot_name, bot_alias, [c for _, c in indexed_conversations], verbose, use_tts,
+                                    parallel, workers, audio_cache, cassette)
+        failures = []
+        for i, ex in self.__run_conversations(new_client, shard_user_id, indexed_conversations, verbose, use_tts,
+                                              workers, resumes, coverage, history):
+            text = ''.join(traceback.format_exception(type(ex), ex, ex.__traceback__))
+            failures.append((i, shard, derive_user_id(shard_user_id, i), isinstance(ex, AssertionError), text))
+        return {'failures': failures, 'retry_stats': self.retry_stats, 'timings': TIMINGS.to_dict(),
+                'coverage': coverage, 'history': history}
+
+    def __conversation_text(self, csc, conversation, verbose, use_tts, out=None, resumes=0, coverage=None,
+                            history=None):
+        # type: (LexRuntimeClient, Conversation, bool, bool, object, int, Coverage, RunHistory) -> None
+        """
+        Sends every item of one conversation and asserts on the responses.
+
+        :param csc: the runtime client holding the Lex session
+        :param conversation: the conversation
+        :param verbose: produce verbose output
+        :param use_tts: whether to use TTS
+        :param out: where the verbose output goes, defaults to stdout
+        :param resumes: the number of times the conversation is resumed from its last checkpoint after a transient
+            failure
+        :param coverage: the :py:class:Coverage where every turn is recorded, with the conversation key, or None
+        :param history: the :py:class:RunHistory where the result is recorded, or None
+        """
+        steps = self.__conversation_steps(csc, conversation, verbose, use_tts, out, coverage)
+        checkpoint = csc.snapshot() if resumes else None
+        try:
+            ci = next(steps)
+            while True:
+                response, resumes = self.__send(csc, ci, use_tts, checkpoint, resumes)
+                if resumes:
+                    checkpoint = csc.snapshot()
+                ci = steps.send(response)
+        except StopIteration:
+            self.__record(history, csc.bot_name, csc.bot_alias, conversation, True)
+        except Exception:
+            self.__record(history, csc.bot_name, csc.bot_alias, conversation, False)
+            raise
+
+    def __send(self, csc, ci, use_tts, checkpoint, resumes):
+        """
+        Sends the item, resuming from the checkpoint if it fails on a transient error.
+
+        :return: the response and the resumes left
+        """
+        while True:
+            try:
+                with self.__timed_turn(csc, ci, use_tts):
+                    if use_tts:
+                        return csc.post_text_to_speech(ci.send), resumes
+                    return csc.post_text(ci.send), resumes
+            except Exception as ex:
+                if not self.__resumable(ex, checkpoint, resumes):
+                    raise
+                self.__resuming(csc, ci, ex)
+                csc.restore(checkpoint)
+                resumes -= 1
+
+    async def __conversation_text_async(self, acsc, conversation, verbose, use_tts, out=None, resumes=0, coverage=None,
+                                        history=None):
+        # type: (AsyncLexRuntimeClient, Conversation, bool, bool, object, int, Coverage, RunHistory) -> None
+        """
+        Same as :py:meth:__conversation_text but awaiting the responses.
+        """
+        steps = self.__conversation_steps(acsc.client, conversation, verbose, use_tts, out, coverage)
+        checkpoint = await acsc.executor.run(acsc.client.snapshot) if resumes else None
+        try:
+            ci = next(steps)
+            while True:
+                try:
+                    with self.__timed_turn(acsc.client, ci, use_tts):
+                        if use_tts:
+                            response = await acsc.post_text_to_speech(ci.send)
+                        else:
+                            response = await acsc.post_text(ci.send)
+                except Exception as ex:
+                    if not self.__resumable(ex, checkpoint, resumes):
+                        raise
+                    self.__resuming(acsc.client, ci, ex)
+                    await acsc.executor.run(acsc.client.restore, checkpoint)
+                    resumes -= 1
+                    continue
+                if resumes:
+                    checkpoint = await acsc.executor.run(acsc.client.snapshot)
+                ci = steps.send(response)
+        except StopIteration:
+            self.__record(history, acsc.client.bot_name, acsc.client.bot_alias, conversation, True)
+        except Exception:
+            self.__record(history, acsc.client.bot_name, acsc.client.bot_alias, conversation, False)
+            raise
+
+    @staticmethod
+    def __resumable(ex, checkpoint, resumes):
+        return resumes > 0 and checkpoint is not None and (is_transient(ex) or is_throttling(ex))
+
+    @staticmethod
+    def __resuming(csc, ci, ex):
+        error_code = get_error_code(ex)
+        csc.get_retry_stats().add_retry(error_code, 0.0)
+        print('WARNING: {} failed on "{}" with {}, resuming from the last turn'.format(csc.user_id, ci.send,
+                                                                                      error_code), file=sys.stderr)
+
+    @staticmethod
+    @contextmanager
+    def __timed_turn(csc, ci, use_tts):
+        with csc.timings.time('lex_bot_test_turn', bot=csc.bot_name, alias=csc.bot_alias,
+                              intent=ci.receive.intent_name,
+                              transport=Transport.TTS if use_tts else Transport.TEXT) as tags:
+            yield
+            tags['dialog_state'] = csc.get_dialog_state()
+
+    def __conversation_steps(self, csc, conversation, verbose, use_tts, out=None, coverage=None):
+        """
+        Asserts on the responses to every item of one conversation.
+
+        It's a generator yielding the :py:class:ConversationItem to send and expecting the response to be sent back,
+        so the requests can be made either blocking or from a coroutine.
+
+        :param csc: the runtime client holding the Lex session
+        :param conversation: the conversation
+        :param verbose: produce verbose output
+        :param use_tts: whether to use TTS
+        :param out: where the verbose output goes, defaults to stdout
+        :param coverage: the :py:class:Coverage where every turn is recorded, with the conversation key, or None
+        """
+        if out is None:
+            out = sys.stdout
+        key = conversation.get_key(csc.bot_name, csc.bot_alias) if coverage is not None else None
+        if verbose:
+            print("Start conversation", file=out)
+            print("------------------", file=out)
+        for ci in conversation:
+            before_message = csc.get_message()
+            before_dialog_state = csc.get_dialog_state()
+            before_slots = csc.get_slots()
+            before_intent_name = csc.get_intent_name()
+            slot_to_elicit = csc.get_slot_to_elicit()
             if verbose:
-                print('\n')
+                self.__print_turn(before_message, ci.send, use_tts, out)
+            plan = ci.get_plan()
+            if DEBUG:
+                print('** expected_result={}'.format(ci.receive))
+                print('Sending: {}'.format(ci.send))
+            response = yield ci
+            if coverage is not None:
+                coverage.record_turn(csc, before_intent_name, before_dialog_state, key)
+            slots = csc.get_slots()
+            if DEBUG:
+                print('\tslots={}'.format(slots))
+                print(response)
+            plan.match(ci.send, response, csc.get_intent_name(), csc.get_dialog_state(), slots, before_dialog_state,
+                       before_slots, slot_to_elicit, before_intent_name)
+        if verbose:
+            print('\n', file=out)
 
     def conversations_text_helper(self, bot_alias, bot_name, user_id, conversation_definition, verbose=VERBOSE,
-                                  use_tts=False):
-        # type: (str, str, str, dict, bool, bool) -> None
+                                  use_tts=False, processes=None, export_path=None, dry_run=False, coverage=None,
+                                  history=None):
+        # type: (str, str, str, dict, bool, bool, int, str, bool, Coverage, RunHistory) -> ConversationPlan
         """
         Helper method for tests using text conversations.
 
         :param bot_name: the bot name
         :param bot_alias: the bot alias
         :param user_id: the user id
-        :param conversation_definition: the conversation definition list
+        :param conversation_definition: the conversation definition, see :py:class:ConversationPlan
         :param verbose: produce verbose output
         :param use_tts:
+        :param processes: the number of processes the conversations are split across, see
+            :py:meth:conversations_text
+        :param export_path: the Lex export the result classes are created from, instead of requesting the intents
+        :param dry_run: only plan the conversations, printing the plan and the number of requests it would make,
+            including the lex-models requests already made to plan them
+        :param coverage: the :py:class:Coverage where every turn is recorded, with the conversation key, or None
+        :param history: the :py:class:RunHistory selecting the conversations to run, updated with the fingerprints of
+            the intents of the bot, or None to run all of them
+        :return: the plan
+        :raise ValueError: if the definition is not valid for the intents of the bot
+
+        The whole :py:attr:conversation_definition is validated against the intents of the bot and the values are
+        used as arguments to the creation of ConversationItems before any of them is sent.
+
+        Finally, conversation_text() is invoked once with all the conversations.
+        """
+        lmc = LexModelsClient(bot_name, bot_alias, export_path=export_path)
+        plan = ConversationPlan.create(lmc, bot_name, bot_alias, conversation_definition)
+        if history is not None:
+            history.update_fingerprints(lmc.get_intent_fingerprints(bot_name, bot_alias))
+        if dry_run:
+            print(plan)
+            print('Requests: {}'.format(', '.join('{}={}'.format(k, v) for k, v in
+                                                  sorted(plan.get_requests(use_tts, lex_models=lmc.requests).items()))))
+            return plan
+        if plan.conversations:
+            self.conversations_text(bot_name, bot_alias, user_id, plan.conversations, verbose, use_tts,
+                                    processes=processes, coverage=coverage, history=history)
+        return plan
+
 
-        Iterates over the :py:attr:conversation_definition list and if there are matching Intents the conversation
-        definition items are extracted and the values are used as arguments to the creation of ConversationItems.
-
-        Finally, conversation_text() is invoked.
-        """
-        lmc = LexModelsClient(bot_name, bot_alias)
-        conversations = []
-        for i in lmc.get_intents_for_bot():
-            r = lmc.get_result_class_for_intent(i)
-            if i in conversation_definition:
-                c = Conversation()
-                for cdi in conversation_definition[i]:
-                    if len(cdi) != 3:
-                        raise AttributeError('Expected item with len=3 (actual len={})'.format(len(cdi)))
-                    kwargs = {}
-                    for k in cdi[2]:
-                        # in case the slot name has been specified in CamelCase we convert to snake_case here
-                        kwargs[to_snake_case(k)] = cdi[2][k]
-                    rr = r(cdi[1], **kwargs)
-                    ci = ConversationItem(cdi[0], rr)
-                    c.append(ci)
-                conversations.append(c)
-            self.conversations_text(bot_name, bot_alias, user_id, conversations, verbose, use_tts)
+def _run_shard(shard, *args):
+    # module level, so it can be pickled and sent to the pool processes
+    return LexBotTest()._run_shard(shard, *args)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import io
+import json
+import os
+import zipfile
+
+from lex_bot_tester.aws.lex.schemacache import LATEST
+
+
+class LexExport:
+    """
+    Bot and intent definitions read from Lex exports, as downloaded from the URL returned by get_export with
+    exportType LEX.
+
+    The path can be an export zip, the JSON file it contains, or a directory with any number of them. Exports of bots
+    and of single intents are accepted.
+    """
+
+    def __init__(self, path):
+        # type: (str) -> None
+        """
+        :param path: the path of the export file or directory
+        :raise ValueError: if no bot or intent definition is found
+        """
+        self.path = path
+        self.bots = {}
+        self.intents = {}
+        for document in LexExport.__read(path):
+            self.__add(document.get('resource', document))
+        if not self.bots and not self.intents:
+            raise ValueError('No Lex bot or intent definitions in {}'.format(path))
+
+    @staticmethod
+    def __read(path):
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.json') or name.endswith('.zip'):
+                    for document in LexExport.__read(os.path.join(path, name)):
+                        yield document
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as z:
+                for name in sorted(z.namelist()):
+                    if name.endswith('.json'):
+                        with z.open(name) as f:
+                            yield json.load(io.TextIOWrapper(f, encoding='utf-8'))
+        else:
+            with open(path) as f:
+                yield json.load(f)
+
+    def __add(self, resource):
+        if 'intents' in resource:
+            self.bots[resource['name']] = resource
+            for intent in resource['intents']:
+                self.__add(intent)
+        elif 'name' in resource:
+            intent = dict(resource)
+            intent.setdefault('version', LATEST)
+            intent.setdefault('slots', [])
+            self.intents[intent['name']] = intent
+
+    def get_bot(self, name):
+        # type: (str) -> dict
+        """
+        Gets the bot in the same form get_bot returns it.
+
+        :param name: the bot name
+        :return: the bot or None if not exported
+        """
+        resource = self.bots.get(name)
+        if resource is None:
+            return None
+        return {
+            'name': resource['name'],
+            'version': resource.get('version', LATEST),
+            'checksum': resource.get('checksum'),
+            'intents': [{'intentName': i['name'], 'intentVersion': i.get('version', LATEST)} for i in
+                        resource['intents']],
+        }
+
+    def get_intent(self, name):
+        # type: (str) -> dict
+        """
+        Gets the intent in the same form get_intent returns it.
+
+        :param name: the intent name
+        :return: the intent or None if not exported
+        """
+        return self.intents.get(name)
@@ -18,39 +18,70 @@
 """
 from __future__ import print_function
 
+import hashlib
+import json
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import boto3
-
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.lexexport import LexExport
 from lex_bot_tester.aws.lex.resultbase import ResultBase
+from lex_bot_tester.aws.lex.schemacache import SCHEMA_CACHE, LATEST, SchemaCache
+from lex_bot_tester.aws.retry import RetryPolicy
 from lex_bot_tester.util.conversion import to_snake_case
+from lex_bot_tester.util.timing import TIMINGS
 
 DEBUG = False
+MAX_WORKERS = 8
+
+
+# The classes created by class_factory, by bot, class name and slot names
+RESULT_CLASSES = {}
 
 
-def class_factory(name, arg_names, base_class=ResultBase):
+def fingerprint_name(bot_name, bot_alias, intent_name):
+    """
+    Gets the name of the fingerprint of the intent, see :py:meth:LexModelsClient.get_intent_fingerprints, qualified
+    by the bot and alias as the same intent name may have different definitions in other bots or aliases.
+    """
+    return '{}:{}:{}'.format(bot_name, bot_alias, intent_name)
+
+
+def class_factory(name, arg_names, base_class=ResultBase, bot_name=None):
     """
     Class factory.
 
+    The classes have empty __slots__, the values are kept by :py:class:ResultBase, so the instances have a fixed layout
+    without __dict__ and any slot name is valid. They are cached, the same class is returned for the same bot, name and
+    arguments.
+
     Credit: https://stackoverflow.lex_bot_tester/questions/15247075/how-can-i-dynamically-create-derived-classes-from-a-base-class
 
     :param name: the class name
     :param arg_names: the name of the arguments accepted by newly created class
     :param base_class: the base class
+    :param bot_name: the name of the bot the class is created for
     :return: the newly created class
     """
+    key = (bot_name, name, tuple(arg_names), base_class)
+    cls = RESULT_CLASSES.get(key)
+    if cls is not None:
+        return cls
 
     def __init__(self, dialog_state, **kwargs):
-        for key, value in kwargs.items():
+        for key in kwargs:
             # here, the arg_names variable is the one passed to the class_factory() call
             if key not in arg_names:
                 raise TypeError(
                     "Argument {} not valid for {}. Should be one of {}".format(key, self.__class__.__name__, arg_names))
-            setattr(self, key, value)
         base_class.__init__(self, name[:-len("Class")], name[:-len('Result')], dialog_state, **kwargs)
 
-    new_class = type(str(name), (base_class,), {"__init__": __init__})
-    return new_class
+    new_class = type(str(name), (base_class,), {"__init__": __init__, "__slots__": (),
+                                                "_arg_names": list(arg_names), "_bot_name": bot_name})
+    # if other thread created it in the meantime, keep that one
+    return RESULT_CLASSES.setdefault(key, new_class)
 
 
 class LexModelsClient:
@@ -58,8 +89,43 @@ class LexModelsClient:
     AWS Lex Models Client.
     """
 
-    def __init__(self, bot_name=None, bot_alias=None):
-        self.__client = boto3.client('lex-models')
+    def __init__(self, bot_name=None, bot_alias=None, region_name=None, profile_name=None, schema_cache=None,
+                 max_workers=MAX_WORKERS, retry_policy=None, timings=None, export_path=None):
+        """
+        Creates the client.
+
+        When :py:attr:export_path is set, the bots and intents are read from the Lex export, no request is made to
+        create the result classes and no AWS configuration is needed.
+
+        :param bot_name: the bot name, to create its result classes
+        :param bot_alias: the bot alias
+        :param region_name: the region, or None to use the configured one
+        :param profile_name: the profile, or None to use the default one
+        :param schema_cache: the :py:class:SchemaCache, or None to use the default one
+        :param max_workers: the maximum number of intents requested at the same time
+        :param retry_policy: the :py:class:RetryPolicy, or None to create one
+        :param timings: the :py:class:Timings where the setup time and the latency of the requests are recorded, or
+            None to use the default ones
+        :param export_path: the path of a Lex export zip, its JSON file or a directory containing them, see
+            :py:class:LexExport
+        """
+        self.__region_name = region_name
+        self.__profile_name = profile_name
+        self.__client = None
+        self.__export = None
+        if export_path is not None:
+            self.__export = LexExport(export_path)
+            # the export is the only source, nothing to cache
+            schema_cache = SchemaCache()
+        self.__schema_cache = schema_cache if schema_cache is not None else SCHEMA_CACHE
+        self.max_workers = max_workers
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.timings = timings if timings is not None else TIMINGS
+        self.setup_time = None
+        # the get_bot and get_intent requests made, retries not included
+        self.requests = 0
+        self.__requests_lock = threading.Lock()
+        self.__bots = {}
         self.__result_classes = {}
         if bot_name is not None and bot_alias is not None:
             # If bot_name and bot_alias were given to the constructor we can create the result classes
@@ -69,21 +135,108 @@ class LexModelsClient:
         elif bot_name is not None or bot_alias is not None:
             raise RuntimeError('bot_name and bot_alias should be != None')
 
-    def get_bots(self):
-        return self.__client.get_bots()['bots']
+    def __get_client(self):
+        if self.__client is None:
+            self.__client = ClientRegistry.get_client('lex-models', self.__region_name, self.__profile_name,
+                                                      self.max_workers)
+        return self.__client
+
+    def get_bots(self, name_contains=None):
+        return list(self.iter_bots(name_contains))
+
+    def iter_bots(self, name_contains=None, max_results=None, prefetch=True):
+        """
+        Iterates over all the bots, following the pagination.
+
+        :param name_contains: only the bots whose name contains this substring, filtered by the service
+        :param max_results: the page size, or None for the service default
+        :param prefetch: request the next page while the current one is being iterated
+        :return: a generator of the bot metadata
+        """
+        return self.__iter_pages(self.__get_client().get_bots, 'bots', name_contains, max_results, prefetch)
+
+    def get_bot(self, bot_name, bot_alias):
+        """
+        Gets the bot, as resolved for the alias.
+        It's requested once per client, so its checksum and version are the ones the result classes are built from.
+        """
+        key = (bot_name, bot_alias)
+        if key not in self.__bots:
+            if self.__export is not None:
+                b = self.__export.get_bot(bot_name)
+                if b is None:
+                    raise ValueError('Bot {} not found in export {}'.format(bot_name, self.__export.path))
+                self.__bots[key] = b
+            else:
+                self.__bots[key] = self.__request(
+                    lambda: self.__get_client().get_bot(name=bot_name, versionOrAlias=bot_alias), bot=bot_name,
+                    alias=bot_alias)
+        return self.__bots[key]
+
+    def get_intent(self, name, version=LATEST):
+        if self.__export is not None:
+            intent = self.__export.get_intent(name)
+            if intent is None:
+                raise ValueError('Intent {} not found in export {}'.format(name, self.__export.path))
+            return intent
+        intent = self.__schema_cache.get_intent(name, version)
+        if intent is None:
+            intent = self.__request(lambda: self.__get_client().get_intent(name=name, version=version), intent=name)
+            self.__schema_cache.put_intent(intent)
+        return intent
+
+    def __request(self, call, **tags):
+        with self.__requests_lock:
+            self.requests += 1
+        with self.timings.time('lex_models_request', **tags):
+            return self.retry_policy.call(call, idempotent=True)
+
+    def get_intents(self, name_contains=None):
+        return list(self.iter_intents(name_contains))
+
+    def iter_intents(self, name_contains=None, max_results=None, prefetch=True):
+        """
+        Iterates over all the intents, following the pagination.
 
-    def get_intent(self, name, version='$LATEST'):
-        return self.__client.get_intent(name=name, version=version)
+        :param name_contains: only the intents whose name contains this substring, filtered by the service
+        :param max_results: the page size, or None for the service default
+        :param prefetch: request the next page while the current one is being iterated
+        :return: a generator of the intent metadata
+        """
+        return self.__iter_pages(self.__get_client().get_intents, 'intents', name_contains, max_results, prefetch)
 
-    def get_intents(self):
-        return self.__client.get_intents()['intents']
+    def __iter_pages(self, method, key, name_contains, max_results, prefetch):
+        kwargs = {}
+        if name_contains is not None:
+            kwargs['nameContains'] = name_contains
+        if max_results is not None:
+            kwargs['maxResults'] = max_results
+
+        def fetch(token):
+            args = dict(kwargs, nextToken=token) if token else kwargs
+            return self.retry_policy.call(lambda: method(**args), idempotent=True)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            response = fetch(None)
+            while True:
+                token = response.get('nextToken')
+                following = executor.submit(fetch, token) if token and executor else None
+                for item in response.get(key, []):
+                    yield item
+                if not token:
+                    return
+                response = following.result() if following else fetch(token)
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
 
     def get_intents_for_bot(self, bot_name=None, bot_alias=None):
         if bot_name is None:
             bot_name = self.__bot_name
         if bot_alias is None:
             bot_alias = self.__bot_alias
-        b = self.__client.get_bot(name=bot_name, versionOrAlias=bot_alias)
+        b = self.get_bot(bot_name, bot_alias)
         intents = b['intents']
         li = []
         for i in intents:
@@ -93,28 +246,124 @@ class LexModelsClient:
             li.append(intent_name)
         return li
 
+    def get_intents_schemas(self, bot_name, bot_alias):
+        """
+        Gets the definitions of the intents of the bot, in the versions used by the alias.
+
+        They come from the schema cache if the bot checksum and version didn't change, otherwise only the intents not
+        in the cache are requested.
+
+        :return: the list of intent definitions
+        """
+        return self.__load_schemas([(bot_name, bot_alias)])[(bot_name, bot_alias)]
+
+    def get_intent_fingerprints(self, bot_name, bot_alias):
+        """
+        Gets the fingerprint of every intent of the bot, in the versions used by the alias, changing whenever the
+        intent definition changes, see :py:class:RunHistory.
+
+        The intents without checksum, i.e. the ones read from a Lex export, are fingerprinted by a digest of their
+        definition.
+
+        :return: a dict of the intent name, qualified by :py:func:fingerprint_name, to its version and checksum
+        """
+        def checksum(i):
+            if i.get('checksum'):
+                return i['checksum']
+            return hashlib.sha1(json.dumps(i, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+        return dict((fingerprint_name(bot_name, bot_alias, i['name']), '{}:{}'.format(i.get('version', LATEST),
+                                                                                       checksum(i)))
+                    for i in self.get_intents_schemas(bot_name, bot_alias))
+
+    def __load_schemas(self, bots, on_intent=None):
+        """
+        Gets the definitions of the intents of the bots, requesting the ones not in the cache concurrently.
+        An intent used by more than one bot is requested once.
+
+        :param bots: the list of (bot name, bot alias)
+        :param on_intent: invoked with the bot name and the intent definition as soon as each one is available
+        :return: a dict of (bot name, bot alias) to the list of intent definitions
+        """
+        schemas = {}
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            responses = dict(zip(bots, executor.map(lambda ba: self.get_bot(*ba), bots)))
+            futures = {}
+            for bot_name, bot_alias in bots:
+                b = responses[(bot_name, bot_alias)]
+                intents = self.__schema_cache.get_bot(bot_name, bot_alias, b.get('checksum'), b.get('version'))
+                if intents is not None:
+                    schemas[(bot_name, bot_alias)] = intents
+                    if on_intent:
+                        for intent in intents:
+                            on_intent(bot_name, intent)
+                    continue
+                schemas[(bot_name, bot_alias)] = [None] * len(b['intents'])
+                for index, i in enumerate(b['intents']):
+                    intent_key = (i['intentName'], i.get('intentVersion', LATEST))
+                    f = futures.get(intent_key)
+                    if f is None:
+                        if intent_key[1] == LATEST:
+                            # the bot changed, and its $LATEST intents may have changed with it
+                            self.__schema_cache.evict_intent(*intent_key)
+                        f = futures[intent_key] = executor.submit(self.get_intent, *intent_key)
+                        pending[f] = []
+                    pending[f].append((bot_name, bot_alias, index))
+            for f in as_completed(pending):
+                intent = f.result()
+                for bot_name, bot_alias, index in pending[f]:
+                    schemas[(bot_name, bot_alias)][index] = intent
+                    if on_intent:
+                        on_intent(bot_name, intent)
+        fetched = set((bot_name, bot_alias) for waiting in pending.values() for bot_name, bot_alias, _ in waiting)
+        for bot_name, bot_alias in fetched:
+            b = responses[(bot_name, bot_alias)]
+            self.__schema_cache.put_bot(bot_name, bot_alias, b.get('checksum'), b.get('version'),
+                                        schemas[(bot_name, bot_alias)])
+        return schemas
+
     def create_result_classes(self, bot_name, bot_alias):
-        intent_names = self.get_intents_for_bot(bot_name, bot_alias)
-        for ina in intent_names:
-            intent = self.get_intent(ina)
-            intent_name = intent['name']
-            if type(intent_name) == bytes:
-                intent_name = intent_name.decode()
-            result_name = intent_name + 'Result'
-            slots = intent['slots']
-            if DEBUG:
-                for s in slots:
-                    print('>>>>>>> name = {} {} {}'.format(s['name'], type(s['name']),
-                                                           s['name'].encode('ascii', 'ignore'),
-                                                           type((s['name'].encode('ascii', 'ignore')))))
-            slot_names = [to_snake_case(s['name'].encode('ascii', 'ignore')) for s in slots]
-            if bot_name not in self.__result_classes:
-                self.__result_classes[bot_name] = {}
-            self.__result_classes[bot_name][result_name] = class_factory(result_name, slot_names)
+        self.create_result_classes_for_bots([(bot_name, bot_alias)])
+
+    def create_result_classes_for_bots(self, bots):
+        """
+        Creates the result classes of the intents of all the bots.
+        The intents are requested concurrently and each class is created as soon as its intent is received.
+
+        :param bots: the list of (bot name, bot alias)
+        """
+        start = time.perf_counter()
+        bots = list(dict.fromkeys(bots))
+        self.__load_schemas(bots, self.__create_result_class)
+        self.setup_time = time.perf_counter() - start
+        self.timings.record('lex_models_setup', self.setup_time,
+                            bot=bots[0][0] if len(bots) == 1 else None, alias=bots[0][1] if len(bots) == 1 else None)
+        if DEBUG:
+            print('DEBUG: created result classes for {} in {:.2f}s ({})'.format(bots, self.setup_time,
+                                                                              self.retry_policy.stats))
+
+    def __create_result_class(self, bot_name, intent):
+        intent_name = intent['name']
+        if type(intent_name) == bytes:
+            intent_name = intent_name.decode()
+        result_name = intent_name + 'Result'
+        slots = intent.get('slots', [])
+        if DEBUG:
+            for s in slots:
+                print('>>>>>>> name = {} {} {}'.format(s['name'], type(s['name']),
+                                                       s['name'].encode('ascii', 'ignore'),
+                                                       type((s['name'].encode('ascii', 'ignore')))))
+        slot_names = [to_snake_case(s['name'].encode('ascii', 'ignore')) for s in slots]
+        if bot_name not in self.__result_classes:
+            self.__result_classes[bot_name] = {}
+        self.__result_classes[bot_name][result_name] = class_factory(result_name, slot_names, bot_name=bot_name)
 
     def get_result_class_name(self, intent_name):
-        intent = self.get_intent(intent_name)
-        return intent['name'] + 'Result'
+        # the intent name is the one in the bot definition, no need to request the intent
+        if type(intent_name) == bytes:
+            intent_name = intent_name.decode()
+        return intent_name + 'Result'
 
     def get_results(self, bot_name):
         return self.__result_classes[bot_name]
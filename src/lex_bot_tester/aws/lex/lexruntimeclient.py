@@ -16,11 +16,16 @@
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+import hashlib
 
-import boto3
-from six import string_types
+from botocore.exceptions import ClientError
 
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.cassette import Cassette
+from lex_bot_tester.aws.lex.turnresult import TurnResult
 from lex_bot_tester.aws.polly.pollyclient import PollyClient
+from lex_bot_tester.aws.retry import RetryPolicy, RetryStats, get_error_code
+from lex_bot_tester.util.timing import TIMINGS, Transport
 
 
 class DialogState:
@@ -32,18 +37,106 @@ class DialogState:
     FAILED = 'Failed'
 
 
+USER_ID_MAX_LEN = 100
+
+# The values of the get_session response put_session restores
+SESSION_KEYS = ('sessionAttributes', 'dialogAction', 'recentIntentSummaryView', 'activeContexts')
+
+
+def derive_user_id(user_id, *parts):
+    # type: (str, object) -> str
+    """
+    Derives a user id from :py:attr:user_id and :py:attr:parts.
+
+    The same arguments always produce the same user id, so conversations running concurrently can use isolated Lex
+    sessions and still be identified on every run.
+    If the result exceeds the length accepted by Lex it is replaced by its SHA-1 digest.
+
+    :param user_id: the base user id
+    :param parts: the parts identifying the session, i.e. the conversation index
+    :return: the derived user id
+    """
+    derived = '-'.join([user_id] + [str(p) for p in parts])
+    if len(derived) > USER_ID_MAX_LEN:
+        derived = hashlib.sha1(derived.encode('utf-8')).hexdigest()
+    return derived
+
+
+def without_none(value):
+    """
+    Removes the None values of the dicts in the value, recursively.
+    """
+    if isinstance(value, dict):
+        return dict((k, without_none(v)) for k, v in value.items() if v is not None)
+    if isinstance(value, list):
+        return [without_none(v) for v in value]
+    return value
+
+
+class SessionSnapshot(object):
+    """
+    The state of a conversation after a turn: the Lex session, as returned by get_session, and what the client knows
+    about the last turn, its :py:class:TurnResult.
+    """
+
+    __slots__ = ('session', 'turn_result', 'history')
+
+    def __init__(self, session, turn_result, history):
+        self.session = session
+        self.turn_result = turn_result
+        self.history = history
+
+
 class LexRuntimeClient:
     """
     Lex Runtime Client.
     """
 
-    def __init__(self, bot_name, bot_alias, user_id):
-        self.__client = boto3.client('lex-runtime')
-        self.__polly = PollyClient()
+    def __init__(self, bot_name, bot_alias, user_id, region_name=None, profile_name=None, concurrency=None,
+                 audio_cache=None, polly_client=None, cassette=None, retry_policy=None, timings=None):
+        """
+        Creates the client.
+        The underlying boto3 clients are shared through the :py:class:ClientRegistry.
+
+        :param bot_name: the bot name
+        :param bot_alias: the bot alias
+        :param user_id: the user id
+        :param region_name: the region, or None to use the configured one
+        :param profile_name: the profile, or None to use the default one
+        :param concurrency: the number of clients expected to be used at the same time
+        :param audio_cache: the :py:class:AudioCache for the speech sent by :py:meth:post_text_to_speech, or None
+        :param polly_client: the :py:class:PollyClient to use, which may be shared with other clients, instead of
+            creating a new one
+        :param cassette: the :py:class:Cassette recording or replaying the responses, or None
+        :param retry_policy: the :py:class:RetryPolicy, which may be shared with other clients, or None to create one
+        :param timings: the :py:class:Timings where the latency of the requests is recorded, or None to use the
+            default ones
+        """
+        self.__region_name = region_name
+        self.__profile_name = profile_name
+        self.__concurrency = concurrency
+        self.__client = None
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.timings = timings if timings is not None else TIMINGS
+        if polly_client is None:
+            polly_client = PollyClient(region_name, profile_name, concurrency, audio_cache, self.retry_policy,
+                                       self.timings)
+        self.__polly = polly_client
         self.bot_name = bot_name
         self.bot_alias = bot_alias
         self.user_id = user_id
+        self.cassette = cassette
+        self.__history = []
+        # the last response, without its ResponseMetadata, and the values the assertions need
         self.__response = None
+        self.__turn_result = None
+
+    def __get_client(self):
+        # obtained on demand, so replaying a cassette needs no AWS configuration at all
+        if self.__client is None:
+            self.__client = ClientRegistry.get_client('lex-runtime', self.__region_name, self.__profile_name,
+                                                      self.__concurrency)
+        return self.__client
 
     def post_text(self, text, request_attributes=None, session_attributes=None):
         """
@@ -59,46 +152,64 @@ class LexRuntimeClient:
             request_attributes = {}
         if session_attributes is None:
             session_attributes = {}
-        self.__response = self.__client.post_text(
+        return self.__call(text, Transport.TEXT, lambda: self.__get_client().post_text(
             botName=self.bot_name,
             botAlias=self.bot_alias,
             userId=self.user_id,
             sessionAttributes=session_attributes,
             requestAttributes=request_attributes,
             inputText=text
-        )
-        return self.__response
+        ))
 
     def post_text_to_speech(self, text, request_attributes=None, session_attributes=None):
         """
+        Post the speech synthesized from the text.
+
+        The audio is streamed from Polly, or the audio cache, into the request body without reading it into memory.
 
-        :param text:
-        :param request_attributes:
-        :param session_attributes:
-        :return:
+        :param text: the text to synthesize and post
+        :param request_attributes: the request attributes if any
+        :param session_attributes: the session attributes if any
+        :return: the response from the server
         """
-        speech = self.__polly.synthesize_speech(text)['AudioStream'].read()
-        self.__response = self.post_content('audio/l16; rate=16000; channels=1', speech, 'text/plain; charset=utf-8',
-                                            request_attributes,
-                                            session_attributes)
-        return self.__response
+
+        def post():
+            speech = self.__polly.get_speech_stream(text)
+            try:
+                return self.__post_content('audio/l16; rate=16000; channels=1', speech, 'text/plain; charset=utf-8',
+                                           request_attributes, session_attributes)
+            finally:
+                if hasattr(speech, 'close'):
+                    speech.close()
+
+        return self.__call(['speech', text], Transport.TTS, post)
 
     def post_content(self, content_type, input_stream, accept, request_attributes=None,
                      session_attributes=None):
         """
+        Post content.
 
-        :param content_type:
-        :param input_stream:
-        :param accept:
-        :param request_attributes:
-        :param session_attributes:
-        :return:
+        :param content_type: the content type of the input stream
+        :param input_stream: the input, bytes or a file-like object
+        :param accept: the content type accepted in the response
+        :param request_attributes: the request attributes if any
+        :param session_attributes: the session attributes if any
+        :return: the response from the server
         """
+        request_input = None
+        if self.cassette is not None:
+            if not isinstance(input_stream, (bytes, bytearray)):
+                raise RuntimeError('Only bytes content can be recorded or replayed')
+            request_input = ['content', content_type, hashlib.sha1(input_stream).hexdigest()]
+        return self.__call(request_input, Transport.TTS, lambda: self.__post_content(
+            content_type, input_stream, accept, request_attributes, session_attributes))
+
+    def __post_content(self, content_type, input_stream, accept, request_attributes, session_attributes):
         if request_attributes is None:
             request_attributes = {}
         if session_attributes is None:
             session_attributes = {}
-        self.__response = self.__client.post_content(
+        return self.__get_client().post_content(
             botName=self.bot_name,
             botAlias=self.bot_alias,
             userId=self.user_id,
@@ -108,41 +219,156 @@ class LexRuntimeClient:
             inputStream=input_stream,
             accept=accept
         )
-        return self.__response
+
+    def __call(self, request_input, transport, request):
+        """
+        Invokes the request, or answers it from the :py:attr:cassette, and parses the response.
+
+        :param request_input: the input identifying the request in the cassette
+        :param transport: the :py:class:Transport used, to tag the timings
+        :param request: the function invoking the service
+        :return: the response
+        """
+        if self.cassette is None:
+            response = self.__timed(transport, request)
+        else:
+            key = Cassette.key(self.bot_name, self.bot_alias, self.__history, request_input)
+            if self.cassette.is_replaying():
+                response = self.cassette.get(key, 'input={} history={}'.format(request_input, self.__history))
+            else:
+                response = self.__timed(transport, request)
+                self.cassette.put(key, response)
+            self.__history.append(request_input)
+        self.__response = dict((k, v) for k, v in response.items() if k != 'ResponseMetadata')
+        self.__turn_result = TurnResult(response)
+        return response
+
+    def __timed(self, transport, request):
+        with self.timings.time('lex_runtime_request', bot=self.bot_name, alias=self.bot_alias,
+                               transport=transport) as tags:
+            response = self.retry_policy.call(request)
+            tags['intent'] = response.get('intentName')
+            tags['dialog_state'] = response.get('dialogState')
+            return response
+
+    def get_session(self):
+        # type: () -> dict
+        """
+        Gets the Lex session of the user id.
+
+        :return: the get_session response, without its metadata
+        """
+        with self.timings.time('lex_runtime_session_request', bot=self.bot_name, alias=self.bot_alias):
+            response = self.retry_policy.call(lambda: self.__get_client().get_session(
+                botName=self.bot_name,
+                botAlias=self.bot_alias,
+                userId=self.user_id
+            ), idempotent=True)
+        return dict((k, v) for k, v in response.items() if k != 'ResponseMetadata')
+
+    def put_session(self, session):
+        # type: (dict) -> None
+        """
+        Puts the Lex session of the user id, replacing the current one.
+
+        :param session: the session, as returned by :py:meth:get_session, usually for another user id
+        """
+        # get_session returns the slots without value as null, which put_session doesn't accept
+        kwargs = dict((k, without_none(session[k])) for k in SESSION_KEYS if session.get(k))
+        with self.timings.time('lex_runtime_session_request', bot=self.bot_name, alias=self.bot_alias):
+            response = self.retry_policy.call(lambda: self.__get_client().put_session(
+                botName=self.bot_name,
+                botAlias=self.bot_alias,
+                userId=self.user_id,
+                accept='text/plain; charset=utf-8',
+                **kwargs
+            ), idempotent=True)
+        if response.get('audioStream') is not None:
+            response['audioStream'].close()
+
+    def delete_session(self):
+        """
+        Deletes the Lex session of the user id, if there's one.
+        """
+        with self.timings.time('lex_runtime_session_request', bot=self.bot_name, alias=self.bot_alias):
+            try:
+                self.retry_policy.call(lambda: self.__get_client().delete_session(
+                    botName=self.bot_name,
+                    botAlias=self.bot_alias,
+                    userId=self.user_id
+                ), idempotent=True)
+            except ClientError as ex:
+                if get_error_code(ex) != 'NotFoundException':
+                    raise
+
+    def snapshot(self):
+        # type: () -> SessionSnapshot
+        """
+        Takes a snapshot of the conversation, to be restored by :py:meth:restore on any client of the same bot.
+        The Lex session is not requested when replaying a :py:attr:cassette or before the first turn.
+        """
+        replaying = self.cassette is not None and self.cassette.is_replaying()
+        session = None if replaying or self.__turn_result is None else self.get_session()
+        return SessionSnapshot(session, self.__turn_result, list(self.__history))
+
+    def restore(self, snapshot):
+        # type: (SessionSnapshot) -> None
+        """
+        Restores the snapshot, so the conversation continues from there using this client's user id.
+        A snapshot taken before the first turn deletes the session.
+
+        :param snapshot: the snapshot taken by :py:meth:snapshot
+        """
+        if self.cassette is None or not self.cassette.is_replaying():
+            if snapshot.session is not None:
+                self.put_session(snapshot.session)
+            elif snapshot.turn_result is None:
+                self.delete_session()
+        # the snapshots keep only the turn result
+        self.__response = None
+        self.__turn_result = snapshot.turn_result
+        self.__history = list(snapshot.history)
+
+    def get_retry_stats(self):
+        # type: () -> RetryStats
+        """
+        Gets the retry counters, which include the retries of the Polly client if it shares the policy.
+        """
+        return self.retry_policy.stats
+
+    def get_turn_result(self):
+        # type: () -> TurnResult
+        """
+        Gets the result of the last turn.
+
+        :return: the :py:class:TurnResult or None if nothing has been posted yet
+        """
+        return self.__turn_result
 
     def get_slots(self):
-        if self.__response is None:
+        if self.__turn_result is None:
             return None
-        slots = self.__response['slots']
-        for k in slots:
-            v = slots[k]
-            if isinstance(v, string_types):
-                slots[k] = v.lower()
-        return slots
+        return self.__turn_result.slots
 
     def get_slot(self, name):
         if name is not None:
-            return self.get_slots()[name]
+            return self.__turn_result.get_slot(name)
         return None
 
     def get_intent_name(self):
-        return self.__response['intentName']
+        if self.__turn_result is None:
+            return None
+        return self.__turn_result.intent_name
 
     def get_dialog_state(self):
-        if self.__response is None:
-            return None
-        try:
-            return self.__response['dialogState']
-        except KeyError:
+        if self.__turn_result is None:
             return None
+        return self.__turn_result.dialog_state
 
     def get_message(self):
-        if self.__response is None:
-            return None
-        try:
-            return self.__response['message']
-        except KeyError:
+        if self.__turn_result is None:
             return None
+        return self.__turn_result.message
 
     def get_slot_to_elicit(self):
         """
@@ -151,15 +377,19 @@ class LexRuntimeClient:
 
         :return: the slot name or None
         """
-        if self.__response is None:
-            return None
-        try:
-            return self.__response['slotToElicit']
-        except KeyError:
+        if self.__turn_result is None:
             return None
+        return self.__turn_result.slot_to_elicit
 
     def get_response(self):
+        # type: () -> dict
+        """
+        Gets the last response, without its ResponseMetadata.
+        Use :py:meth:get_turn_result for the values the assertions need.
+
+        :return: the response or None if nothing has been posted yet, or since a snapshot was restored
+        """
         return self.__response
 
     def get_session_attributes(self):
-        return self.__response['sessionAttributes']
+        return self.__turn_result.session_attributes
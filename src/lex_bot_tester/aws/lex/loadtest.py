@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from __future__ import print_function
+
+import threading
+import time
+
+from lex_bot_tester.aws.lex.lexruntimeclient import LexRuntimeClient, derive_user_id
+from lex_bot_tester.aws.polly.pollyclient import PollyClient
+from lex_bot_tester.aws.retry import RetryPolicy, get_error_code
+from lex_bot_tester.util.histogram import Histogram
+from lex_bot_tester.util.timing import TIMINGS, Transport
+
+
+class LoadTestReport:
+    """
+    Results of a :py:class:LoadTest run.
+    Latencies are kept in :py:class:Histogram, so long runs need no more memory than short ones.
+    Turns and errors are counted by the dialog state expected for the turn, not the one received, as a failed turn may
+    not have received any.
+    :py:attr:start and :py:attr:end are :py:func:time.monotonic times.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.start = None
+        self.end = None
+        self.conversations = 0
+        self.by_turn = {}
+        self.by_intent = {}
+        # [turns, errors] by expected dialog state
+        self.by_dialog_state = {}
+        self.errors = {}
+
+    def add_conversation(self):
+        with self.__lock:
+            self.conversations += 1
+
+    def add_turn(self, turn, intent_name, dialog_state, latency, error=None):
+        """
+        Adds the result of one turn.
+
+        :param turn: the index of the turn in the conversation
+        :param intent_name: the expected intent
+        :param dialog_state: the expected dialog state
+        :param latency: the latency in seconds
+        :param error: the error description if the turn failed, None otherwise
+        """
+        with self.__lock:
+            for groups, k in ((self.by_turn, turn), (self.by_intent, intent_name)):
+                h = groups.get(k)
+                if h is None:
+                    h = groups[k] = Histogram()
+                h.record(latency)
+            counts = self.by_dialog_state.setdefault(dialog_state, [0, 0])
+            counts[0] += 1
+            if error is not None:
+                counts[1] += 1
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+    def get_turns(self):
+        return sum(h.count for h in self.by_turn.values())
+
+    def get_elapsed(self):
+        return (self.end or time.monotonic()) - self.start
+
+    def get_throughput(self):
+        """
+        Gets the throughput in turns per second.
+        """
+        elapsed = self.get_elapsed()
+        return self.get_turns() / elapsed if elapsed > 0 else 0.0
+
+    def get_error_rates(self):
+        """
+        Gets the error rate for each expected dialog state, the one of the turn in the conversation.
+        """
+        return dict((k, float(v[1]) / v[0]) for k, v in self.by_dialog_state.items())
+
+    def __str__(self):
+        s = 'Load test: {} conversations, {} turns in {:.1f}s, {:.2f} turns/s\n'.format(
+            self.conversations, self.get_turns(), self.get_elapsed(), self.get_throughput())
+        for title, groups in (('turn', self.by_turn), ('intent', self.by_intent)):
+            s += '{:>20} {:>8} {:>9} {:>9} {:>9} {:>9}\n'.format(title, 'count', 'p50', 'p90', 'p99', 'max')
+            for k in sorted(groups, key=str):
+                h = groups[k]
+                s += '{:>20} {:>8} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}\n'.format(
+                    str(k), h.count, h.get_percentile(50), h.get_percentile(90), h.get_percentile(99), h.get_max())
+        s += '{:>20} {:>8} {:>9}\n'.format('expected state', 'turns', 'errors')
+        for k in sorted(self.by_dialog_state, key=str):
+            turns, errors = self.by_dialog_state[k]
+            s += '{:>20} {:>8} {:>8.2f}%\n'.format(str(k), turns, 100.0 * errors / turns)
+        for k in sorted(self.errors):
+            s += '{:>8} {}\n'.format(self.errors[k], k)
+        return s
+
+
+class LoadTest:
+    """
+    Load test replaying conversations as virtual users.
+
+    Every virtual user loops over the conversations, each one in a new Lex session, until the duration is reached.
+    Users are started evenly along the ramp up time.
+    For every turn the latency is measured and the intent and dialog state checked against the expected ones.
+
+    Throttled turns are not retried by default, they are counted as errors, so the latencies measure the bot and not
+    the backoff. When a :py:attr:retry_policy retrying them is given, the latencies include the backoff and the
+    retries are counted in its stats.
+    """
+
+    def __init__(self, bot_name, bot_alias, user_id, conversations, users=10, ramp_up=0.0, duration=60.0,
+                 think_time=0.0, iterations=None, use_tts=False, audio_cache=None, region_name=None,
+                 profile_name=None, timings=None, retry_policy=None):
+        # type: (str, str, str, list, int, float, float, float, int, bool, AudioCache, str, str, Timings, RetryPolicy) -> None
+        """
+        :param bot_name: the bot name
+        :param bot_alias: the bot alias
+        :param user_id: the base user id, each virtual user and iteration derive its own
+        :param conversations: the list of conversations
+        :param users: the number of virtual users
+        :param ramp_up: the time, in seconds, to start all the virtual users
+        :param duration: the duration of the test, in seconds, including the ramp up
+        :param think_time: the time, in seconds, a virtual user waits between turns
+        :param iterations: the maximum number of times each virtual user runs the conversations, or None to run them
+        until the duration is reached
+        :param use_tts: whether to use TTS
+        :param audio_cache: the :py:class:AudioCache for the synthesized speech when :py:attr:use_tts, or None
+        :param region_name: the region name
+        :param profile_name: the profile name
+        :param timings: the :py:class:Timings where the latencies are also recorded, or None to use the default ones
+        :param retry_policy: the :py:class:RetryPolicy of the requests, or None not to retry them
+        """
+        self.bot_name = bot_name
+        self.bot_alias = bot_alias
+        self.user_id = user_id
+        self.conversations = conversations
+        self.users = users
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.think_time = think_time
+        self.iterations = iterations
+        self.use_tts = use_tts
+        self.region_name = region_name
+        self.profile_name = profile_name
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy(max_attempts=1)
+        self.timings = timings if timings is not None else TIMINGS
+        self.__polly_client = None
+        if use_tts:
+            self.__polly_client = PollyClient(region_name=region_name, profile_name=profile_name, concurrency=users,
+                                              audio_cache=audio_cache, retry_policy=self.retry_policy,
+                                              timings=self.timings)
+
+    def run(self, verbose=False):
+        # type: (bool) -> LoadTestReport
+        """
+        Runs the load test.
+
+        :param verbose: print the report at the end
+        :return: the :py:class:LoadTestReport
+        """
+        if self.use_tts:
+            self.__polly_client.presynthesize([ci.send for c in self.conversations for ci in c], self.users)
+        report = LoadTestReport()
+        report.start = time.monotonic()
+        deadline = report.start + self.duration
+        threads = []
+        for vu in range(self.users):
+            t = threading.Thread(target=self.__virtual_user, args=(vu, report.start, deadline, report),
+                                 name='vu{}'.format(vu))
+            t.daemon = True
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+        report.end = time.monotonic()
+        if verbose:
+            print(report)
+            print('Retries: {}'.format(self.retry_policy.stats))
+        return report
+
+    def __virtual_user(self, vu, start, deadline, report):
+        if self.users > 1:
+            time.sleep(max(0.0, start + self.ramp_up * vu / self.users - time.monotonic()))
+        iteration = 0
+        session = 0
+        while time.monotonic() < deadline and (self.iterations is None or iteration < self.iterations):
+            for c in self.conversations:
+                if time.monotonic() >= deadline:
+                    return
+                csc = LexRuntimeClient(self.bot_name, self.bot_alias,
+                                       derive_user_id(self.user_id, 'vu{}'.format(vu), session),
+                                       region_name=self.region_name, profile_name=self.profile_name,
+                                       concurrency=self.users, polly_client=self.__polly_client,
+                                       retry_policy=self.retry_policy, timings=self.timings)
+                session += 1
+                self.__conversation(csc, c, deadline, report)
+                report.add_conversation()
+            iteration += 1
+
+    def __conversation(self, csc, conversation, deadline, report):
+        for turn, ci in enumerate(conversation):
+            if turn > 0 and self.think_time:
+                time.sleep(self.think_time)
+            if time.monotonic() >= deadline:
+                return
+            expected = ci.receive
+            error = None
+            t0 = time.perf_counter()
+            try:
+                if self.use_tts:
+                    csc.post_text_to_speech(ci.send)
+                else:
+                    csc.post_text(ci.send)
+            except Exception as ex:
+                # i.e. ThrottlingException, counted apart from the other errors
+                error = get_error_code(ex)
+            latency = time.perf_counter() - t0
+            if error is None:
+                if csc.get_intent_name() != expected.intent_name:
+                    error = 'intent {} != {}'.format(csc.get_intent_name(), expected.intent_name)
+                elif csc.get_dialog_state() != expected.dialog_state:
+                    error = 'dialog state {} != {}'.format(csc.get_dialog_state(), expected.dialog_state)
+            report.add_turn(turn, expected.intent_name, expected.dialog_state, latency, error)
+            self.timings.record('load_test_turn', latency, bot=self.bot_name, alias=self.bot_alias,
+                                intent=expected.intent_name, dialog_state=expected.dialog_state,
+                                transport=Transport.TTS if self.use_tts else Transport.TEXT)
+            if error is not None:
+                # the session is in an unknown state, no point in going on with this conversation
+                return
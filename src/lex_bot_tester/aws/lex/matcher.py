@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from __future__ import print_function
+
+import re
+import sys
+
+from six import string_types
+
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+from lex_bot_tester.util.conversion import to_camel_case, to_snake_case_memoized
+
+# re._pattern_type doesn't exist since python 3.7
+PATTERN_TYPE = type(re.compile(''))
+
+MISSING = object()
+
+
+class MatchPlan(object):
+    """
+    The expected result of a :py:class:ConversationItem compiled to be matched against the responses.
+
+    The slot names, values and regular expressions are resolved once, when the plan is created, and the failure
+    messages are only formatted when the response doesn't match.
+
+    Slots of the same intent having a value before the turn and not in the expected result are assumed to keep it.
+    They are matched against the values before the turn, without changing the expected result, so the same item can be
+    used in any number of conversations.
+    """
+
+    __slots__ = ('intent_name', 'dialog_state', 'keys', 'entries')
+
+    def __init__(self, expected_result):
+        """
+        :param expected_result: the expected result, a :py:class:ResultBase
+        """
+        self.intent_name = expected_result.intent_name
+        self.dialog_state = expected_result.dialog_state
+        self.keys = frozenset(expected_result.keys())
+        # (key, slot name, expected value, is regex)
+        self.entries = tuple((k, to_camel_case(k), v, isinstance(v, PATTERN_TYPE)) for k, v in expected_result.items())
+
+    def match(self, send, response, intent_name, dialog_state, slots, before_dialog_state=None, before_slots=None,
+              slot_to_elicit=None, before_intent_name=None):
+        """
+        Matches the response.
+
+        :param send: the text sent
+        :param response: the response
+        :param intent_name: the intent name in the response
+        :param dialog_state: the dialog state in the response
+        :param slots: the slots in the response
+        :param before_dialog_state: the dialog state before sending
+        :param before_slots: the slots before sending
+        :param slot_to_elicit: the slot to elicit before sending
+        :param before_intent_name: the intent name before sending
+        :raise AssertionError: if the response doesn't match
+        """
+        if self.intent_name != intent_name:
+            fail('{!r} != {!r}', self.intent_name, intent_name)
+        if response is None:
+            fail('unexpected None')
+        if self.dialog_state != dialog_state:
+            fail('{!r} != {!r} : Invalid dialog state, response={}', self.dialog_state, dialog_state, response)
+        if slots is None:
+            slots = {}
+        # if we haven't specified slots that had a value already, we are assuming that their value didn't change
+        carried = [(s, v) for s, v in before_slots.items() if v and to_snake_case_memoized(s) not in self.keys] \
+            if before_slots and before_intent_name == intent_name else []
+        elicited = before_dialog_state == DialogState.ELICIT_SLOT and slot_to_elicit is not None
+        if not self.entries and not carried:
+            # the only possibility of having an empty results is in the first step of the conversation, which has
+            # no previous dialog state, otherwise the elicited slot should have the value sent
+            if elicited:
+                self.__match_elicited(send, slots, slot_to_elicit)
+            return
+        for key, name, e, is_regex in self.entries:
+            a = slots.get(name, MISSING)
+            if a is MISSING:
+                print('ERROR: rk={} msg={!r}'.format(key, name), file=sys.stderr)
+                if elicited:
+                    self.__match_elicited(send, slots, slot_to_elicit)
+                # If it's None we let the slot to be not present
+                if e is not None:
+                    fail('{!r} is not None', e)
+            elif a is None:
+                fail('{} slot is None: rk={} e={} a={} send="{}" elicit={} slots={}', name, key, e, a, send,
+                     slot_to_elicit, slots)
+            elif is_regex:
+                if not isinstance(a, string_types) or not e.search(a):
+                    fail("Regex didn't match: {!r} not found in {!r}", e.pattern, a)
+            elif e != a:
+                fail('{!r} != {!r} : {} slot', e, a, name)
+        for name, e in carried:
+            a = slots.get(name)
+            if e != a:
+                fail('{!r} != {!r} : {} slot changed and is not in the expected result', e, a, name)
+
+    @staticmethod
+    def __match_elicited(send, slots, slot_to_elicit):
+        a = slots.get(slot_to_elicit)
+        if not isinstance(a, string_types) or send.lower() != a.lower():
+            fail('{!r} != {!r} : elicited {} slot', send.lower(), a, slot_to_elicit)
+
+
+def fail(fmt, *args):
+    raise AssertionError(fmt.format(*args))
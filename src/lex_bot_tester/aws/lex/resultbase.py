@@ -16,25 +16,107 @@
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+from collections.abc import MutableMapping
+
 from six import string_types
 
 
-class ResultBase(dict):
+def new_result(name, arg_names, bot_name=None):
+    """
+    Creates an empty instance of the Result class, creating the class if it doesn't exist in this process.
+    Used to unpickle instances of the classes created by :py:func:class_factory.
+
+    :param name: the class name
+    :param arg_names: the name of the arguments accepted by the class
+    :param bot_name: the name of the bot the class was created for
+    :return: the new instance
+    """
+    from lex_bot_tester.aws.lex.lexmodelsclient import class_factory
+    cls = class_factory(name, arg_names, bot_name=bot_name)
+    return cls.__new__(cls)
+
+
+def normalize(value):
+    """
+    Normalizes the value as it is compared with the ones received, strings are lowercased.
+    """
+    if isinstance(value, string_types):
+        return value.lower()
+    return value
+
+
+class ResultBase(MutableMapping):
     """
     A base class for all the dynamically created Result classes.
+
+    The expected slot values are accessed as a mapping, keyed by the snake case slot names, and only the slots given
+    are present. The values are kept in a single dict, so slot names that are not identifiers, i.e. 'pick-up', or that
+    are also the names of mapping methods, i.e. 'items', are valid keys. Values are kept as given and normalized (see
+    :py:func:normalize) when read through the mapping, while the attributes, for the slots of the classes created by
+    :py:func:class_factory that don't clash with other attributes, keep the original values.
     """
 
+    __slots__ = ('_type', 'intent_name', 'dialog_state', '_values')
+
+    # the names of the slots of the classes created by class_factory
+    _arg_names = ()
+
     def __init__(self, class_type, intent_name, dialog_state, **kwargs):
         """
 
         :type intent_name: ResultBase
         """
-        super(ResultBase, self).__init__()
         self._type = class_type
         self.intent_name = intent_name
         self.dialog_state = dialog_state
+        self._values = {}
         for key in kwargs:
-            v = kwargs[key]
-            if isinstance(v, string_types):
-                v = v.lower()
-            self[key] = v
+            self[key] = kwargs[key]
+
+    def __getattr__(self, name):
+        # only called when the attribute is not found, so the mapping methods and the slots above take precedence
+        if name in type(self)._arg_names:
+            try:
+                return self._values[name]
+            except (AttributeError, KeyError):
+                pass
+        raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+
+    def __getitem__(self, key):
+        return normalize(self._values[key])
+
+    def __setitem__(self, key, value):
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        del self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return '{}({}, {})'.format(type(self).__name__, self.dialog_state, dict(self.items()))
+
+    def __getstate__(self):
+        state = dict(getattr(self, '__dict__', {}))
+        for key in ResultBase.__slots__:
+            try:
+                state[key] = getattr(self, key)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def __reduce_ex__(self, protocol):
+        # the classes created by class_factory cannot be found by name, so they are created again when unpickling,
+        # i.e. when the conversations are sent to other processes
+        cls = type(self)
+        if '_bot_name' not in cls.__dict__:
+            return super(ResultBase, self).__reduce_ex__(protocol)
+        return new_result, (cls.__name__, list(cls._arg_names), cls._bot_name), self.__getstate__()
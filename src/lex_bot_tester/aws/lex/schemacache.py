@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import copy
+import errno
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from lex_bot_tester.aws.polly.audiocache import DOT_LEX_BOT_TESTER
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), DOT_LEX_BOT_TESTER, 'schemas')
+
+# When set, the default cache also keeps the schemas in this directory
+SCHEMA_CACHE_ENV = 'LEX_BOT_TESTER_SCHEMA_CACHE'
+
+LATEST = '$LATEST'
+
+
+class SchemaCache:
+    """
+    Cache of the Lex bot and intent definitions.
+
+    A bot, as resolved for an alias, is identified by its name, the alias, its checksum and its version, and an intent
+    by its name and version. Numbered versions never change, so they are kept in memory and, if :py:attr:directory is
+    set, on disk to be shared by other processes and runs. $LATEST definitions can be changed at any time and are only
+    kept in memory, for the life of the process, until they are evicted because the checksum of a bot using them
+    changed.
+    """
+
+    def __init__(self, directory=None):
+        # type: (str) -> None
+        """
+        :param directory: the directory where the numbered versions are kept, or None to keep them only in memory
+        """
+        self.directory = directory
+        self.__lock = threading.Lock()
+        self.__bots = {}
+        self.__intents = {}
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def bot_key(name, alias, checksum, version):
+        return hashlib.sha1(json.dumps([name, alias, checksum, version]).encode('utf-8')).hexdigest()
+
+    def get_bot(self, name, alias, checksum, version):
+        # type: (str, str, str, str) -> list
+        """
+        Gets the intents of the bot.
+
+        :return: the list of intent definitions, or None if not cached
+        """
+        key = SchemaCache.bot_key(name, alias, checksum, version)
+        return self.__get(self.__bots, key, version, 'bots', key)
+
+    def put_bot(self, name, alias, checksum, version, intents):
+        # type: (str, str, str, str, list) -> None
+        """
+        Puts the intents of the bot.
+
+        :param intents: the list of intent definitions, as returned by get_intent
+        """
+        key = SchemaCache.bot_key(name, alias, checksum, version)
+        self.__put(self.__bots, key, version, 'bots', key, intents)
+
+    def get_intent(self, name, version):
+        # type: (str, str) -> dict
+        """
+        Gets the intent definition.
+
+        :return: the definition, as returned by get_intent, or None if not cached
+        """
+        return self.__get(self.__intents, (name, version), version, 'intents', name, version)
+
+    def put_intent(self, intent):
+        # type: (dict) -> None
+        """
+        Puts the intent definition.
+
+        :param intent: the definition, as returned by get_intent
+        """
+        name = intent['name']
+        version = intent['version']
+        self.__put(self.__intents, (name, version), version, 'intents', name, version, intent)
+
+    def evict_intent(self, name, version):
+        # type: (str, str) -> None
+        """
+        Evicts the intent definition from memory, i.e. a $LATEST intent of a bot whose checksum changed, as the
+        intent may have changed too.
+        """
+        with self.__lock:
+            self.__intents.pop((name, version), None)
+
+    def clear(self):
+        with self.__lock:
+            self.__bots.clear()
+            self.__intents.clear()
+
+    def __get_path(self, *parts):
+        return os.path.join(self.directory, *parts) + '.json'
+
+    def __get(self, memory, key, version, *parts):
+        with self.__lock:
+            value = memory.get(key)
+        if value is None and version != LATEST and self.directory is not None:
+            try:
+                with open(self.__get_path(*parts)) as f:
+                    value = json.load(f)
+            except (IOError, OSError) as ex:
+                if ex.errno != errno.ENOENT:
+                    raise
+                return None
+            with self.__lock:
+                memory[key] = value
+        return copy.deepcopy(value)
+
+    def __put(self, memory, key, version, *parts_and_value):
+        parts = parts_and_value[:-1]
+        # round trip through json, so dates are strings and the values are the same once read from disk
+        value = json.loads(json.dumps(sanitize(parts_and_value[-1]), default=str))
+        with self.__lock:
+            memory[key] = value
+        if version != LATEST and self.directory is not None:
+            path = self.__get_path(*parts)
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError as ex:
+                    if ex.errno != errno.EEXIST:
+                        raise
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp, path)
+
+
+def sanitize(value):
+    """
+    Removes the response metadata from the response, or list of responses.
+    """
+    if isinstance(value, list):
+        return [sanitize(v) for v in value]
+    return dict((k, v) for k, v in value.items() if k != 'ResponseMetadata')
+
+
+# The cache used by default by LexModelsClient
+SCHEMA_CACHE = SchemaCache(os.environ.get(SCHEMA_CACHE_ENV))
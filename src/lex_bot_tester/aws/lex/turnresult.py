@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from types import MappingProxyType
+
+from six import string_types
+
+from lex_bot_tester.util.conversion import to_snake_case_memoized
+
+# the key maps, by slot names
+KEY_MAPS = {}
+
+
+def get_key_maps(names):
+    # type: (tuple) -> tuple
+    """
+    Gets the snake_case to camelCase and camelCase to snake_case maps of the slot names, shared by all the results
+    having the same slots, i.e. every turn of an intent.
+
+    :param names: the sorted slot names, as received
+    :return: the (snake_to_camel, camel_to_snake) read-only maps
+    """
+    try:
+        return KEY_MAPS[names]
+    except KeyError:
+        maps = KEY_MAPS[names] = (MappingProxyType(dict((to_snake_case_memoized(n), n) for n in names)),
+                                  MappingProxyType(dict((n, to_snake_case_memoized(n)) for n in names)))
+        return maps
+
+
+class TurnResult(object):
+    """
+    The result of one turn of a Lex conversation.
+
+    It's built once from the response and keeps only the values the assertions need, not the full response. Slot
+    values are normalized to lower case and the slot names can be used either as received (camelCase) or in
+    snake_case through :py:attr:snake_to_camel and :py:attr:camel_to_snake, see :py:func:get_key_maps.
+
+    Instances are immutable.
+    """
+
+    __slots__ = ('intent_name', 'dialog_state', 'message', 'slot_to_elicit', 'slots', 'session_attributes',
+                 'snake_to_camel', 'camel_to_snake')
+
+    def __init__(self, response):
+        # type: (dict) -> None
+        """
+        :param response: the post_text or post_content response
+        """
+        slots = {}
+        for k, v in (response.get('slots') or {}).items():
+            if isinstance(v, string_types):
+                v = v.lower()
+            slots[k] = v
+        setter = super(TurnResult, self).__setattr__
+        setter('intent_name', response.get('intentName'))
+        setter('dialog_state', response.get('dialogState'))
+        setter('message', response.get('message'))
+        setter('slot_to_elicit', response.get('slotToElicit'))
+        setter('slots', MappingProxyType(slots))
+        setter('session_attributes', MappingProxyType(response.get('sessionAttributes') or {}))
+        snake_to_camel, camel_to_snake = get_key_maps(tuple(sorted(slots)))
+        setter('snake_to_camel', snake_to_camel)
+        setter('camel_to_snake', camel_to_snake)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('TurnResult is immutable')
+
+    def __delattr__(self, item):
+        raise AttributeError('TurnResult is immutable')
+
+    def get_slot(self, name):
+        """
+        Gets the slot value.
+
+        :param name: the slot name, as received or in snake_case
+        :return: the value
+        :raise KeyError: if there's no such slot
+        """
+        try:
+            return self.slots[name]
+        except KeyError:
+            return self.slots[self.snake_to_camel[name]]
+
+    def __repr__(self):
+        return 'TurnResult(intent_name={}, dialog_state={}, slot_to_elicit={}, slots={})'.format(
+            self.intent_name, self.dialog_state, self.slot_to_elicit, dict(self.slots))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from lex_bot_tester.aws.asyncexecutor import AsyncExecutor
+from lex_bot_tester.aws.polly.pollyclient import PollyClient
+
+
+class AsyncPollyClient:
+    """
+    Polly Client usable from coroutines.
+
+    The requests are made by a :py:class:PollyClient, whose cache and retry policy apply, in the threads of an
+    :py:class:AsyncExecutor.
+    """
+
+    def __init__(self, polly_client=None, executor=None, **kwargs):
+        # type: (PollyClient, AsyncExecutor, dict) -> None
+        """
+        :param polly_client: the :py:class:PollyClient, or None to create one with :py:attr:kwargs
+        :param executor: the :py:class:AsyncExecutor, which may be shared with other clients, or None to create one
+        :param kwargs: the arguments of :py:class:PollyClient
+        """
+        self.executor = executor if executor is not None else AsyncExecutor()
+        if polly_client is None:
+            kwargs.setdefault('concurrency', self.executor.concurrency)
+            polly_client = PollyClient(**kwargs)
+        self.client = polly_client
+
+    async def synthesize_speech(self, text):
+        """
+        Synthesizes the speech.
+        Reading the AudioStream of the response blocks, :py:meth:get_speech reads it in the executor instead.
+
+        :param text: the text
+        :return: the response
+        """
+        return await self.executor.run(self.client.synthesize_speech, text)
+
+    async def get_speech(self, text):
+        """
+        Gets the synthesized speech, reading it completely.
+
+        :param text: the text
+        :return: the audio
+        """
+        return await self.executor.run(self.client.get_speech, text)
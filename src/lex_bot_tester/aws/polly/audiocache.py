@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import errno
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, eviction is then not serialized between processes
+    fcntl = None
+
+DOT_LEX_BOT_TESTER = '.lex_bot_tester'
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), DOT_LEX_BOT_TESTER, 'polly')
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+LOCK_FILE = '.lock'
+SUFFIX = '.audio'
+
+
+class AudioCache:
+    """
+    Content addressed on-disk cache of synthesized audio.
+
+    Each entry is a file named after the hash of the text, voice, output format and sample rate, so it can be memory
+    mapped and sent as is. Entries are written to a temporary file and renamed, which makes concurrent writers,
+    threads or processes, safe. When the cache grows over :py:attr:max_size the least recently used entries are
+    evicted.
+
+    The size is computed once, walking the directory on the first commit, and then tracked as entries are committed
+    and evicted, so commits don't walk the directory. The entries written by other processes are only accounted for
+    on the next eviction, which walks the directory again.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        # the tracked size, None until the directory is walked
+        self.__size = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def key(text, voice_id, output_format, sample_rate):
+        # type: (str, str, str, str) -> str
+        """
+        Gets the key identifying the audio.
+
+        :param text: the synthesized text
+        :param voice_id: the voice
+        :param output_format: the output format
+        :param sample_rate: the sample rate
+        :return: the key
+        """
+        data = u'\0'.join([text, voice_id, output_format, str(sample_rate)])
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key[:2], key + SUFFIX)
+
+    def get(self, key):
+        """
+        Gets the audio for the key.
+
+        :param key: the key
+        :return: a read-only memory map of the audio, which should be closed by the caller, or None if not cached
+        """
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b''
+                audio = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError) as ex:
+            if ex.errno == errno.ENOENT:
+                return None
+            raise
+        try:
+            # the modification time is the recency used by the eviction
+            os.utime(path, None)
+        except OSError:
+            pass
+        return audio
+
+    def put(self, key, audio):
+        """
+        Puts the audio in the cache.
+
+        :param key: the key
+        :param audio: the audio bytes
+        """
+        f = self.open(key)
+        try:
+            f.write(audio)
+        except Exception:
+            f.discard()
+            raise
+        f.commit()
+
+    def open(self, key):
+        """
+        Opens a new entry for writing.
+
+        Data written is not visible until :py:meth:AudioCacheWriter.commit is invoked.
+
+        :param key: the key
+        :return: the writer
+        """
+        path = self.get_path(key)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError as ex:
+                if ex.errno != errno.EEXIST:
+                    raise
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        return AudioCacheWriter(self, os.fdopen(fd, 'wb'), tmp, path)
+
+    def get_size(self):
+        return sum(size for _, size, _ in self.__entries())
+
+    def committed(self, delta):
+        # type: (int) -> None
+        """
+        Accounts for an entry committed, evicting the least recently used entries if the cache grows over
+        :py:attr:max_size.
+
+        :param delta: the size of the entry, less the size of the entry it replaced, if any
+        """
+        if self.max_size is None:
+            return
+        with self.__lock:
+            if self.__size is None:
+                # already includes the entry
+                self.__size = self.get_size()
+            else:
+                self.__size += delta
+            over = self.__size > self.max_size
+        if over:
+            self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache size is not greater than :py:attr:max_size.
+        """
+        lock = open(os.path.join(self.directory, LOCK_FILE), 'a')
+        try:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            entries = sorted(self.__entries(), key=lambda e: e[2])
+            size = sum(e[1] for e in entries)
+            for path, entry_size, _ in entries:
+                if size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except OSError as ex:
+                    if ex.errno != errno.ENOENT:
+                        raise
+                size -= entry_size
+            with self.__lock:
+                self.__size = size
+        finally:
+            lock.close()
+
+    def clear(self):
+        for path, _, _ in self.__entries():
+            try:
+                os.remove(path)
+            except OSError as ex:
+                if ex.errno != errno.ENOENT:
+                    raise
+        with self.__lock:
+            self.__size = None
+
+    def __getstate__(self):
+        # the lock can't be pickled, i.e. to send the cache to a shard process, which walks the directory again
+        state = dict(self.__dict__)
+        del state['_AudioCache__lock']
+        state['_AudioCache__size'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        # evicted by somebody else
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+
+class AudioCacheWriter:
+    """
+    Writer of a new :py:class:AudioCache entry.
+    """
+
+    def __init__(self, cache, f, tmp, path):
+        self.__cache = cache
+        self.__file = f
+        self.__tmp = tmp
+        self.__path = path
+        self.size = 0
+
+    def write(self, data):
+        self.__file.write(data)
+        self.size += len(data)
+
+    def commit(self):
+        """
+        Makes the entry visible, atomically replacing any other entry written concurrently for the same key.
+        """
+        self.__file.close()
+        try:
+            replaced = os.stat(self.__path).st_size
+        except OSError:
+            replaced = 0
+        os.replace(self.__tmp, self.__path)
+        self.__cache.committed(self.size - replaced)
+
+    def discard(self):
+        self.__file.close()
+        try:
+            os.remove(self.__tmp)
+        except OSError:
+            pass
+
+
+class AudioCacheTee:
+    """
+    File-like wrapper of an audio stream that writes what is read to a new :py:class:AudioCache entry.
+
+    The entry is committed once the stream is read to the end, and discarded if the stream is closed before.
+    """
+
+    def __init__(self, stream, writer):
+        self.__stream = stream
+        self.__writer = writer
+
+    def read(self, amt=None):
+        data = self.__stream.read(amt)
+        if self.__writer is not None:
+            if data:
+                self.__writer.write(data)
+            if not data or amt is None:
+                self.__writer.commit()
+                self.__writer = None
+        return data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        if self.__writer is not None:
+            self.__writer.discard()
+            self.__writer = None
+        self.__stream.close()
@@ -16,8 +16,31 @@
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.polly.audiocache import AudioCache, AudioCacheTee
+from lex_bot_tester.aws.retry import RetryPolicy
+from lex_bot_tester.util.timing import TIMINGS, Transport
+
+MAX_WORKERS = 8
+
+
+class SynthesisReport:
+    """
+    Outcome of :py:meth:PollyClient.presynthesize.
+    """
+
+    def __init__(self, synthesized, cached, duplicates, elapsed):
+        self.synthesized = synthesized
+        self.cached = cached
+        self.duplicates = duplicates
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return 'Pre-synthesized {} texts in {:.2f}s ({} already cached, {} duplicates skipped)'.format(
+            self.synthesized, self.elapsed, self.cached, self.duplicates)
 
 
 class PollyClient:
@@ -25,10 +48,125 @@ class PollyClient:
     Polly Client.
     """
 
-    def __init__(self):
-        self.__client = boto3.client('polly')
+    def __init__(self, region_name=None, profile_name=None, concurrency=None, audio_cache=None, retry_policy=None,
+                 timings=None):
+        """
+        Creates the client.
+
+        :param region_name: the region, or None to use the configured one
+        :param profile_name: the profile, or None to use the default one
+        :param concurrency: the number of clients expected to be used at the same time
+        :param audio_cache: the :py:class:AudioCache used by :py:meth:get_speech, or None
+        :param retry_policy: the :py:class:RetryPolicy, which may be shared with other clients, or None to create one
+        :param timings: the :py:class:Timings where the latency of the requests is recorded, or None to use the
+            default ones
+        """
+        self.__region_name = region_name
+        self.__profile_name = profile_name
+        self.__concurrency = concurrency
+        self.__client = None
         self.output_format = 'pcm'
         self.voice_id = 'Nicole'
+        self.sample_rate = '16000'
+        self.audio_cache = audio_cache
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.timings = timings if timings is not None else TIMINGS
+        self.__presynthesized = {}
+
+    def __get_client(self):
+        if self.__client is None:
+            self.__client = ClientRegistry.get_client('polly', self.__region_name, self.__profile_name,
+                                                      self.__concurrency)
+        return self.__client
 
     def synthesize_speech(self, text):
-        return self.__client.synthesize_speech(Text=text, OutputFormat=self.output_format, VoiceId=self.voice_id)
+        def synthesize():
+            return self.__get_client().synthesize_speech(Text=text, OutputFormat=self.output_format,
+                                                         VoiceId=self.voice_id, SampleRate=self.sample_rate)
+
+        with self.timings.time('polly_synthesize_speech', transport=Transport.TTS):
+            return self.retry_policy.call(synthesize, idempotent=True)
+
+    def get_retry_stats(self):
+        return self.retry_policy.stats
+
+    def get_speech(self, text):
+        """
+        Gets the synthesized speech for the text.
+        If there's an :py:attr:audio_cache and the speech is there Polly is not invoked at all.
+
+        :param text: the text
+        :return: the audio, bytes or a memory map that should be closed once used
+        """
+        speech = self.__presynthesized.get(text)
+        if speech is not None:
+            return speech
+        if self.audio_cache is None:
+            return self.synthesize_speech(text)['AudioStream'].read()
+        key = AudioCache.key(text, self.voice_id, self.output_format, self.sample_rate)
+        speech = self.audio_cache.get(key)
+        if speech is None:
+            speech = self.synthesize_speech(text)['AudioStream'].read()
+            self.audio_cache.put(key, speech)
+        return speech
+
+    def get_speech_stream(self, text):
+        """
+        Gets the synthesized speech for the text as a stream.
+
+        Unlike :py:meth:get_speech, the audio is not read into memory when it comes from Polly, so it can be sent while
+        it's still arriving. If there's an :py:attr:audio_cache the audio read is also written to it.
+
+        :param text: the text
+        :return: the audio, a file-like object or bytes, that should be closed once used if it has a close method
+        """
+        speech = self.__presynthesized.get(text)
+        if speech is not None:
+            return speech
+        if self.audio_cache is None:
+            return self.synthesize_speech(text)['AudioStream']
+        key = AudioCache.key(text, self.voice_id, self.output_format, self.sample_rate)
+        speech = self.audio_cache.get(key)
+        if speech is None:
+            speech = AudioCacheTee(self.synthesize_speech(text)['AudioStream'], self.audio_cache.open(key))
+        return speech
+
+    def presynthesize(self, texts, max_workers=MAX_WORKERS):
+        # type: (list, int) -> SynthesisReport
+        """
+        Synthesizes all the texts concurrently, so :py:meth:get_speech does not have to wait for Polly later.
+
+        Duplicated texts are synthesized once. The speech goes to the :py:attr:audio_cache if there's one, otherwise
+        it's kept in memory by this client.
+
+        :param texts: the texts
+        :param max_workers: the maximum number of concurrent requests to Polly
+        :return: the :py:class:SynthesisReport
+        """
+        start = time.perf_counter()
+        unique = []
+        seen = set()
+        total = 0
+        for text in texts:
+            total += 1
+            if text not in seen:
+                seen.add(text)
+                unique.append(text)
+        pending = [t for t in unique if t not in self.__presynthesized]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            cached = sum(executor.map(self.__presynthesize, pending))
+        return SynthesisReport(len(pending) - cached, cached + len(unique) - len(pending), total - len(unique),
+                               time.perf_counter() - start)
+
+    def __presynthesize(self, text):
+        if self.audio_cache is None:
+            self.__presynthesized[text] = self.synthesize_speech(text)['AudioStream'].read()
+            return False
+        key = AudioCache.key(text, self.voice_id, self.output_format, self.sample_rate)
+        speech = self.audio_cache.get(key)
+        if speech is not None:
+            if hasattr(speech, 'close'):
+                speech.close()
+            return True
+        self.audio_cache.put(key, self.synthesize_speech(text)['AudioStream'].read())
+        return False
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError, EndpointConnectionError, ConnectionClosedError, ReadTimeoutError, \
+    ConnectTimeoutError
+
+# The request was rejected before being processed, resending it is always safe
+THROTTLING_ERRORS = frozenset([
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'LimitExceededException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+])
+
+# The request may or may not have been processed, resending it is only safe if it's idempotent
+TRANSIENT_ERRORS = frozenset([
+    'InternalFailure',
+    'InternalFailureException',
+    'InternalServerError',
+    'ServiceFailureException',
+    'ServiceUnavailable',
+    'ServiceUnavailableException',
+    'BadGatewayException',
+    'RequestTimeout',
+    'RequestTimeoutException',
+])
+
+DEBUG = False
+
+
+def get_error_code(ex):
+    """
+    Gets the error code of the exception.
+
+    :param ex: the exception
+    :return: the error code for service errors, the exception class name otherwise
+    """
+    if isinstance(ex, ClientError):
+        return ex.response.get('Error', {}).get('Code')
+    return ex.__class__.__name__
+
+
+def is_throttling(ex):
+    """
+    Whether the exception means that the request was rejected because of throttling.
+    """
+    if isinstance(ex, ClientError):
+        return get_error_code(ex) in THROTTLING_ERRORS or \
+               ex.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 429
+    # the connection could not be established, nothing was sent
+    return isinstance(ex, (EndpointConnectionError, ConnectTimeoutError))
+
+
+def is_transient(ex):
+    """
+    Whether the exception is a transient failure, after which the request may or may not have been processed.
+    """
+    if isinstance(ex, ClientError):
+        return get_error_code(ex) in TRANSIENT_ERRORS or \
+               ex.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500
+    return isinstance(ex, (ConnectionClosedError, ReadTimeoutError))
+
+
+class RetryStats:
+    """
+    Counters of the retries done by one or more :py:class:RetryPolicy.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.backoff_time = 0.0
+        self.errors = {}
+
+    def add_call(self):
+        with self.__lock:
+            self.calls += 1
+
+    def add_retry(self, error_code, backoff_time):
+        with self.__lock:
+            self.retries += 1
+            self.backoff_time += backoff_time
+            self.errors[error_code] = self.errors.get(error_code, 0) + 1
+
+    def merge(self, other):
+        """
+        Adds the counters of other, i.e. the ones of another process.
+        """
+        with self.__lock:
+            self.calls += other.calls
+            self.retries += other.retries
+            self.backoff_time += other.backoff_time
+            for k, v in other.errors.items():
+                self.errors[k] = self.errors.get(k, 0) + v
+
+    def __getstate__(self):
+        return {'calls': self.calls, 'retries': self.retries, 'backoff_time': self.backoff_time, 'errors': self.errors}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.__dict__.update(state)
+
+    def __str__(self):
+        return '{} calls, {} retries, {:.2f}s backing off {}'.format(self.calls, self.retries, self.backoff_time,
+                                                                    self.errors)
+
+
+class RetryPolicy:
+    """
+    Retries the calls failing because of throttling, applying exponential backoff with full jitter.
+
+    Calls that are not idempotent, like sending a turn to Lex, are only retried if the request was rejected
+    without being processed, so the session state is never changed twice. Idempotent calls are retried on transient
+    errors too. No call is retried once :py:attr:deadline seconds have elapsed since it was first attempted.
+
+    The same policy, and then its :py:attr:stats, can be shared by several clients and threads.
+    """
+
+    def __init__(self, max_attempts=8, base=0.1, cap=5.0, deadline=60.0, stats=None):
+        self.max_attempts = max_attempts
+        self.base = base
+        self.cap = cap
+        self.deadline = deadline
+        self.stats = stats if stats is not None else RetryStats()
+
+    def is_retryable(self, ex, idempotent=False):
+        return is_throttling(ex) or (idempotent and is_transient(ex))
+
+    def get_backoff(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+    def call(self, function, idempotent=False):
+        """
+        Invokes the function, retrying it if it fails with a retryable error.
+
+        :param function: the function, without arguments
+        :param idempotent: whether the function can be safely invoked again after a transient error
+        :return: what the function returns
+        """
+        self.stats.add_call()
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                return function()
+            except Exception as ex:
+                attempt += 1
+                if attempt >= self.max_attempts or not self.is_retryable(ex, idempotent):
+                    raise
+                backoff = self.get_backoff(attempt)
+                if time.monotonic() + backoff - start > self.deadline:
+                    raise
+                if DEBUG:
+                    print('DEBUG: retrying after {} in {:.2f}s (attempt {})'.format(get_error_code(ex), backoff,
+                                                                                    attempt))
+                self.stats.add_retry(get_error_code(ex), backoff)
+                time.sleep(backoff)
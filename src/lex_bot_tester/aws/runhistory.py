@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import errno
+import json
+import os
+import tempfile
+import threading
+
+
+class RunHistory(object):
+    """
+    The last result of every conversation, and the fingerprints of the intents, or skill, it ran against, kept between
+    runs to run again only the conversations that may have a different result.
+
+    A fingerprint identifies the definition of an intent, its version and checksum for Lex, or of the interaction
+    model, its ETag for Alexa. A conversation is selected if it never ran, if it failed the last time or if any of its
+    fingerprints changed since then.
+    """
+
+    def __init__(self, path=None, fingerprints=None):
+        # type: (str, dict) -> None
+        """
+        :param path: the JSON file the history is read from, if it exists, and saved to, or None to keep it only in
+            memory
+        :param fingerprints: the current fingerprints, by intent or skill name, or None to set them with
+            :py:meth:update_fingerprints
+        """
+        self.path = path
+        self.fingerprints = dict(fingerprints) if fingerprints else {}
+        self.selected = 0
+        self.skipped = 0
+        self.__lock = threading.Lock()
+        self.__entries = {}
+        # the keys recorded by this run, the only ones merged into other histories
+        self.__recorded = set()
+        if path is not None:
+            try:
+                with open(path) as f:
+                    self.__entries = json.load(f)['conversations']
+            except (IOError, OSError) as ex:
+                if ex.errno != errno.ENOENT:
+                    raise
+
+    def update_fingerprints(self, fingerprints):
+        # type: (dict) -> None
+        with self.__lock:
+            self.fingerprints.update(fingerprints)
+
+    def get(self, key):
+        # type: (str) -> dict
+        """
+        Gets the last result of the conversation.
+
+        :param key: the conversation key
+        :return: a dict with the fingerprints and whether it passed, or None if it never ran
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            return dict(entry) if entry is not None else None
+
+    def is_selected(self, key, names):
+        # type: (str, list) -> bool
+        """
+        Tells whether the conversation has to run, counting it as selected or skipped.
+
+        :param key: the conversation key
+        :param names: the names of the intents, or skill, it runs against
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            selected = entry is None or not entry['passed'] or any(
+                n not in self.fingerprints or entry['fingerprints'].get(n) != self.fingerprints[n] for n in names)
+            if selected:
+                self.selected += 1
+            else:
+                self.skipped += 1
+            return selected
+
+    def record(self, key, names, passed):
+        # type: (str, list, bool) -> None
+        """
+        Records the result of the conversation, with the current fingerprints.
+
+        :param key: the conversation key
+        :param names: the names of the intents, or skill, it ran against
+        :param passed: whether it passed
+        """
+        with self.__lock:
+            self.__entries[key] = {'fingerprints': dict((n, self.fingerprints.get(n)) for n in names),
+                                   'passed': bool(passed)}
+            self.__recorded.add(key)
+
+    def merge(self, other):
+        # type: (RunHistory) -> RunHistory
+        """
+        Adds the results recorded by other, i.e. in a shard process.
+
+        :return: this history
+        """
+        entries = other.__get_recorded()
+        with self.__lock:
+            self.__entries.update(entries)
+            self.__recorded.update(entries)
+        return self
+
+    def __get_recorded(self):
+        with self.__lock:
+            return dict((k, self.__entries[k]) for k in self.__recorded)
+
+    def save(self):
+        """
+        Saves the history to :py:attr:path, if set.
+        """
+        if self.path is None:
+            return
+        with self.__lock:
+            value = {'conversations': self.__entries}
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+
+    def __getstate__(self):
+        # the lock can't be pickled, i.e. to send the history to a shard process
+        with self.__lock:
+            state = dict(self.__dict__)
+        del state['_RunHistory__lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def __str__(self):
+        return 'Run history: {} conversations selected, {} skipped as unchanged since they passed'.format(
+            self.selected, self.skipped)
@@ -20,6 +20,8 @@ import re
 
 DEBUG = False
 
+SNAKE_CASE = {}
+
 
 def to_snake_case(name):
     if DEBUG:
@@ -30,6 +32,17 @@ def to_snake_case(name):
     return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
 
 
+def to_snake_case_memoized(name):
+    """
+    Same as :py:func:to_snake_case but remembering the conversions, as the same names are converted over and over.
+    """
+    try:
+        return SNAKE_CASE[name]
+    except KeyError:
+        s = SNAKE_CASE[name] = to_snake_case(name)
+        return s
+
+
 def to_camel_case(name):
     if type(name) == bytes:
         name = name.decode()
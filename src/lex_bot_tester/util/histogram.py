@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import math
+
+SIGNIFICANT_FIGURES = 2
+
+# values are recorded in seconds and kept as integer microseconds
+UNIT = 1e6
+
+
+class Histogram(object):
+    """
+    Latency histogram, in the style of HdrHistogram.
+
+    Values are counted in log-linear buckets: every power of 2 range is split in the same number of linear sub-buckets,
+    enough to keep :py:attr:significant_figures of precision. Only the buckets used are stored, so the memory needed
+    depends on the spread of the values and not on how many were recorded.
+
+    Histograms with the same precision can be merged, i.e. the ones recorded by different threads or processes.
+
+    Instances are not thread safe.
+    """
+
+    __slots__ = ('significant_figures', 'count', 'total', 'min', 'max', '__bits', '__counts')
+
+    def __init__(self, significant_figures=SIGNIFICANT_FIGURES):
+        # type: (int) -> None
+        """
+        :param significant_figures: the number of significant decimal digits kept for every value
+        """
+        self.significant_figures = significant_figures
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.__bits = int(math.ceil(math.log(2 * 10 ** significant_figures, 2)))
+        self.__counts = {}
+
+    def __index(self, value):
+        shift = value.bit_length() - self.__bits
+        if shift <= 0:
+            return value
+        return (shift << self.__bits) + (value >> shift)
+
+    def __highest_equivalent(self, index):
+        shift = index >> self.__bits
+        if shift == 0:
+            return index
+        return ((index & ((1 << self.__bits) - 1)) << shift) + (1 << shift) - 1
+
+    def record(self, value, count=1):
+        # type: (float, int) -> None
+        """
+        Records the value.
+
+        :param value: the value, in seconds
+        :param count: the number of times the value is recorded
+        """
+        v = max(0, int(round(value * UNIT)))
+        index = self.__index(v)
+        self.__counts[index] = self.__counts.get(index, 0) + count
+        self.count += count
+        self.total += v * count
+        if self.min is None or v < self.min:
+            self.min = v
+        if self.max is None or v > self.max:
+            self.max = v
+
+    def merge(self, other):
+        # type: (Histogram) -> Histogram
+        """
+        Adds the values recorded by the other histogram.
+
+        :param other: the other histogram
+        :return: this histogram
+        :raise ValueError: if the precision of the histograms is different
+        """
+        if other.significant_figures != self.significant_figures:
+            raise ValueError('Cannot merge histograms with different precision ({} and {})'.format(
+                self.significant_figures, other.significant_figures))
+        for index, c in other.__counts.items():
+            self.__counts[index] = self.__counts.get(index, 0) + c
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def get_percentile(self, p):
+        # type: (float) -> float
+        """
+        Gets the value at the percentile.
+
+        :param p: the percentile, in [0..100]
+        :return: the value, in seconds, or None if nothing was recorded
+        """
+        if self.count == 0:
+            return None
+        rank = max(1, int(math.ceil(p / 100.0 * self.count)))
+        seen = 0
+        for index in sorted(self.__counts):
+            seen += self.__counts[index]
+            if seen >= rank:
+                return min(self.__highest_equivalent(index), self.max) / UNIT
+        return self.max / UNIT
+
+    def get_min(self):
+        return self.min / UNIT if self.min is not None else None
+
+    def get_max(self):
+        return self.max / UNIT if self.max is not None else None
+
+    def get_mean(self):
+        return self.total / UNIT / self.count if self.count else None
+
+    def get_sum(self):
+        return self.total / UNIT
+
+    def to_dict(self):
+        # type: () -> dict
+        """
+        Converts the histogram to a dict that can be serialized as JSON and converted back by :py:meth:from_dict.
+        """
+        return {
+            'significantFigures': self.significant_figures,
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min,
+            'max': self.max,
+            'counts': dict((str(k), v) for k, v in self.__counts.items()),
+        }
+
+    @staticmethod
+    def from_dict(d):
+        # type: (dict) -> Histogram
+        h = Histogram(d['significantFigures'])
+        h.count = d['count']
+        h.total = d['sum']
+        h.min = d['min']
+        h.max = d['max']
+        h.__counts = dict((int(k), v) for k, v in d['counts'].items())
+        return h
+
+    def __str__(self):
+        if self.count == 0:
+            return 'count=0'
+        return 'count={} mean={:.3f} p50={:.3f} p90={:.3f} p99={:.3f} max={:.3f}'.format(
+            self.count, self.get_mean(), self.get_percentile(50), self.get_percentile(90), self.get_percentile(99),
+            self.get_max())
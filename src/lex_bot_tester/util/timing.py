@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from __future__ import print_function
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from lex_bot_tester.util.histogram import Histogram
+
+# When set, the timings are exported at exit to $LEX_BOT_TESTER_TIMINGS.json and $LEX_BOT_TESTER_TIMINGS.txt
+TIMINGS_ENV = 'LEX_BOT_TESTER_TIMINGS'
+
+TAGS = ('bot', 'alias', 'intent', 'dialog_state', 'transport')
+
+METRIC_PREFIX = 'lex_bot_tester_'
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Transport:
+    TEXT = 'text'
+    TTS = 'tts'
+    SIMULATION = 'simulation'
+
+
+class Timings:
+    """
+    Registry of latency :py:class:Histogram, one per metric name and set of tags.
+
+    Tags identify the bot, alias, intent, dialog state and transport (see :py:data:TAGS), tags without value are
+    ignored. Timings can be shared by any number of threads and merged with the ones of other processes.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__histograms = {}
+
+    @staticmethod
+    def __key(name, tags):
+        return name, tuple(sorted((k, str(v)) for k, v in tags.items() if v is not None))
+
+    def record(self, name, seconds, **tags):
+        """
+        Records the duration.
+
+        :param name: the metric name
+        :param seconds: the duration
+        :param tags: the tags
+        """
+        key = Timings.__key(name, tags)
+        with self.__lock:
+            h = self.__histograms.get(key)
+            if h is None:
+                h = self.__histograms[key] = Histogram()
+            h.record(seconds)
+
+    @contextmanager
+    def time(self, name, **tags):
+        """
+        Records the duration of the block.
+        The tags yielded can be updated inside the block, i.e. with values known only once the response is received.
+
+        :param name: the metric name
+        :param tags: the tags
+        """
+        start = time.perf_counter()
+        try:
+            yield tags
+        finally:
+            self.record(name, time.perf_counter() - start, **tags)
+
+    def get(self, name, **tags):
+        # type: (str, dict) -> Histogram
+        """
+        Gets the histogram for the name and exactly these tags.
+
+        :return: the histogram or None if nothing was recorded
+        """
+        with self.__lock:
+            return self.__histograms.get(Timings.__key(name, tags))
+
+    def get_merged(self, name, **tags):
+        # type: (str, dict) -> Histogram
+        """
+        Gets the histogram merging all the ones for the name having these tags, whatever the other tags are.
+        """
+        wanted = set(Timings.__key(name, tags)[1])
+        merged = Histogram()
+        with self.__lock:
+            for (n, t), h in self.__histograms.items():
+                if n == name and wanted.issubset(t):
+                    merged.merge(h)
+        return merged
+
+    def merge(self, other):
+        # type: (Timings) -> Timings
+        """
+        Adds the timings recorded by other.
+
+        :param other: the other timings
+        :return: these timings
+        """
+        for key, h in other.__items():
+            with self.__lock:
+                mine = self.__histograms.get(key)
+                if mine is None:
+                    mine = self.__histograms[key] = Histogram(h.significant_figures)
+                mine.merge(h)
+        return self
+
+    def clear(self):
+        with self.__lock:
+            self.__histograms.clear()
+
+    def __items(self):
+        with self.__lock:
+            return sorted(self.__histograms.items())
+
+    def to_dict(self):
+        # type: () -> dict
+        return {'timings': [{'name': n, 'tags': dict(t), 'histogram': h.to_dict()} for (n, t), h in self.__items()]}
+
+    @staticmethod
+    def from_dict(d):
+        # type: (dict) -> Timings
+        timings = Timings()
+        for e in d['timings']:
+            timings.__histograms[Timings.__key(e['name'], e['tags'])] = Histogram.from_dict(e['histogram'])
+        return timings
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def to_openmetrics(self):
+        """
+        Converts the timings to the OpenMetrics text format, as one summary per metric name.
+        """
+        lines = []
+        last = None
+        for (n, t), h in self.__items():
+            metric = METRIC_PREFIX + n + '_seconds'
+            if n != last:
+                lines.append('# TYPE {} summary'.format(metric))
+                lines.append('# UNIT {} seconds'.format(metric))
+                last = n
+            labels = ','.join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"')) for k, v in t)
+            for q in QUANTILES:
+                lines.append('{}{{{}}} {}'.format(metric, ','.join(filter(None, [labels, 'quantile="{}"'.format(q)])),
+                                                 h.get_percentile(q * 100)))
+            suffix = '{{{}}}'.format(labels) if labels else ''
+            lines.append('{}_sum{} {}'.format(metric, suffix, h.get_sum()))
+            lines.append('{}_count{} {}'.format(metric, suffix, h.count))
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """
+        Writes the timings to :py:attr:path.json and :py:attr:path.txt, in OpenMetrics format.
+
+        :param path: the path, without extension
+        """
+        with open(path + '.json', 'w') as f:
+            f.write(self.to_json())
+        with open(path + '.txt', 'w') as f:
+            f.write(self.to_openmetrics())
+
+    def __str__(self):
+        return '\n'.join('{} {}: {}'.format(n, dict(t), h) for (n, t), h in self.__items())
+
+
+# The timings recorded by default by the clients and tests
+TIMINGS = Timings()
+
+
+def _export_at_exit():
+    path = os.environ.get(TIMINGS_ENV)
+    if path:
+        try:
+            TIMINGS.export(path)
+        except IOError as ex:
+            print('ERROR: cannot export timings to {}: {}'.format(path, ex), file=sys.stderr)
+
+
+atexit.register(_export_at_exit)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import unittest
+from unittest import mock
+
+from lex_bot_tester.aws.alexa.alexaskillmanagementclient import AlexaSkillManagementClient
+
+CLI_CONFIG = json.dumps({'profiles': {'default': {'token': {'expires_at': '2999-01-01T00:00:00.000Z',
+                                                             'access_token': 'token'}}}})
+
+
+def new_client(**kwargs):
+    with mock.patch.object(AlexaSkillManagementClient, 'get_skill_id', return_value='skill-id'), \
+            mock.patch('builtins.open', mock.mock_open(read_data=CLI_CONFIG)):
+        return AlexaSkillManagementClient('BookMyTripSkill', **kwargs)
+
+
+class AlexaSkillManagementClientSessionTests(unittest.TestCase):
+
+    def test_create_session(self):
+        session = AlexaSkillManagementClient.create_session(pool_size=32)
+        adapter = session.get_adapter(AlexaSkillManagementClient.ROOT + '/v0/skills')
+        self.assertEqual(adapter._pool_maxsize, 32)
+
+    def test_shared_session(self):
+        shared = AlexaSkillManagementClient.get_shared_session()
+        self.assertIs(AlexaSkillManagementClient.get_shared_session(1), shared)
+        pool_size = shared.get_adapter(AlexaSkillManagementClient.ROOT)._pool_maxsize
+        bigger = AlexaSkillManagementClient.get_shared_session(pool_size + 1)
+        self.assertIsNot(bigger, shared)
+        self.assertIs(AlexaSkillManagementClient.get_shared_session(), bigger)
+
+    def test_requests_use_session(self):
+        session = mock.Mock()
+        session.head.return_value = mock.Mock(status_code=200, headers={'ETag': 'etag'})
+        asmc = new_client(session=session, timeout=(1, 2))
+        self.assertEqual(asmc.get_interaction_model_etag(), 'etag')
+        session.head.assert_called_once_with(
+            AlexaSkillManagementClient.ROOT + '/v0/skills/skill-id/interactionModel/locales/en-US',
+            headers=mock.ANY, timeout=(1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+from lex_bot_tester.aws.asyncexecutor import AsyncExecutor
+
+
+class AsyncExecutorTests(unittest.TestCase):
+
+    def setUp(self):
+        super(AsyncExecutorTests, self).setUp()
+        self.executor = AsyncExecutor(concurrency=4)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.calls = 0
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super(AsyncExecutorTests, self).tearDown()
+
+    def blocking(self, value):
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.01)
+        with self.lock:
+            self.running -= 1
+        return value
+
+    def test_bounded_concurrency(self):
+        async def main():
+            return await asyncio.gather(*[self.executor.run(self.blocking, i) for i in range(40)])
+
+        self.assertEqual(asyncio.run(main()), list(range(40)))
+        self.assertLessEqual(self.max_running, 4)
+
+    def test_cancel(self):
+        async def main():
+            tasks = [asyncio.ensure_future(self.executor.run(self.blocking, i)) for i in range(40)]
+            await asyncio.sleep(0.005)
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run(main())
+        self.assertLess(self.calls, 40)
+
+    def test_many_loops(self):
+        async def main():
+            return await asyncio.gather(*[self.executor.run(self.blocking, i) for i in range(8)])
+
+        self.assertEqual(asyncio.run(main()), list(range(8)))
+        self.assertEqual(asyncio.run(main()), list(range(8)))
+        self.assertEqual(self.calls, 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
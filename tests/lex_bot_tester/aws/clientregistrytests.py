@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+from unittest import mock
+
+import botocore.session
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry, DEFAULT_MAX_POOL_CONNECTIONS, NO_BOTOCORE_RETRIES
+
+REGION = 'us-east-1'
+
+
+class ClientRegistryTests(unittest.TestCase):
+
+    def setUp(self):
+        super(ClientRegistryTests, self).setUp()
+        ClientRegistry.clear()
+
+    def tearDown(self):
+        ClientRegistry.clear()
+        super(ClientRegistryTests, self).tearDown()
+
+    def test_one_session_per_profile(self):
+        with mock.patch('botocore.session.Session', wraps=botocore.session.Session) as session:
+            ClientRegistry.get_client('lex-runtime', REGION)
+            ClientRegistry.get_client('lex-models', REGION)
+            ClientRegistry.get_client('polly', REGION)
+            self.assertEqual(session.call_args_list, [mock.call(profile=None)])
+
+    def test_clients_reused(self):
+        client = ClientRegistry.get_client('lex-runtime', REGION)
+        self.assertIs(ClientRegistry.get_client('lex-runtime', REGION), client)
+        self.assertIs(ClientRegistry.get_client('lex-runtime', REGION, concurrency=2), client)
+        self.assertIsNot(ClientRegistry.get_client('lex-models', REGION), client)
+        self.assertIsNot(ClientRegistry.get_client('lex-runtime', 'eu-west-1'), client)
+
+    def test_max_pool_connections(self):
+        client = ClientRegistry.get_client('lex-runtime', REGION, concurrency=4)
+        self.assertEqual(client.meta.config.max_pool_connections, DEFAULT_MAX_POOL_CONNECTIONS)
+        bigger = ClientRegistry.get_client('lex-runtime', REGION, concurrency=32)
+        self.assertIsNot(bigger, client)
+        self.assertEqual(bigger.meta.config.max_pool_connections, 32)
+        # a smaller pool keeps the bigger one
+        self.assertIs(ClientRegistry.get_client('lex-runtime', REGION, concurrency=16), bigger)
+
+    def test_no_botocore_retries(self):
+        self.assertEqual(NO_BOTOCORE_RETRIES, frozenset(['lex-runtime', 'lex-models', 'polly']))
+        for service_name in NO_BOTOCORE_RETRIES:
+            client = ClientRegistry.get_client(service_name, REGION)
+            # max_attempts=0, normalized by botocore to one attempt in total
+            self.assertEqual(client.meta.config.retries['total_max_attempts'], 1, service_name)
+        self.assertNotEqual(ClientRegistry.get_client('s3', REGION).meta.config.retries.get('total_max_attempts'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
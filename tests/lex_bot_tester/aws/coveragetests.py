@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import pickle
+import unittest
+
+from lex_bot_tester.aws.alexa.alexaskillmanagementclient import InteractionModel
+from lex_bot_tester.aws.coverage import Coverage, CoverageItem, INTENT, PROMPT, SLOT, TRANSITION, transition
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+
+ORDER_FLOWERS = {
+    'name': 'OrderFlowers',
+    'slots': [
+        {'name': 'FlowerType', 'slotConstraint': 'Required', 'valueElicitationPrompt': {'messages': []}},
+        {'name': 'PickupDate', 'slotConstraint': 'Required', 'valueElicitationPrompt': {'messages': []}},
+        {'name': 'Note', 'slotConstraint': 'Optional'},
+    ],
+    'confirmationPrompt': {'messages': []},
+    'rejectionStatement': {'messages': []},
+    'fulfillmentActivity': {'type': 'ReturnIntent'},
+}
+
+CANCEL = {'name': 'Cancel', 'fulfillmentActivity': {'type': 'CodeHook'}}
+
+
+class FakeSkillManagementClient:
+    def obtain_interaction_model(self):
+        return {'interactionModel': {
+            'languageModel': {'invocationName': 'book my trip', 'intents': [
+                {'name': 'BookMyTripIntent', 'slots': [{'name': 'fromCity', 'type': 'AMAZON.US_CITY'},
+                                                       {'name': 'travelDate', 'type': 'AMAZON.DATE'}]},
+                {'name': 'AMAZON.StopIntent', 'samples': []}]},
+            'dialog': {'intents': [
+                {'name': 'BookMyTripIntent', 'slots': [
+                    {'name': 'fromCity', 'type': 'AMAZON.US_CITY', 'elicitationRequired': True,
+                     'prompts': {'elicitation': 'Elicit.fromCity'}},
+                    {'name': 'travelDate', 'type': 'AMAZON.DATE', 'elicitationRequired': False}]}]},
+            'prompts': []}}
+
+
+def turn(coverage, conversation, intent_name, dialog_state, slots, slot_to_elicit=None, before=(None, None)):
+    coverage.record(Coverage.get_turn_items(intent_name, dialog_state, slots, slot_to_elicit, *before), conversation)
+
+
+class CoverageTests(unittest.TestCase):
+
+    def test_from_intents(self):
+        coverage = Coverage.from_intents('OrderFlowers', [ORDER_FLOWERS, CANCEL])
+        self.assertEqual([str(i) for i in coverage.get_uncovered(TRANSITION)], [
+            'OrderFlowers: Start -> ElicitSlot', 'OrderFlowers: ElicitSlot -> ConfirmIntent',
+            'OrderFlowers: ConfirmIntent -> ReadyForFulfillment', 'OrderFlowers: ElicitSlot -> ElicitSlot',
+            'OrderFlowers: ConfirmIntent -> Failed', 'Cancel: Start -> Fulfilled'])
+        self.assertEqual(coverage.get_uncovered(PROMPT), [CoverageItem(PROMPT, 'OrderFlowers', 'FlowerType'),
+                                                          CoverageItem(PROMPT, 'OrderFlowers', 'PickupDate')])
+        self.assertEqual(coverage.get_ratio(), 0.0)
+
+        turn(coverage, 0, 'OrderFlowers', DialogState.ELICIT_SLOT, {'FlowerType': 'roses', 'PickupDate': None},
+             'PickupDate')
+        turn(coverage, 0, 'OrderFlowers', DialogState.FAILED, {'FlowerType': 'roses', 'PickupDate': None},
+             before=('OrderFlowers', DialogState.ELICIT_SLOT))
+        self.assertEqual(coverage.turns, 2)
+        self.assertEqual(coverage.get_count(CoverageItem(INTENT, 'OrderFlowers', None)), 2)
+        self.assertEqual(coverage.get_covered(SLOT), [CoverageItem(SLOT, 'OrderFlowers', 'FlowerType')])
+        self.assertEqual(coverage.get_covered(PROMPT), [CoverageItem(PROMPT, 'OrderFlowers', 'PickupDate')])
+        self.assertEqual(coverage.get_covered(TRANSITION),
+                         [transition('OrderFlowers', 'Start', DialogState.ELICIT_SLOT)])
+        self.assertEqual(coverage.get_unexpected(),
+                         [transition('OrderFlowers', DialogState.ELICIT_SLOT, DialogState.FAILED)])
+        self.assertIn('not in the model: OrderFlowers: ElicitSlot -> Failed', str(coverage))
+
+        # a new intent starts from the start
+        turn(coverage, 1, 'Cancel', DialogState.FULFILLED, {}, before=('OrderFlowers', DialogState.ELICIT_SLOT))
+        self.assertEqual(coverage.get_count(transition('Cancel', 'Start', DialogState.FULFILLED)), 1)
+
+    def test_select(self):
+        coverage = Coverage.from_intents('OrderFlowers', [ORDER_FLOWERS, CANCEL])
+        for c in (0, 1, 2):
+            turn(coverage, c, 'OrderFlowers', DialogState.ELICIT_SLOT, {'FlowerType': 'roses'}, 'PickupDate')
+        # 1 only repeats 0, 2 is longer than 0 and 3 together
+        turn(coverage, 2, 'OrderFlowers', DialogState.CONFIRM_INTENT, {'FlowerType': 'roses', 'PickupDate': 'today'},
+             before=('OrderFlowers', DialogState.ELICIT_SLOT))
+        turn(coverage, 3, 'OrderFlowers', DialogState.CONFIRM_INTENT, {'FlowerType': 'roses', 'PickupDate': 'today'},
+             before=('OrderFlowers', DialogState.ELICIT_SLOT))
+        turn(coverage, 4, 'Cancel', DialogState.FULFILLED, {})
+        self.assertEqual(coverage.select(), [0, 3, 4])
+        self.assertEqual(Coverage('Empty').select(), [])
+
+    def test_merge_and_pickle(self):
+        coverage = Coverage.from_intents('OrderFlowers', [ORDER_FLOWERS, CANCEL])
+        shard = pickle.loads(pickle.dumps(coverage.empty()))
+        turn(shard, 4, 'Cancel', DialogState.FULFILLED, {})
+        turn(coverage, 0, 'Cancel', DialogState.FULFILLED, {})
+        coverage.merge(shard)
+        self.assertEqual(coverage.turns, 2)
+        self.assertEqual(coverage.get_count(CoverageItem(INTENT, 'Cancel', None)), 2)
+        self.assertEqual(list(coverage.get_conversations()), [0, 4])
+        other = Coverage.from_dict(coverage.to_dict())
+        self.assertEqual(other.get_covered(), coverage.get_covered())
+        self.assertEqual(other.get_uncovered(), coverage.get_uncovered())
+
+    def test_for_interaction_model(self):
+        coverage = Coverage.for_interaction_model('BookMyTripSkill', InteractionModel(FakeSkillManagementClient()))
+        self.assertEqual([str(i) for i in coverage.get_uncovered()], [
+            'BookMyTripIntent', 'BookMyTripIntent.fromCity', 'BookMyTripIntent.travelDate',
+            'BookMyTripIntent.fromCity prompt', 'AMAZON.StopIntent'])
+        self.assertEqual(coverage.get_uncovered(PROMPT), [CoverageItem(PROMPT, 'BookMyTripIntent', 'fromCity')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.cassette import Cassette
+from lex_bot_tester.aws.lex.lexruntimeclient import LexRuntimeClient, DialogState
+
+BOT_NAME = 'OrderFlowers'
+BOT_ALIAS = 'OrderFlowersLatest'
+USER_ID = 'ClientId'
+REGION = 'us-east-1'
+
+
+class CassetteTests(unittest.TestCase):
+
+    def setUp(self):
+        super(CassetteTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cassette.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(CassetteTests, self).tearDown()
+
+    def record(self, responses):
+        lrc = LexRuntimeClient(BOT_NAME, BOT_ALIAS, USER_ID, region_name=REGION,
+                               cassette=Cassette(self.path, Cassette.Mode.RECORD))
+        with Stubber(ClientRegistry.get_client('lex-runtime', REGION)) as stubber:
+            for text, response in responses:
+                stubber.add_response('post_text', response)
+                lrc.post_text(text)
+            stubber.assert_no_pending_responses()
+
+    def test_replay(self):
+        self.record([
+            ('I would like to order some roses', {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT,
+                                                  'slots': {'FlowerType': 'roses'}, 'slotToElicit': 'FlowerColor'}),
+            ('white', {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT,
+                       'slots': {'FlowerType': 'roses', 'FlowerColor': 'white'}, 'slotToElicit': 'PickupDate'}),
+        ])
+        lrc = LexRuntimeClient(BOT_NAME, BOT_ALIAS, USER_ID, cassette=Cassette(self.path))
+        lrc.post_text('I would like to order some roses')
+        self.assertEqual(lrc.get_slot_to_elicit(), 'FlowerColor')
+        lrc.post_text('white')
+        self.assertEqual(lrc.get_slot('FlowerColor'), 'white')
+
+    def test_replay_depends_on_history(self):
+        self.record([('white', {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT})])
+        lrc = LexRuntimeClient(BOT_NAME, BOT_ALIAS, USER_ID, cassette=Cassette(self.path))
+        self.assertEqual(lrc.post_text('white')['dialogState'], DialogState.ELICIT_SLOT)
+        with self.assertRaises(RuntimeError):
+            lrc.post_text('white')
+
+    def test_replay_missing_cassette(self):
+        with self.assertRaises(IOError):
+            Cassette(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
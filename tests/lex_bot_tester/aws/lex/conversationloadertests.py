@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from lex_bot_tester.aws.lex.conversationloader import ConversationLoader
+from lex_bot_tester.aws.lex.lexmodelsclient import LexModelsClient
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+
+EXPORT = {
+    'resource': {
+        'name': 'OrderFlowers',
+        'intents': [
+            {'name': 'OrderFlowers', 'slots': [{'name': 'FlowerType'}, {'name': 'PickupDate'}]},
+            {'name': 'Cancel'},
+        ],
+    }
+}
+
+CONVERSATIONS = [
+    {'intent': 'OrderFlowers', 'tags': ['smoke'], 'turns': [
+        ['I would like to order some roses', 'ElicitSlot', {'FlowerType': 'Roses'}],
+        ['next Sunday', 'ElicitSlot', {'PickupDate': {'regex': r'\d+-\d+-\d+'}}]]},
+    {'intent': 'OrderFlowers', 'turns': [['tulips', 'ElicitSlot', {'FlowerType': 'tulips'}]]},
+    {'intent': 'Cancel', 'tags': ['smoke'], 'turns': [['cancel', 'ReadyForFulfillment', {}]]},
+]
+
+YAML = '''
+intent: Cancel
+tags: [smoke]
+turns:
+  - [cancel, ReadyForFulfillment, {}]
+---
+intent: OrderFlowers
+turns:
+  - [roses, ElicitSlot, {FlowerType: roses}]
+'''
+
+
+class ConversationLoaderTests(unittest.TestCase):
+
+    def setUp(self):
+        super(ConversationLoaderTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        export_path = self.write('OrderFlowers.json', json.dumps(EXPORT))
+        self.lmc = LexModelsClient('OrderFlowers', 'OrderFlowersProd', export_path=export_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(ConversationLoaderTests, self).tearDown()
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def write_jsonl(self, conversations):
+        return self.write('conversations.jsonl', '\n'.join(json.dumps(c) for c in conversations) + '\n')
+
+    def test_load_jsonl(self):
+        loader = ConversationLoader(self.lmc, 'OrderFlowers', 'OrderFlowersProd')
+        conversations = loader.load(self.write_jsonl(CONVERSATIONS))
+        first = next(conversations)
+        self.assertEqual(loader.loaded, 1)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(first[0].receive, {'flower_type': 'roses'})
+        self.assertEqual(first[0].receive.dialog_state, DialogState.ELICIT_SLOT)
+        self.assertRegex('2018-05-06', first[1].receive['pickup_date'])
+        self.assertEqual(len(list(conversations)), 2)
+        self.assertEqual(loader.loaded, 3)
+
+    def test_filter(self):
+        path = self.write_jsonl(CONVERSATIONS)
+        loader = ConversationLoader(self.lmc, 'OrderFlowers', 'OrderFlowersProd', tags=['smoke'])
+        self.assertEqual([c[0].send for c in loader.load(path)], ['I would like to order some roses', 'cancel'])
+        loader = ConversationLoader(self.lmc, 'OrderFlowers', 'OrderFlowersProd', intents=['OrderFlowers'],
+                                    tags=['smoke'])
+        self.assertEqual([c[0].send for c in loader.load(path)], ['I would like to order some roses'])
+        self.assertEqual(loader.skipped, 2)
+
+    def test_load_yaml(self):
+        loader = ConversationLoader(self.lmc, 'OrderFlowers', 'OrderFlowersProd')
+        conversations = list(loader.load(self.write('conversations.yaml', YAML)))
+        self.assertEqual([c[0].receive.intent_name for c in conversations], ['Cancel', 'OrderFlowers'])
+
+    def test_invalid(self):
+        loader = ConversationLoader(self.lmc, 'OrderFlowers', 'OrderFlowersProd')
+        path = self.write_jsonl(CONVERSATIONS[:1] + [{'intent': 'OrderFlowers', 'turns': [['roses', 'ElicitSlot']]}])
+        conversations = loader.load(path)
+        next(conversations)
+        with self.assertRaises(ValueError) as cm:
+            next(conversations)
+        self.assertIn('conversations.jsonl:2', str(cm.exception))
+
+    def test_malformed_line(self):
+        loader = ConversationLoader(self.lmc, 'OrderFlowers', 'OrderFlowersProd')
+        path = self.write_jsonl(CONVERSATIONS[:1])
+        with open(path, 'a') as f:
+            f.write('{"intent": "OrderFlowers", "turns": [\n')
+        conversations = loader.load(path)
+        next(conversations)
+        with self.assertRaises(ValueError) as cm:
+            next(conversations)
+        self.assertIn('conversations.jsonl:2: invalid JSON', str(cm.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from botocore.stub import Stubber
+from six import StringIO
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.conversationplan import ConversationPlan
+from lex_bot_tester.aws.lex.lexbottest import LexBotTest
+from lex_bot_tester.aws.lex.lexmodelsclient import LexModelsClient
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+from lex_bot_tester.aws.lex.schemacache import SchemaCache
+
+EXPORT = {
+    'resource': {
+        'name': 'OrderFlowers',
+        'version': '2',
+        'intents': [
+            {'name': 'OrderFlowers', 'version': '3',
+             'slots': [{'name': 'FlowerType'}, {'name': 'PickupDate'}]},
+            {'name': 'Cancel', 'version': '1'},
+        ],
+    }
+}
+
+REGION = 'us-east-1'
+
+RE_DATE = re.compile(r'\d+-\d+-\d+')
+
+ORDER_FLOWERS = [
+    ('I would like to order some roses', DialogState.ELICIT_SLOT, {'FlowerType': 'Roses'}),
+    ('next Sunday', DialogState.FULFILLED, {'flower_type': 'roses', 'pickup_date': RE_DATE}),
+]
+
+
+class ConversationPlanTests(unittest.TestCase):
+
+    def setUp(self):
+        super(ConversationPlanTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.export_path = os.path.join(self.directory, 'OrderFlowers.json')
+        with open(self.export_path, 'w') as f:
+            json.dump(EXPORT, f)
+        self.lmc = LexModelsClient('OrderFlowers', 'OrderFlowersProd', export_path=self.export_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(ConversationPlanTests, self).tearDown()
+
+    def test_create(self):
+        plan = ConversationPlan.create(self.lmc, 'OrderFlowers', 'OrderFlowersProd', {
+            'Cancel': [('cancel', DialogState.READY_FOR_FULFILLMENT, {})],
+            # the same conversation twice, and once more as the first conversation of a list
+            'OrderFlowers': [ORDER_FLOWERS, list(ORDER_FLOWERS), [('roses', DialogState.ELICIT_SLOT, {})]],
+        })
+        self.assertEqual(plan.intents, ['OrderFlowers', 'OrderFlowers', 'Cancel'])
+        self.assertEqual(plan.duplicates, 1)
+        self.assertEqual(plan.get_turns(), 4)
+        self.assertEqual(plan.get_requests(), {'lex-models': 0, 'lex-runtime': 4, 'polly': 0})
+        self.assertEqual(plan.get_requests(use_tts=True)['polly'], 4)
+        # a checkpoint after every turn
+        self.assertEqual(plan.get_requests(resumes=1, lex_models=3)['lex-runtime'], 8)
+        self.assertEqual(plan.get_requests(resumes=1, lex_models=3)['lex-models'], 3)
+        self.assertEqual(plan.conversations[0][1].receive, {'flower_type': 'roses', 'pickup_date': RE_DATE})
+
+    def test_errors(self):
+        with self.assertRaises(ValueError) as cm:
+            ConversationPlan.create(self.lmc, 'OrderFlowers', 'OrderFlowersProd', {
+                'BookCar': [('book a car', DialogState.ELICIT_SLOT, {})],
+                'OrderFlowers': [
+                    ('roses', DialogState.ELICIT_SLOT),
+                    ('roses', 'Elicit', {'FlowerColor': 'red'}),
+                ],
+            })
+        message = str(cm.exception)
+        self.assertIn('BookCar: not an intent of OrderFlowers', message)
+        self.assertIn('OrderFlowers[0][0]: expected (send, dialog state, slots)', message)
+        self.assertIn("OrderFlowers[0][1]: invalid dialog state 'Elicit'", message)
+        self.assertIn('OrderFlowers[0][1]: invalid slot FlowerColor', message)
+
+    def test_dry_run(self):
+        out = StringIO()
+        with redirect_stdout(out):
+            plan = LexBotTest().conversations_text_helper('OrderFlowersProd', 'OrderFlowers', 'user', {
+                'OrderFlowers': ORDER_FLOWERS}, use_tts=True, export_path=self.export_path, dry_run=True)
+        self.assertEqual(plan.get_turns(), 2)
+        self.assertIn('1 conversations, 2 turns', out.getvalue())
+        self.assertIn('Requests: lex-models=0, lex-runtime=2, polly=2', out.getvalue())
+
+    @mock.patch.dict(os.environ, {'AWS_DEFAULT_REGION': REGION})
+    def test_dry_run_lex_models_requests(self):
+        bot = {'name': 'OrderFlowers', 'checksum': 'c1', 'version': '2',
+               'intents': [{'intentName': 'OrderFlowers', 'intentVersion': '3'},
+                           {'intentName': 'Cancel', 'intentVersion': '1'}]}
+        out = StringIO()
+        with Stubber(ClientRegistry.get_client('lex-models')) as stubber, \
+                mock.patch('lex_bot_tester.aws.lex.lexmodelsclient.SCHEMA_CACHE', SchemaCache()), redirect_stdout(out):
+            stubber.add_response('get_bot', bot, {'name': 'OrderFlowers', 'versionOrAlias': 'OrderFlowersProd'})
+            stubber.add_response('get_intent', {'name': 'OrderFlowers', 'version': '3', 'checksum': 'i3', 'slots': [
+                {'name': n, 'slotConstraint': 'Required'} for n in ('FlowerType', 'PickupDate')]},
+                                 {'name': 'OrderFlowers', 'version': '3'})
+            stubber.add_response('get_intent', {'name': 'Cancel', 'version': '1', 'checksum': 'i1'},
+                                 {'name': 'Cancel', 'version': '1'})
+            LexBotTest().conversations_text_helper('OrderFlowersProd', 'OrderFlowers', 'user', {
+                'OrderFlowers': ORDER_FLOWERS}, dry_run=True)
+            stubber.assert_no_pending_responses()
+        self.assertIn('Requests: lex-models=3, lex-runtime=2, polly=0', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
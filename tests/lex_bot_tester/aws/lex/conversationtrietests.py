@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.conversation import Conversation, ConversationItem
+from lex_bot_tester.aws.lex.conversationtrie import ConversationTrie
+from lex_bot_tester.aws.lex.lexmodelsclient import class_factory
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState, LexRuntimeClient
+
+BOT_NAME = 'OrderFlowers'
+BOT_ALIAS = 'OrderFlowersLatest'
+REGION = 'us-east-1'
+
+OrderFlowersResult = class_factory('OrderFlowersResult', ['flower_type', 'flower_color'])
+
+
+def conversation(*sends):
+    return Conversation(*[ConversationItem(s, OrderFlowersResult(DialogState.ELICIT_SLOT)) for s in sends])
+
+
+class ConversationTrieTests(unittest.TestCase):
+
+    def test_trie(self):
+        trie = ConversationTrie([conversation('roses', 'white', 'yes'), conversation('roses', 'red', 'yes'),
+                                 conversation('roses', 'white', 'no'), conversation('cancel')])
+        self.assertEqual(trie.turns, 10)
+        self.assertEqual(trie.nodes, 7)
+        self.assertEqual(trie.get_saved(), 3)
+        roses = trie.root.children['roses']
+        self.assertEqual(list(roses.items), [0, 1, 2])
+        self.assertEqual(list(roses.children), ['white', 'red'])
+        self.assertEqual(roses.children['white'].conversations, {0, 2})
+        self.assertEqual(trie.root.children['cancel'].conversations, {3})
+
+    def test_snapshot_restore(self):
+        response = {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT, 'slotToElicit': 'FlowerColor',
+                    'slots': {'FlowerType': 'roses'}}
+        session = {'sessionId': 'session', 'sessionAttributes': {},
+                   'dialogAction': {'type': 'ElicitSlot', 'intentName': 'OrderFlowers', 'slotToElicit': 'FlowerColor',
+                                    'slots': {'FlowerType': 'roses'}}}
+        with Stubber(ClientRegistry.get_client('lex-runtime', REGION)) as stubber:
+            stubber.add_response('post_text', response, {'botName': BOT_NAME, 'botAlias': BOT_ALIAS, 'userId': 'u1',
+                                                         'sessionAttributes': {}, 'requestAttributes': {},
+                                                         'inputText': 'roses'})
+            stubber.add_response('get_session', session, {'botName': BOT_NAME, 'botAlias': BOT_ALIAS, 'userId': 'u1'})
+            stubber.add_response('put_session', {}, {
+                'botName': BOT_NAME, 'botAlias': BOT_ALIAS, 'userId': 'u2', 'accept': 'text/plain; charset=utf-8',
+                'dialogAction': {'type': 'ElicitSlot', 'intentName': 'OrderFlowers', 'slotToElicit': 'FlowerColor',
+                                 'slots': {'FlowerType': 'roses'}}})
+            csc = LexRuntimeClient(BOT_NAME, BOT_ALIAS, 'u1', region_name=REGION)
+            csc.post_text('roses')
+            snapshot = csc.snapshot()
+            fork = LexRuntimeClient(BOT_NAME, BOT_ALIAS, 'u2', region_name=REGION)
+            fork.restore(snapshot)
+            stubber.assert_no_pending_responses()
+        self.assertEqual(fork.get_slot_to_elicit(), 'FlowerColor')
+        self.assertEqual(fork.get_slots(), {'FlowerType': 'roses'})
+        self.assertIs(fork.get_turn_result(), csc.get_turn_result())
+        self.assertFalse(hasattr(snapshot, 'response'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.asyncexecutor import AsyncExecutor
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.coverage import Coverage
+from lex_bot_tester.aws.lex.asynclexruntimeclient import AsyncLexRuntimeClient
+from lex_bot_tester.aws.lex.cassette import Cassette
+from lex_bot_tester.aws.lex.conversation import Conversation, ConversationItem
+from lex_bot_tester.aws.lex.lexbottest import LexBotTest
+from lex_bot_tester.aws.lex.lexmodelsclient import class_factory, fingerprint_name
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState, LexRuntimeClient, derive_user_id
+from lex_bot_tester.aws.runhistory import RunHistory
+from lex_bot_tester.util.timing import TIMINGS
+
+BOT_NAME = 'OrderFlowers'
+BOT_ALIAS = 'OrderFlowersLatest'
+USER_ID = 'u1'
+REGION = 'us-east-1'
+
+OrderFlowersResult = class_factory('OrderFlowersResult', ['flower_type', 'flower_color'])
+
+
+def response(dialog_state, **slots):
+    return {'intentName': 'OrderFlowers', 'dialogState': dialog_state, 'slots': slots}
+
+
+def conversation(*items):
+    return Conversation(*[ConversationItem(send, OrderFlowersResult(dialog_state, **slots))
+                          for send, dialog_state, slots in items])
+
+
+def run(body):
+    """
+    Runs the body as a test, so the failures reported as subtests can be inspected.
+    """
+
+    # not at module level, not to be collected
+    class Runner(LexBotTest):
+        def runTest(self):
+            body(self)
+
+    result = unittest.TestResult()
+    Runner('runTest').run(result)
+    return result
+
+
+def failed_subtests(result):
+    return [t.params for t, _ in result.failures + result.errors]
+
+
+@mock.patch.dict(os.environ, {'AWS_DEFAULT_REGION': REGION})
+class LexBotTestRunnerTests(unittest.TestCase):
+
+    def setUp(self):
+        super(LexBotTestRunnerTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(LexBotTestRunnerTests, self).tearDown()
+
+    def record(self, bot_alias, responses):
+        """
+        Records the responses to the inputs, each one after the inputs before it.
+
+        :return: the cassette, replaying them
+        """
+        path = os.path.join(self.directory, 'cassette.jsonl')
+        cassette = Cassette(path, Cassette.Mode.RECORD)
+        for inputs, r in responses:
+            cassette.put(Cassette.key(BOT_NAME, bot_alias, inputs[:-1], inputs[-1]), r)
+        return Cassette(path)
+
+    def test_parallel(self):
+        passes = Conversation(ConversationItem('roses', OrderFlowersResult(DialogState.ELICIT_SLOT,
+                                                                           flower_type='roses')))
+        fails = Conversation(ConversationItem('roses', OrderFlowersResult(DialogState.FULFILLED)))
+        client = ClientRegistry.get_client('lex-runtime', concurrency=2)
+        user_ids = []
+
+        def collect(params, **kwargs):
+            user_ids.append(params['userId'])
+
+        client.meta.events.register('provide-client-params.lex-runtime.PostText', collect)
+        try:
+            with Stubber(client) as stubber:
+                for _ in range(2):
+                    stubber.add_response('post_text', response(DialogState.ELICIT_SLOT, FlowerType='roses'))
+                result = run(lambda t: t.conversations_text(BOT_NAME, BOT_ALIAS, USER_ID, [passes, fails],
+                                                            parallel=True, max_workers=2))
+                stubber.assert_no_pending_responses()
+        finally:
+            client.meta.events.unregister('provide-client-params.lex-runtime.PostText', collect)
+        self.assertEqual(sorted(user_ids), [derive_user_id(USER_ID, 0), derive_user_id(USER_ID, 1)])
+        self.assertEqual(failed_subtests(result), [{'conversation': 1, 'user_id': derive_user_id(USER_ID, 1)}])
+
+    def test_sharded(self):
+        bot_alias = 'OrderFlowersSharded'
+        cassette = self.record(bot_alias, [
+            (['roses'], response(DialogState.ELICIT_SLOT, FlowerType='roses')),
+            (['roses', 'white'], response(DialogState.ELICIT_SLOT, FlowerType='roses', FlowerColor='white')),
+            (['tulips'], response(DialogState.ELICIT_SLOT, FlowerType='tulips')),
+            (['lilies'], response(DialogState.ELICIT_SLOT, FlowerType='lilies')),
+            (['daisies'], response(DialogState.ELICIT_SLOT, FlowerType='daisies')),
+        ])
+        conversations = [
+            conversation(('roses', DialogState.ELICIT_SLOT, {'flower_type': 'roses'}),
+                         ('white', DialogState.ELICIT_SLOT, {'flower_color': 'white'})),
+            # fails, in shard 1
+            conversation(('tulips', DialogState.FULFILLED, {})),
+            # fails, in shard 0
+            conversation(('lilies', DialogState.ELICIT_SLOT, {'flower_type': 'roses'})),
+            conversation(('daisies', DialogState.ELICIT_SLOT, {'flower_type': 'daisies'})),
+            conversation(('roses', DialogState.ELICIT_SLOT, {'flower_type': 'roses'})),
+        ]
+        fingerprints = {fingerprint_name(BOT_NAME, bot_alias, 'OrderFlowers'): '1:a'}
+        history = RunHistory(None, fingerprints)
+        coverage = Coverage(BOT_NAME)
+        turns = TIMINGS.get_merged('lex_bot_test_turn', alias=bot_alias).count
+        result = run(lambda t: t.conversations_text(BOT_NAME, bot_alias, USER_ID, conversations, cassette=cassette,
+                                                    processes=2, coverage=coverage, history=history))
+        # every turn sent once
+        self.assertEqual(TIMINGS.get_merged('lex_bot_test_turn', alias=bot_alias).count - turns, 6)
+        self.assertEqual(failed_subtests(result), [
+            {'conversation': 1, 'shard': 1, 'user_id': derive_user_id(derive_user_id(USER_ID, 'shard1'), 1)},
+            {'conversation': 2, 'shard': 0, 'user_id': derive_user_id(derive_user_id(USER_ID, 'shard0'), 2)}])
+        self.assertEqual([history.get(c.get_key(BOT_NAME, bot_alias))['passed'] for c in conversations],
+                         [True, False, False, True, True])
+        # the same as running them in this process
+        expected = Coverage(BOT_NAME)
+        run(lambda t: t.conversations_text(BOT_NAME, bot_alias, USER_ID, conversations, cassette=cassette,
+                                           parallel=True, coverage=expected))
+        self.assertEqual(coverage.turns, 6)
+        self.assertEqual(dict((i, coverage.get_count(i)) for i in coverage.get_unexpected()),
+                         dict((i, expected.get_count(i)) for i in expected.get_unexpected()))
+        self.assertEqual(dict(coverage.get_conversations()), dict(expected.get_conversations()))
+        self.assertEqual(coverage.select(), expected.select())
+        # keyed by conversation, whatever the order they run in
+        self.assertEqual(set(coverage.get_conversations()), set(c.get_key(BOT_NAME, bot_alias)
+                                                                for c in conversations))
+        reordered = Coverage(BOT_NAME)
+        run(lambda t: t.conversations_text(BOT_NAME, bot_alias, USER_ID, conversations[::-1], cassette=cassette,
+                                           parallel=True, coverage=reordered))
+        self.assertEqual(reordered.select(), coverage.select())
+
+    def test_share_prefixes(self):
+        conversations = [
+            conversation(('roses', DialogState.ELICIT_SLOT, {'flower_type': 'roses'}),
+                         ('white', DialogState.ELICIT_SLOT, {'flower_color': 'white'})),
+            conversation(('roses', DialogState.ELICIT_SLOT, {'flower_type': 'roses'}),
+                         ('red', DialogState.ELICIT_SLOT, {'flower_color': 'red'})),
+            conversation(('lilies', DialogState.ELICIT_SLOT, {'flower_type': 'lilies'}),
+                         ('white', DialogState.ELICIT_SLOT, {})),
+            conversation(('lilies', DialogState.ELICIT_SLOT, {'flower_type': 'lilies'}),
+                         ('red', DialogState.ELICIT_SLOT, {})),
+        ]
+        session = {'sessionId': 'session', 'sessionAttributes': {},
+                   'dialogAction': {'type': 'ElicitSlot', 'intentName': 'OrderFlowers', 'slotToElicit': 'FlowerColor',
+                                    'slots': {'FlowerType': 'roses'}}}
+        client = ClientRegistry.get_client('lex-runtime')
+        calls = []
+
+        def collect(params, model, **kwargs):
+            calls.append((model.name, params.get('inputText'), params['userId']))
+
+        client.meta.events.register('provide-client-params.lex-runtime.*', collect)
+        try:
+            with Stubber(client) as stubber:
+                stubber.add_response('post_text', response(DialogState.ELICIT_SLOT, FlowerType='roses'))
+                stubber.add_response('get_session', session)
+                stubber.add_response('post_text', response(DialogState.ELICIT_SLOT, FlowerType='roses',
+                                                           FlowerColor='white'))
+                # the second branch, in a new session restored from the one after the prefix
+                stubber.add_response('put_session', {}, {
+                    'botName': BOT_NAME, 'botAlias': BOT_ALIAS, 'userId': mock.ANY,
+                    'accept': 'text/plain; charset=utf-8', 'dialogAction': session['dialogAction']})
+                stubber.add_response('post_text', response(DialogState.ELICIT_SLOT, FlowerType='roses',
+                                                           FlowerColor='red'))
+                stubber.add_client_error('post_text', 'BadRequestException', http_status_code=400)
+                test = {}
+
+                def body(t):
+                    test['test'] = t
+                    t.conversations_text(BOT_NAME, BOT_ALIAS, USER_ID, conversations, share_prefixes=True)
+
+                result = run(body)
+                stubber.assert_no_pending_responses()
+        finally:
+            client.meta.events.unregister('provide-client-params.lex-runtime.*', collect)
+        self.assertEqual([c[:2] for c in calls], [('PostText', 'roses'), ('GetSession', None), ('PostText', 'white'),
+                                                  ('PutSession', None), ('PostText', 'red'), ('PostText', 'lilies')])
+        roses, white, red, lilies = calls[0][2], calls[2][2], calls[3][2], calls[5][2]
+        self.assertEqual(calls[1][2], roses)
+        # the first branch goes on in the session of the prefix
+        self.assertEqual(white, roses)
+        self.assertEqual(calls[4][2], red)
+        self.assertEqual(len(set([roses, red, lilies])), 3)
+        self.assertEqual(test['test'].turns_saved, 2)
+        # both conversations under the failed prefix
+        self.assertEqual(failed_subtests(result), [{'conversation': 2, 'user_id': lilies},
+                                                   {'conversation': 3, 'user_id': lilies}])
+
+
+    def test_async(self):
+        passes = Conversation(ConversationItem('roses', OrderFlowersResult(DialogState.ELICIT_SLOT,
+                                                                           flower_type='roses')))
+        fails = Conversation(ConversationItem('roses', OrderFlowersResult(DialogState.FULFILLED)))
+        executor = AsyncExecutor(concurrency=2)
+        client = ClientRegistry.get_client('lex-runtime', concurrency=executor.concurrency)
+        user_ids = []
+
+        def collect(params, **kwargs):
+            user_ids.append(params['userId'])
+
+        client.meta.events.register('provide-client-params.lex-runtime.PostText', collect)
+        try:
+            with Stubber(client) as stubber:
+                for _ in range(2):
+                    stubber.add_response('post_text', response(DialogState.ELICIT_SLOT, FlowerType='roses'))
+                result = run(lambda t: asyncio.run(t.conversations_text_async(BOT_NAME, BOT_ALIAS, USER_ID,
+                                                                              [passes, fails], executor=executor)))
+                stubber.assert_no_pending_responses()
+        finally:
+            client.meta.events.unregister('provide-client-params.lex-runtime.PostText', collect)
+            executor.shutdown()
+        self.assertEqual(sorted(user_ids), [derive_user_id(USER_ID, 0), derive_user_id(USER_ID, 1)])
+        self.assertEqual(failed_subtests(result), [{'conversation': 1, 'user_id': derive_user_id(USER_ID, 1)}])
+
+    def test_async_resumes(self):
+        c = conversation(('roses', DialogState.ELICIT_SLOT, {'flower_type': 'roses'}))
+        executor = AsyncExecutor(concurrency=1)
+        test = {}
+
+        def body(t):
+            test['test'] = t
+            asyncio.run(t.conversations_text_async(BOT_NAME, BOT_ALIAS, USER_ID, [c], executor=executor, resumes=1))
+
+        with Stubber(ClientRegistry.get_client('lex-runtime', concurrency=executor.concurrency)) as stubber:
+            stubber.add_client_error('post_text', 'InternalFailureException', http_status_code=500)
+            # the checkpoint taken before the first turn
+            stubber.add_response('delete_session', {})
+            stubber.add_response('post_text', response(DialogState.ELICIT_SLOT, FlowerType='roses'))
+            result = run(body)
+            stubber.assert_no_pending_responses()
+        executor.shutdown()
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        self.assertEqual(test['test'].retry_stats.errors, {'InternalFailureException': 1})
+
+    def test_async_history(self):
+        bot_alias = 'OrderFlowersAsync'
+        cassette = self.record(bot_alias, [
+            (['roses'], response(DialogState.ELICIT_SLOT, FlowerType='roses')),
+            (['roses', 'white'], response(DialogState.ELICIT_SLOT, FlowerType='roses', FlowerColor='white')),
+            (['tulips'], response(DialogState.ELICIT_SLOT, FlowerType='tulips')),
+            (['lilies'], response(DialogState.ELICIT_SLOT, FlowerType='lilies')),
+        ])
+        conversations = [
+            conversation(('roses', DialogState.ELICIT_SLOT, {'flower_type': 'roses'}),
+                         ('white', DialogState.ELICIT_SLOT, {'flower_color': 'white'})),
+            conversation(('tulips', DialogState.FULFILLED, {})),
+            conversation(('lilies', DialogState.ELICIT_SLOT, {'flower_type': 'lilies'})),
+        ]
+        history = RunHistory(None, {fingerprint_name(BOT_NAME, bot_alias, 'OrderFlowers'): '1:a'})
+        coverage = Coverage(BOT_NAME)
+        result = run(lambda t: asyncio.run(t.conversations_text_async(BOT_NAME, bot_alias, USER_ID, conversations,
+                                                                      cassette=cassette, coverage=coverage,
+                                                                      history=history)))
+        self.assertEqual(failed_subtests(result), [{'conversation': 1, 'user_id': derive_user_id(USER_ID, 1)}])
+        self.assertEqual([history.get(c.get_key(BOT_NAME, bot_alias))['passed'] for c in conversations],
+                         [True, False, True])
+        expected = Coverage(BOT_NAME)
+        run(lambda t: t.conversations_text(BOT_NAME, bot_alias, USER_ID, conversations, cassette=cassette,
+                                           parallel=True, coverage=expected))
+        self.assertEqual(coverage.turns, 4)
+        self.assertEqual(dict(coverage.get_conversations()), dict(expected.get_conversations()))
+        # only the failed one runs again, as the first of the ones selected
+        turns = TIMINGS.get_merged('lex_bot_test_turn', alias=bot_alias).count
+        result = run(lambda t: asyncio.run(t.conversations_text_async(BOT_NAME, bot_alias, USER_ID, conversations,
+                                                                      cassette=cassette, history=history)))
+        self.assertEqual(TIMINGS.get_merged('lex_bot_test_turn', alias=bot_alias).count - turns, 1)
+        self.assertEqual(failed_subtests(result), [{'conversation': 0, 'user_id': derive_user_id(USER_ID, 0)}])
+
+    def test_async_cancel(self):
+        conversations = [conversation(('roses', DialogState.ELICIT_SLOT, {}), ('white', DialogState.ELICIT_SLOT, {}))
+                         for _ in range(3)]
+        started = threading.Event()
+        release = threading.Event()
+        sent = []
+
+        def post_text(client, text, *args):
+            sent.append(text)
+            started.set()
+            release.wait(5)
+            return response(DialogState.ELICIT_SLOT)
+
+        executor = AsyncExecutor(concurrency=2)
+
+        async def main(t):
+            task = asyncio.ensure_future(t.conversations_text_async(BOT_NAME, BOT_ALIAS, USER_ID, conversations,
+                                                                    executor=executor))
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with t.assertRaises(asyncio.CancelledError):
+                await task
+
+        try:
+            with mock.patch.object(LexRuntimeClient, 'post_text', autospec=True, side_effect=post_text):
+                result = run(lambda t: asyncio.run(main(t)))
+                release.set()
+                executor.shutdown()
+        finally:
+            release.set()
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        # the turns in flight finish, no other one is sent
+        self.assertLessEqual(len(sent), 2)
+        self.assertNotIn('white', sent)
+
+    def test_async_client(self):
+        executor = AsyncExecutor(concurrency=1)
+        acsc = AsyncLexRuntimeClient(BOT_NAME, BOT_ALIAS, USER_ID, executor=executor)
+        with Stubber(ClientRegistry.get_client('lex-runtime', concurrency=executor.concurrency)) as stubber:
+            stubber.add_response('post_text', response(DialogState.ELICIT_SLOT, FlowerType='Roses'))
+            asyncio.run(acsc.post_text('roses'))
+            stubber.assert_no_pending_responses()
+        executor.shutdown()
+        # the getters are the ones of the client
+        self.assertEqual(acsc.get_dialog_state(), DialogState.ELICIT_SLOT)
+        self.assertEqual(acsc.get_slot('flower_type'), 'roses')
+        self.assertIs(AsyncLexRuntimeClient.wrap(acsc.client, executor).client, acsc.client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from lex_bot_tester.aws.lex.lexexport import LexExport
+from lex_bot_tester.aws.lex.lexmodelsclient import LexModelsClient
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+
+EXPORT = {
+    'metadata': {'schemaVersion': '1.0', 'importType': 'LEX', 'importFormat': 'JSON'},
+    'resource': {
+        'name': 'OrderFlowers',
+        'version': '2',
+        'intents': [
+            {'name': 'OrderFlowers', 'version': '3', 'sampleUtterances': ['I would like to order some flowers'],
+             'slots': [{'name': 'FlowerType', 'slotConstraint': 'Required', 'slotType': 'FlowerTypes'},
+                       {'name': 'PickupDate', 'slotConstraint': 'Required', 'slotType': 'AMAZON.DATE'}]},
+            {'name': 'Cancel', 'version': '1', 'sampleUtterances': ['Cancel']},
+        ],
+        'slotTypes': [{'name': 'FlowerTypes', 'version': '1', 'enumerationValues': [{'value': 'roses'}]}],
+    }
+}
+
+
+class LexExportTests(unittest.TestCase):
+
+    def setUp(self):
+        super(LexExportTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(LexExportTests, self).tearDown()
+
+    def write_zip(self):
+        path = os.path.join(self.directory, 'OrderFlowers_2_Lex.zip')
+        with zipfile.ZipFile(path, 'w') as z:
+            z.writestr('OrderFlowers_Export.json', json.dumps(EXPORT))
+        return path
+
+    def test_result_classes_from_zip(self):
+        lmc = LexModelsClient('OrderFlowers', 'OrderFlowersProd', export_path=self.write_zip())
+        r = lmc.get_result_class_for_intent('OrderFlowers')(DialogState.ELICIT_SLOT, flower_type='Roses')
+        self.assertEqual(r, {'flower_type': 'roses'})
+        self.assertEqual(r.intent_name, 'OrderFlowers')
+        self.assertEqual(sorted(lmc.get_results('OrderFlowers')), ['CancelResult', 'OrderFlowersResult'])
+        self.assertEqual(lmc.get_intents_for_bot(), ['OrderFlowers', 'Cancel'])
+        # no AWS client was needed
+        self.assertIsNone(lmc._LexModelsClient__client)
+
+    def test_directory(self):
+        self.write_zip()
+        with open(os.path.join(self.directory, 'Greet.json'), 'w') as f:
+            json.dump({'resource': {'name': 'Greet', 'version': '1', 'slots': []}}, f)
+        export = LexExport(self.directory)
+        self.assertEqual(export.get_bot('OrderFlowers')['intents'],
+                         [{'intentName': 'OrderFlowers', 'intentVersion': '3'},
+                          {'intentName': 'Cancel', 'intentVersion': '1'}])
+        self.assertEqual(export.get_intent('Greet')['version'], '1')
+        self.assertIsNone(export.get_bot('Greet'))
+
+    def test_missing_bot(self):
+        with self.assertRaises(ValueError):
+            LexModelsClient('BookTrip', 'BookTripProd', export_path=self.write_zip())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.lexmodelsclient import LexModelsClient
+
+REGION = 'us-east-1'
+
+
+class LexModelsClientPaginationTests(unittest.TestCase):
+
+    def test_iter_bots(self):
+        with Stubber(ClientRegistry.get_client('lex-models', REGION)) as stubber:
+            stubber.add_response('get_bots', {'bots': [{'name': 'Aa'}, {'name': 'Bb'}], 'nextToken': 't1'},
+                                 {'nameContains': 'Order'})
+            stubber.add_response('get_bots', {'bots': [{'name': 'Cc'}]}, {'nameContains': 'Order', 'nextToken': 't1'})
+            lmc = LexModelsClient(region_name=REGION)
+            self.assertEqual([b['name'] for b in lmc.iter_bots('Order')], ['Aa', 'Bb', 'Cc'])
+            stubber.assert_no_pending_responses()
+
+    def test_get_intents_without_prefetch(self):
+        with Stubber(ClientRegistry.get_client('lex-models', REGION)) as stubber:
+            stubber.add_response('get_intents', {'intents': [{'name': 'Aa'}], 'nextToken': 't1'}, {'maxResults': 1})
+            stubber.add_response('get_intents', {'intents': [{'name': 'Bb'}], 'nextToken': 't2'},
+                                 {'maxResults': 1, 'nextToken': 't1'})
+            stubber.add_response('get_intents', {'intents': []}, {'maxResults': 1, 'nextToken': 't2'})
+            lmc = LexModelsClient(region_name=REGION)
+            intents = lmc.iter_intents(max_results=1, prefetch=False)
+            self.assertEqual(next(intents)['name'], 'Aa')
+            # the next page is not requested until it's needed
+            with self.assertRaises(AssertionError):
+                stubber.assert_no_pending_responses()
+            self.assertEqual([i['name'] for i in intents], ['Bb'])
+            stubber.assert_no_pending_responses()
+
+
+if __name__ == '__main__':
+    unittest.main()
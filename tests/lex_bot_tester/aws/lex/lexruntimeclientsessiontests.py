@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import unittest
+from unittest import mock
+
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.conversation import Conversation, ConversationItem
+from lex_bot_tester.aws.lex.lexbottest import LexBotTest
+from lex_bot_tester.aws.lex.lexmodelsclient import class_factory
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState, LexRuntimeClient
+
+BOT_NAME = 'OrderFlowers'
+BOT_ALIAS = 'OrderFlowersLatest'
+REGION = 'us-east-1'
+
+OrderFlowersResult = class_factory('OrderFlowersResult', ['flower_type', 'flower_color'])
+
+SESSION = {'botName': BOT_NAME, 'botAlias': BOT_ALIAS, 'userId': 'u1'}
+
+
+class LexRuntimeClientSessionTests(unittest.TestCase):
+
+    def test_restore_before_first_turn(self):
+        with Stubber(ClientRegistry.get_client('lex-runtime', REGION)) as stubber:
+            stubber.add_client_error('delete_session', 'NotFoundException', http_status_code=404,
+                                     expected_params=SESSION)
+            csc = LexRuntimeClient(BOT_NAME, BOT_ALIAS, 'u1', region_name=REGION)
+            # nothing to get before the first turn
+            snapshot = csc.snapshot()
+            csc.restore(snapshot)
+            stubber.assert_no_pending_responses()
+        self.assertIsNone(csc.get_turn_result())
+
+    @mock.patch.dict(os.environ, {'AWS_DEFAULT_REGION': REGION})
+    def test_resume(self):
+        conversation = Conversation(
+            ConversationItem('roses', OrderFlowersResult(DialogState.ELICIT_SLOT, flower_type='roses')),
+            ConversationItem('white', OrderFlowersResult(DialogState.ELICIT_SLOT, flower_color='white')))
+        elicit_color = {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT,
+                        'slotToElicit': 'FlowerColor', 'slots': {'FlowerType': 'roses'}}
+        dialog_action = {'type': 'ElicitSlot', 'intentName': 'OrderFlowers', 'slotToElicit': 'FlowerColor',
+                         'slots': {'FlowerType': 'roses'}}
+        test = LexBotTest()
+        with Stubber(ClientRegistry.get_client('lex-runtime')) as stubber:
+            stubber.add_response('post_text', elicit_color)
+            stubber.add_response('get_session', {'dialogAction': dialog_action}, SESSION)
+            stubber.add_client_error('post_text', 'ServiceUnavailableException', http_status_code=503)
+            stubber.add_response('put_session', {}, dict(SESSION, dialogAction=dialog_action,
+                                                         accept='text/plain; charset=utf-8'))
+            stubber.add_response('post_text', {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT,
+                                               'slotToElicit': 'PickupDate',
+                                               'slots': {'FlowerType': 'roses', 'FlowerColor': 'white'}})
+            test.conversations_text(BOT_NAME, BOT_ALIAS, 'u1', [conversation], resumes=1)
+            stubber.assert_no_pending_responses()
+        self.assertEqual(test.retry_stats.errors, {'ServiceUnavailableException': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
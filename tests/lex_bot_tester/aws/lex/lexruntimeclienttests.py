@@ -70,7 +70,9 @@ class LexRuntimeClientTests(unittest.TestCase):
         self.assertIsNotNone(self.lrc.post_text(ORDER_SOME_FLOWERS))
         r = self.lrc.get_response()
         self.assertIsNotNone(r)
-        self.assertIsNotNone(r['ResponseMetadata'])
+        self.assertIsNotNone(r['dialogState'])
+        # the metadata is not kept
+        self.assertNotIn('ResponseMetadata', r)
 
     def test_get_session_attributes(self):
         self.assertIsNotNone(self.lrc.post_text(ORDER_SOME_FLOWERS, session_attributes={'sa': 'SA'}))
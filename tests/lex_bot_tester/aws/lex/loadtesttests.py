@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.conversation import Conversation, ConversationItem
+from lex_bot_tester.aws.lex.loadtest import LoadTest, LoadTestReport
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+from lex_bot_tester.aws.lex.resultbase import ResultBase
+from lex_bot_tester.util.timing import Timings, Transport
+
+BOT_NAME = 'OrderFlowers'
+BOT_ALIAS = 'OrderFlowersLatest'
+USER_ID = 'ClientId'
+REGION = 'us-east-1'
+
+
+class LoadTestTests(unittest.TestCase):
+
+    def test_report(self):
+        report = LoadTestReport()
+        report.start = 0.0
+        report.end = 2.0
+        for i in range(4):
+            report.add_turn(0, 'OrderFlowers', DialogState.ELICIT_SLOT, 0.1 * (i + 1))
+        report.add_turn(1, 'OrderFlowers', DialogState.FULFILLED, 0.5, 'ThrottlingException')
+        self.assertEqual(report.get_turns(), 5)
+        self.assertAlmostEqual(report.get_throughput(), 2.5)
+        self.assertAlmostEqual(report.by_turn[0].get_max(), 0.4)
+        self.assertEqual(report.by_intent['OrderFlowers'].count, 5)
+        self.assertEqual(report.get_error_rates(), {DialogState.ELICIT_SLOT: 0.0, DialogState.FULFILLED: 1.0})
+        self.assertIn('ThrottlingException', str(report))
+
+    def test_run(self):
+        conversation = Conversation(
+            ConversationItem('I would like to order some roses',
+                             ResultBase('OrderFlowersResult', 'OrderFlowers', DialogState.ELICIT_SLOT)),
+            ConversationItem('white', ResultBase('OrderFlowersResult', 'OrderFlowers', DialogState.FULFILLED))
+        )
+        timings = Timings()
+        with Stubber(ClientRegistry.get_client('lex-runtime', REGION)) as stubber:
+            stubber.add_response('post_text', {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT})
+            stubber.add_response('post_text', {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT})
+            report = LoadTest(BOT_NAME, BOT_ALIAS, USER_ID, [conversation], users=1, iterations=1,
+                              region_name=REGION, timings=timings).run()
+            stubber.assert_no_pending_responses()
+        self.assertEqual(report.conversations, 1)
+        self.assertEqual(report.get_turns(), 2)
+        self.assertEqual(report.get_error_rates(), {DialogState.ELICIT_SLOT: 0.0, DialogState.FULFILLED: 1.0})
+        self.assertEqual(timings.get_merged('load_test_turn', bot=BOT_NAME).count, 2)
+        self.assertEqual(timings.get_merged('lex_runtime_request', transport=Transport.TEXT).count, 2)
+
+    def test_throttled_not_retried(self):
+        conversation = Conversation(
+            ConversationItem('I would like to order some roses',
+                             ResultBase('OrderFlowersResult', 'OrderFlowers', DialogState.ELICIT_SLOT)))
+        with Stubber(ClientRegistry.get_client('lex-runtime', REGION)) as stubber:
+            stubber.add_client_error('post_text', 'ThrottlingException', http_status_code=429)
+            load_test = LoadTest(BOT_NAME, BOT_ALIAS, USER_ID, [conversation], users=1, iterations=1,
+                                 region_name=REGION, timings=Timings())
+            report = load_test.run()
+            stubber.assert_no_pending_responses()
+        self.assertEqual(report.errors, {'ThrottlingException': 1})
+        self.assertEqual(report.get_error_rates(), {DialogState.ELICIT_SLOT: 1.0})
+        self.assertEqual(load_test.retry_policy.stats.retries, 0)
+        self.assertIn('expected state', str(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
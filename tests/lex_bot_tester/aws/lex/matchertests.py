@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import re
+import unittest
+
+from lex_bot_tester.aws.lex.conversation import ConversationItem
+from lex_bot_tester.aws.lex.lexmodelsclient import class_factory
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+
+OrderFlowersResult = class_factory('OrderFlowersResult', ['flower_type', 'flower_color', 'pickup_time'])
+
+
+class MatchPlanTests(unittest.TestCase):
+
+    def test_match(self):
+        ci = ConversationItem('roses', OrderFlowersResult(DialogState.ELICIT_SLOT, flower_type='Roses',
+                                                         pickup_time=re.compile(r'\d\d:\d\d')))
+        plan = ci.get_plan()
+        self.assertIs(plan, ci.get_plan())
+        plan.match('roses', {}, 'OrderFlowers', DialogState.ELICIT_SLOT,
+                   {'FlowerType': 'roses', 'FlowerColor': None, 'PickupTime': '10:00'})
+        with self.assertRaises(AssertionError):
+            plan.match('roses', {}, 'OrderFlowers', DialogState.ELICIT_SLOT,
+                       {'FlowerType': 'roses', 'FlowerColor': None, 'PickupTime': 'ten'})
+        with self.assertRaises(AssertionError):
+            plan.match('roses', {}, 'OrderFlowers', DialogState.FULFILLED,
+                       {'FlowerType': 'roses', 'FlowerColor': None, 'PickupTime': '10:00'})
+        with self.assertRaises(AssertionError):
+            plan.match('roses', {}, 'BookCar', DialogState.ELICIT_SLOT,
+                       {'FlowerType': 'roses', 'FlowerColor': None, 'PickupTime': '10:00'})
+
+    def test_carry_forward(self):
+        ci = ConversationItem('red', OrderFlowersResult(DialogState.ELICIT_SLOT, flower_color='Red'))
+        plan = ci.get_plan()
+        before = {'FlowerType': 'roses', 'FlowerColor': None, 'PickupTime': None}
+        plan.match('red', {}, 'OrderFlowers', DialogState.ELICIT_SLOT,
+                   {'FlowerType': 'roses', 'FlowerColor': 'red', 'PickupTime': None}, DialogState.ELICIT_SLOT, before,
+                   'FlowerColor', 'OrderFlowers')
+        with self.assertRaises(AssertionError):
+            plan.match('red', {}, 'OrderFlowers', DialogState.ELICIT_SLOT,
+                       {'FlowerType': 'tulips', 'FlowerColor': 'red', 'PickupTime': None}, DialogState.ELICIT_SLOT,
+                       before, 'FlowerColor', 'OrderFlowers')
+        # the expected result is not changed, so it can be matched in other conversations
+        self.assertEqual(ci.receive, {'flower_color': 'red'})
+        plan.match('red', {}, 'OrderFlowers', DialogState.ELICIT_SLOT,
+                   {'FlowerType': 'tulips', 'FlowerColor': 'red', 'PickupTime': None})
+
+    def test_elicited(self):
+        plan = ConversationItem('lilies', OrderFlowersResult(DialogState.ELICIT_SLOT)).get_plan()
+        plan.match('Lilies', {}, 'OrderFlowers', DialogState.ELICIT_SLOT, {'FlowerType': 'lilies'},
+                   DialogState.ELICIT_SLOT, None, 'FlowerType')
+        with self.assertRaises(AssertionError):
+            plan.match('Lilies', {}, 'OrderFlowers', DialogState.ELICIT_SLOT, {'FlowerType': None},
+                       DialogState.ELICIT_SLOT, None, 'FlowerType')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import pickle
+import unittest
+
+from lex_bot_tester.aws.lex.conversation import ConversationItem
+from lex_bot_tester.aws.lex.lexmodelsclient import class_factory
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+from lex_bot_tester.aws.lex.resultbase import ResultBase
+from lex_bot_tester.util.conversion import to_snake_case
+
+
+class ResultBaseTests(unittest.TestCase):
+
+    def test_pickle_dynamic_class(self):
+        r = class_factory('OrderFlowersResult', ['flower_type', 'flower_color'])(DialogState.ELICIT_SLOT,
+                                                                                  flower_type='Roses')
+        other = pickle.loads(pickle.dumps(r))
+        self.assertEqual(type(other).__name__, 'OrderFlowersResult')
+        self.assertIsInstance(other, ResultBase)
+        self.assertEqual(other, {'flower_type': 'roses'})
+        self.assertEqual(other.intent_name, 'OrderFlowers')
+        self.assertEqual(other.dialog_state, DialogState.ELICIT_SLOT)
+        self.assertIs(type(other), type(r))
+
+    def test_pickle_base_class(self):
+        r = ResultBase('OrderFlowers', 'OrderFlowers', DialogState.FULFILLED, flower_type='Roses')
+        other = pickle.loads(pickle.dumps(r))
+        self.assertIs(type(other), ResultBase)
+        self.assertEqual(other, {'flower_type': 'roses'})
+        self.assertEqual(other.dialog_state, DialogState.FULFILLED)
+
+    def test_slots(self):
+        cls = class_factory('OrderFlowersResult', ['flower_type', 'flower_color'], bot_name='OrderFlowers')
+        self.assertIs(cls, class_factory('OrderFlowersResult', ['flower_type', 'flower_color'],
+                                         bot_name='OrderFlowers'))
+        self.assertIsNot(cls, class_factory('OrderFlowersResult', ['flower_type'], bot_name='OrderFlowers'))
+        r = cls(DialogState.ELICIT_SLOT, flower_type='Roses', flower_color=None)
+        self.assertFalse(hasattr(r, '__dict__'))
+        self.assertEqual(r.flower_type, 'Roses')
+        self.assertEqual(r['flower_type'], 'roses')
+        self.assertIsNone(r['flower_color'])
+        self.assertEqual(sorted(r.keys()), ['flower_color', 'flower_type'])
+        r = cls(DialogState.ELICIT_SLOT, flower_type='Roses')
+        self.assertEqual(len(r), 1)
+        self.assertNotIn('flower_color', r)
+        with self.assertRaises(KeyError):
+            r['flower_color']
+        r['flower_color'] = 'Red'
+        self.assertEqual(r, {'flower_type': 'roses', 'flower_color': 'red'})
+        with self.assertRaises(TypeError):
+            cls(DialogState.ELICIT_SLOT, pickup_date='today')
+
+    def test_slot_name_not_identifier(self):
+        cls = class_factory('BookCarResult', [to_snake_case('Pick-Up'), 'driver_age'])
+        r = cls(DialogState.ELICIT_SLOT, **{to_snake_case('Pick-Up'): 'Chicago'})
+        self.assertEqual(r, {to_snake_case('Pick-Up'): 'chicago'})
+        self.assertEqual(pickle.loads(pickle.dumps(r)), r)
+
+    def test_slot_name_clashes_with_mapping(self):
+        cls = class_factory('OrderResult', ['items', 'size'])
+        r = cls(DialogState.ELICIT_SLOT, items='Pizza', size='Large')
+        self.assertEqual(r['items'], 'pizza')
+        self.assertEqual(sorted(r.items()), [('items', 'pizza'), ('size', 'large')])
+        self.assertEqual(r.size, 'Large')
+        plan = ConversationItem('a large pizza', r).get_plan()
+        self.assertEqual(plan.keys, frozenset(['items', 'size']))
+        plan.match('a large pizza', {}, 'Order', DialogState.ELICIT_SLOT, {'Items': 'pizza', 'Size': 'large'})
+        self.assertEqual(pickle.loads(pickle.dumps(r)), r)
+
+
+if __name__ == '__main__':
+    unittest.main()
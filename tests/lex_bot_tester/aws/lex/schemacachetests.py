@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.lexmodelsclient import LexModelsClient
+from lex_bot_tester.aws.lex.schemacache import SchemaCache
+from lex_bot_tester.util.timing import Timings
+
+BOT_NAME = 'OrderFlowers'
+BOT_ALIAS = 'OrderFlowersLatest'
+REGION = 'us-east-1'
+
+
+def bot(checksum, intents):
+    return {'name': BOT_NAME, 'checksum': checksum, 'version': '2',
+            'intents': [{'intentName': n, 'intentVersion': v} for n, v in intents]}
+
+
+def intent(name, version, slots):
+    return {'name': name, 'version': version, 'checksum': name + version, 'slots': [
+        {'name': s, 'slotConstraint': 'Required'} for s in slots]}
+
+
+class SchemaCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        super(SchemaCacheTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(SchemaCacheTests, self).tearDown()
+
+    def load(self, schema_cache, responses):
+        with Stubber(ClientRegistry.get_client('lex-models', REGION)) as stubber:
+            for method, response in responses:
+                stubber.add_response(method, response)
+            lmc = LexModelsClient(BOT_NAME, BOT_ALIAS, region_name=REGION, schema_cache=schema_cache, max_workers=1)
+            stubber.assert_no_pending_responses()
+        return lmc
+
+    def test_revalidates_with_get_bot(self):
+        schema_cache = SchemaCache(self.directory)
+        b = bot('c1', [('OrderFlowers', '3'), ('Cancel', '1')])
+        self.load(schema_cache, [('get_bot', b),
+                                 ('get_intent', intent('OrderFlowers', '3', ['FlowerType', 'PickupDate'])),
+                                 ('get_intent', intent('Cancel', '1', []))])
+        lmc = self.load(schema_cache, [('get_bot', b)])
+        self.assertEqual(lmc.requests, 1)
+        self.assertEqual(lmc.get_result_class_for_intent('OrderFlowers').__name__, 'OrderFlowersResult')
+        self.assertEqual(lmc.get_result_class_for_intent('OrderFlowers')._arg_names, ['flower_type', 'pickup_date'])
+
+    def test_changed_bot_fetches_changed_intents(self):
+        schema_cache = SchemaCache(self.directory)
+        self.load(schema_cache, [('get_bot', bot('c1', [('OrderFlowers', '3'), ('Cancel', '1')])),
+                                 ('get_intent', intent('OrderFlowers', '3', ['FlowerType'])),
+                                 ('get_intent', intent('Cancel', '1', []))])
+        lmc = self.load(schema_cache, [('get_bot', bot('c2', [('OrderFlowers', '4'), ('Cancel', '1')])),
+                                       ('get_intent', intent('OrderFlowers', '4', ['FlowerType', 'FlowerColor']))])
+        self.assertEqual(lmc.get_result_class_for_intent('OrderFlowers')._arg_names, ['flower_type', 'flower_color'])
+
+    def test_persistent(self):
+        b = bot('c1', [('Cancel', '1')])
+        self.load(SchemaCache(self.directory), [('get_bot', b), ('get_intent', intent('Cancel', '1', []))])
+        self.load(SchemaCache(self.directory), [('get_bot', b)])
+
+    def test_latest_not_persistent(self):
+        b = bot('c1', [('Cancel', '$LATEST')])
+        b['version'] = '$LATEST'
+        self.load(SchemaCache(self.directory), [('get_bot', b), ('get_intent', intent('Cancel', '$LATEST', []))])
+        self.assertEqual(os.listdir(self.directory), [])
+        self.load(SchemaCache(self.directory), [('get_bot', b), ('get_intent', intent('Cancel', '$LATEST', []))])
+
+    def test_changed_bot_fetches_latest_intents(self):
+        schema_cache = SchemaCache(self.directory)
+        self.load(schema_cache, [('get_bot', bot('c1', [('OrderFlowers', '$LATEST')])),
+                                 ('get_intent', intent('OrderFlowers', '$LATEST', ['FlowerType']))])
+        changed = intent('OrderFlowers', '$LATEST', ['FlowerType', 'FlowerColor'])
+        lmc = self.load(schema_cache, [('get_bot', bot('c2', [('OrderFlowers', '$LATEST')])), ('get_intent', changed)])
+        self.assertEqual(lmc.get_result_class_for_intent('OrderFlowers')._arg_names, ['flower_type', 'flower_color'])
+        # unchanged, from the cache
+        self.load(schema_cache, [('get_bot', bot('c2', [('OrderFlowers', '$LATEST')]))])
+
+    def test_many_bots_share_intents(self):
+        with Stubber(ClientRegistry.get_client('lex-models', REGION)) as stubber:
+            stubber.add_response('get_bot', bot('c1', [('OrderFlowers', '3'), ('Cancel', '1')]),
+                                 {'name': BOT_NAME, 'versionOrAlias': BOT_ALIAS})
+            stubber.add_response('get_bot', {'name': 'BookTrip', 'checksum': 'c9', 'version': '1',
+                                             'intents': [{'intentName': 'Cancel', 'intentVersion': '1'}]},
+                                 {'name': 'BookTrip', 'versionOrAlias': 'BookTripLatest'})
+            stubber.add_response('get_intent', intent('OrderFlowers', '3', ['FlowerType']),
+                                 {'name': 'OrderFlowers', 'version': '3'})
+            stubber.add_response('get_intent', intent('Cancel', '1', []), {'name': 'Cancel', 'version': '1'})
+            timings = Timings()
+            lmc = LexModelsClient(region_name=REGION, schema_cache=SchemaCache(), max_workers=1, timings=timings)
+            lmc.create_result_classes_for_bots([(BOT_NAME, BOT_ALIAS), ('BookTrip', 'BookTripLatest')])
+            stubber.assert_no_pending_responses()
+        self.assertEqual(sorted(lmc.get_results(BOT_NAME)), ['CancelResult', 'OrderFlowersResult'])
+        self.assertEqual(list(lmc.get_results('BookTrip')), ['CancelResult'])
+        self.assertIsNotNone(lmc.setup_time)
+        self.assertEqual(timings.get_merged('lex_models_request').count, 4)
+        self.assertEqual(timings.get('lex_models_request', bot='BookTrip', alias='BookTripLatest').count, 1)
+        self.assertEqual(timings.get('lex_models_request', intent='Cancel').count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
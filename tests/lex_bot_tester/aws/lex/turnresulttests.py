@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState
+from lex_bot_tester.aws.lex.turnresult import TurnResult
+
+RESPONSE = {
+    'ResponseMetadata': {'HTTPStatusCode': 200},
+    'intentName': 'OrderFlowers',
+    'dialogState': DialogState.ELICIT_SLOT,
+    'message': 'What color would you like?',
+    'slotToElicit': 'FlowerColor',
+    'slots': {'FlowerType': 'Roses', 'FlowerColor': None},
+    'sessionAttributes': {'sa': 'SA'},
+}
+
+
+class TurnResultTests(unittest.TestCase):
+
+    def test_fields(self):
+        tr = TurnResult(RESPONSE)
+        self.assertEqual(tr.intent_name, 'OrderFlowers')
+        self.assertEqual(tr.dialog_state, DialogState.ELICIT_SLOT)
+        self.assertEqual(tr.message, 'What color would you like?')
+        self.assertEqual(tr.slot_to_elicit, 'FlowerColor')
+        self.assertEqual(tr.session_attributes['sa'], 'SA')
+
+    def test_slots_normalized(self):
+        tr = TurnResult(RESPONSE)
+        self.assertEqual(tr.slots, {'FlowerType': 'roses', 'FlowerColor': None})
+        self.assertEqual(RESPONSE['slots']['FlowerType'], 'Roses')
+
+    def test_key_map(self):
+        tr = TurnResult(RESPONSE)
+        self.assertEqual(tr.snake_to_camel['flower_type'], 'FlowerType')
+        self.assertEqual(tr.camel_to_snake['FlowerColor'], 'flower_color')
+        # shared by the results having the same slots
+        self.assertIs(TurnResult(dict(RESPONSE, slots={'FlowerColor': 'red', 'FlowerType': None})).snake_to_camel,
+                      tr.snake_to_camel)
+        self.assertEqual(tr.get_slot('flower_type'), tr.get_slot('FlowerType'))
+        with self.assertRaises(KeyError):
+            tr.get_slot('pickup_date')
+
+    def test_immutable(self):
+        tr = TurnResult(RESPONSE)
+        with self.assertRaises(AttributeError):
+            tr.dialog_state = DialogState.FULFILLED
+        with self.assertRaises(TypeError):
+            tr.slots['FlowerType'] = 'tulips'
+
+    def test_empty_response(self):
+        tr = TurnResult({'intentName': None})
+        self.assertEqual(tr.slots, {})
+        self.assertIsNone(tr.dialog_state)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from lex_bot_tester.aws.polly.audiocache import AudioCache
+
+
+class AudioCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        super(AudioCacheTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.cache = AudioCache(self.directory, max_size=2048)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(AudioCacheTests, self).tearDown()
+
+    def test_key(self):
+        k = AudioCache.key('hello', 'Nicole', 'pcm', '16000')
+        self.assertEqual(k, AudioCache.key('hello', 'Nicole', 'pcm', 16000))
+        self.assertNotEqual(k, AudioCache.key('hello', 'Joanna', 'pcm', '16000'))
+        self.assertNotEqual(k, AudioCache.key('hello', 'Nicole', 'pcm', '8000'))
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get(AudioCache.key('hello', 'Nicole', 'pcm', '16000')))
+
+    def test_put_get(self):
+        k = AudioCache.key('hello', 'Nicole', 'pcm', '16000')
+        self.cache.put(k, b'\x01\x02\x03')
+        audio = self.cache.get(k)
+        self.assertEqual(audio[:], b'\x01\x02\x03')
+        audio.close()
+
+    def test_evict_least_recently_used(self):
+        keys = [AudioCache.key(str(i), 'Nicole', 'pcm', '16000') for i in range(3)]
+        for i, k in enumerate(keys):
+            self.cache.put(k, b'\0' * 600)
+            os.utime(self.cache.get_path(k), (time.time() - 100 + i, time.time() - 100 + i))
+        # keys[0] is now the most recently used
+        self.cache.get(keys[0]).close()
+        self.cache.put(AudioCache.key('3', 'Nicole', 'pcm', '16000'), b'\0' * 600)
+        self.assertLessEqual(self.cache.get_size(), 2048)
+        self.assertTrue(os.path.exists(self.cache.get_path(keys[0])))
+        self.assertFalse(os.path.exists(self.cache.get_path(keys[1])))
+
+    def test_size_tracked(self):
+        keys = [AudioCache.key(str(i), 'Nicole', 'pcm', '16000') for i in range(5)]
+        with mock.patch('os.walk', wraps=os.walk) as walk:
+            self.cache.put(keys[0], b'\0' * 100)
+            self.cache.put(keys[1], b'\0' * 100)
+            # replaced, same size
+            self.cache.put(keys[1], b'\0' * 100)
+            self.assertEqual(walk.call_count, 1)
+            for k in keys[2:]:
+                self.cache.put(k, b'\0' * 800)
+            # evicted once
+            self.assertEqual(walk.call_count, 2)
+        self.assertLessEqual(self.cache.get_size(), 2048)
+        other = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(other.directory, self.directory)
+        other.put(keys[0], b'\0' * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
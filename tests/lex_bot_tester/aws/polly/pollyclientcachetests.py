@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import asyncio
+import io
+import shutil
+import tempfile
+import unittest
+
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.asyncexecutor import AsyncExecutor
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.polly.asyncpollyclient import AsyncPollyClient
+from lex_bot_tester.aws.polly.audiocache import AudioCache, AudioCacheTee
+from lex_bot_tester.aws.polly.pollyclient import PollyClient
+
+REGION = 'us-east-1'
+
+
+def speech(text):
+    return ('audio of ' + text).encode('utf-8')
+
+
+class PollyClientCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        super(PollyClientCacheTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.cache = AudioCache(self.directory)
+        self.stubber = Stubber(ClientRegistry.get_client('polly', REGION))
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+        shutil.rmtree(self.directory)
+        super(PollyClientCacheTests, self).tearDown()
+
+    def expect(self, *texts):
+        for text in texts:
+            data = speech(text)
+            self.stubber.add_response('synthesize_speech', {'AudioStream': StreamingBody(io.BytesIO(data), len(data))},
+                                      {'Text': text, 'OutputFormat': 'pcm', 'VoiceId': 'Nicole',
+                                       'SampleRate': '16000'})
+
+    def key(self, text):
+        return AudioCache.key(text, 'Nicole', 'pcm', '16000')
+
+    def test_presynthesize(self):
+        pc = PollyClient(REGION, audio_cache=self.cache)
+        self.cache.put(self.key('yes'), speech('yes'))
+        self.expect('roses', 'white')
+        report = pc.presynthesize(['roses', 'white', 'roses', 'yes', 'white'], max_workers=1)
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual((report.synthesized, report.cached, report.duplicates), (2, 1, 2))
+        # hits, Polly is not invoked
+        audio = pc.get_speech('roses')
+        self.assertEqual(audio[:], speech('roses'))
+        audio.close()
+        stream = pc.get_speech_stream('white')
+        self.assertEqual(stream[:], speech('white'))
+        stream.close()
+        report = pc.presynthesize(['roses', 'white', 'yes'])
+        self.assertEqual((report.synthesized, report.cached, report.duplicates), (0, 3, 0))
+
+    def test_presynthesize_in_memory(self):
+        pc = PollyClient(REGION)
+        self.expect('roses')
+        report = pc.presynthesize(['roses', 'roses'])
+        self.assertEqual((report.synthesized, report.cached, report.duplicates), (1, 0, 1))
+        self.assertEqual(pc.get_speech_stream('roses'), speech('roses'))
+        self.stubber.assert_no_pending_responses()
+
+    def test_speech_stream_cached_once_read(self):
+        pc = PollyClient(REGION, audio_cache=self.cache)
+        self.expect('roses')
+        stream = pc.get_speech_stream('roses')
+        self.assertIsInstance(stream, AudioCacheTee)
+        self.assertIsNone(self.cache.get(self.key('roses')))
+        data = b''
+        chunk = stream.read(4)
+        while chunk:
+            data += chunk
+            chunk = stream.read(4)
+        stream.close()
+        self.assertEqual(data, speech('roses'))
+        audio = self.cache.get(self.key('roses'))
+        self.assertEqual(audio[:], speech('roses'))
+        audio.close()
+
+    def test_speech_stream_partial_read_not_cached(self):
+        pc = PollyClient(REGION, audio_cache=self.cache)
+        self.expect('roses')
+        stream = pc.get_speech_stream('roses')
+        self.assertEqual(stream.read(4), speech('roses')[:4])
+        stream.close()
+        self.assertIsNone(self.cache.get(self.key('roses')))
+        self.assertEqual(self.cache.get_size(), 0)
+
+    def test_tee(self):
+        tee = AudioCacheTee(io.BytesIO(b'audio'), self.cache.open(self.key('roses')))
+        self.assertEqual(tee.read(), b'audio')
+        # committed on the first read to the end, not on close
+        audio = self.cache.get(self.key('roses'))
+        self.assertEqual(audio[:], b'audio')
+        audio.close()
+        tee.close()
+
+    def test_async_get_speech(self):
+        executor = AsyncExecutor(concurrency=1)
+        apc = AsyncPollyClient(PollyClient(REGION, audio_cache=self.cache), executor)
+        self.expect('roses')
+
+        async def main():
+            return await asyncio.gather(apc.get_speech('roses'), apc.get_speech('roses'))
+
+        first, second = asyncio.run(main())
+        executor.shutdown()
+        # synthesized once, the second one is a hit
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(first, speech('roses'))
+        # from the cache
+        self.assertEqual(second[:], speech('roses'))
+        second.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import itertools
+import pickle
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from lex_bot_tester.aws.retry import RetryPolicy
+
+
+def client_error(code, status):
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'PostText')
+
+
+class Failing(object):
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'OK'
+
+
+class RetryPolicyTests(unittest.TestCase):
+
+    def setUp(self):
+        super(RetryPolicyTests, self).setUp()
+        self.policy = RetryPolicy(base=0.001, cap=0.01)
+
+    def test_retries_throttling(self):
+        f = Failing([client_error('ThrottlingException', 400), client_error('LimitExceededException', 429)])
+        self.assertEqual(self.policy.call(f), 'OK')
+        self.assertEqual(f.calls, 3)
+        self.assertEqual(self.policy.stats.retries, 2)
+        self.assertEqual(self.policy.stats.errors['ThrottlingException'], 1)
+
+    def test_does_not_retry_transient_if_not_idempotent(self):
+        f = Failing([client_error('InternalFailureException', 500)])
+        with self.assertRaises(ClientError):
+            self.policy.call(f)
+        self.assertEqual(f.calls, 1)
+
+    def test_retries_transient_if_idempotent(self):
+        f = Failing([client_error('ServiceFailureException', 500)])
+        self.assertEqual(self.policy.call(f, idempotent=True), 'OK')
+        self.assertEqual(f.calls, 2)
+
+    def test_max_attempts(self):
+        policy = RetryPolicy(max_attempts=3, base=0.001, cap=0.01)
+        f = Failing([client_error('ThrottlingException', 400)] * 5)
+        with self.assertRaises(ClientError):
+            policy.call(f)
+        self.assertEqual(f.calls, 3)
+
+    def test_deadline(self):
+        policy = RetryPolicy(deadline=0.5)
+        policy.get_backoff = lambda attempt: 1.0
+        f = Failing([client_error('ThrottlingException', 400)])
+        with self.assertRaises(ClientError):
+            policy.call(f)
+
+    def test_deadline_ignores_wall_clock(self):
+        f = Failing([client_error('ThrottlingException', 400)])
+        # the wall clock jumping forward an hour while retrying
+        with mock.patch('time.time', side_effect=itertools.count(0, 3600)):
+            self.assertEqual(self.policy.call(f), 'OK')
+        self.assertEqual(f.calls, 2)
+
+    def test_stats_merge(self):
+        self.policy.call(Failing([client_error('ThrottlingException', 400)]))
+        other = pickle.loads(pickle.dumps(self.policy.stats))
+        other.merge(self.policy.stats)
+        self.assertEqual(other.calls, 2)
+        self.assertEqual(other.retries, 2)
+        self.assertEqual(other.errors, {'ThrottlingException': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from botocore.stub import Stubber
+
+from lex_bot_tester.aws.clientregistry import ClientRegistry
+from lex_bot_tester.aws.lex.conversation import Conversation, ConversationItem
+from lex_bot_tester.aws.lex.lexbottest import LexBotTest
+from lex_bot_tester.aws.lex.lexmodelsclient import LexModelsClient, class_factory, fingerprint_name
+from lex_bot_tester.aws.lex.lexruntimeclient import DialogState, derive_user_id
+from lex_bot_tester.aws.runhistory import RunHistory
+
+BOT_NAME = 'OrderFlowers'
+BOT_ALIAS = 'OrderFlowersLatest'
+REGION = 'us-east-1'
+
+OrderFlowersResult = class_factory('OrderFlowersResult', ['flower_type', 'flower_color'])
+CancelResult = class_factory('CancelResult', [])
+
+
+class RunHistoryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_select(self):
+        history = RunHistory(self.path, {'OrderFlowers': '1:a', 'Cancel': '1:b'})
+        self.assertTrue(history.is_selected('c1', ['OrderFlowers']))
+        history.record('c1', ['OrderFlowers'], True)
+        history.record('c2', ['OrderFlowers', 'Cancel'], False)
+        history.record('c3', ['Cancel'], True)
+        history.save()
+
+        history = RunHistory(self.path, {'OrderFlowers': '1:a', 'Cancel': '2:c'})
+        self.assertEqual(history.get('c1'), {'fingerprints': {'OrderFlowers': '1:a'}, 'passed': True})
+        self.assertFalse(history.is_selected('c1', ['OrderFlowers']))
+        # failed the last time
+        self.assertTrue(history.is_selected('c2', ['OrderFlowers', 'Cancel']))
+        # changed
+        self.assertTrue(history.is_selected('c3', ['Cancel']))
+        # never ran
+        self.assertTrue(history.is_selected('c4', ['OrderFlowers']))
+        # no fingerprint
+        self.assertTrue(history.is_selected('c1', ['OrderFlowers', 'Unknown']))
+        self.assertEqual((history.selected, history.skipped), (4, 1))
+
+    def test_merge_and_pickle(self):
+        history = RunHistory(None, {'OrderFlowers': '1:a'})
+        history.record('c1', ['OrderFlowers'], False)
+        shard = pickle.loads(pickle.dumps(history))
+        shard.record('c1', ['OrderFlowers'], True)
+        shard.record('c2', ['OrderFlowers'], True)
+        history.merge(shard)
+        self.assertTrue(history.get('c1')['passed'])
+        self.assertFalse(history.is_selected('c2', ['OrderFlowers']))
+
+    def test_conversation_key(self):
+        def conversation(pattern):
+            return Conversation(ConversationItem('roses', OrderFlowersResult(DialogState.ELICIT_SLOT,
+                                                                             flower_type=re.compile(pattern))),
+                                ConversationItem('cancel', CancelResult(DialogState.FULFILLED)))
+
+        self.assertEqual(conversation('roses').get_key(), conversation('roses').get_key())
+        self.assertNotEqual(conversation('roses').get_key(), conversation('tulips').get_key())
+        self.assertNotEqual(conversation('roses').get_key(BOT_NAME, BOT_ALIAS),
+                            conversation('roses').get_key(BOT_NAME, 'OrderFlowersProd'))
+        self.assertEqual(conversation('roses').get_intent_names(), ['Cancel', 'OrderFlowers'])
+
+    @mock.patch.dict(os.environ, {'AWS_DEFAULT_REGION': REGION})
+    def test_conversations_text(self):
+        passes = Conversation(ConversationItem('roses', OrderFlowersResult(DialogState.ELICIT_SLOT,
+                                                                           flower_type='roses')))
+        fails = Conversation(ConversationItem('tulips', OrderFlowersResult(DialogState.ELICIT_SLOT,
+                                                                           flower_type='tulips')))
+        response = {'intentName': 'OrderFlowers', 'dialogState': DialogState.ELICIT_SLOT,
+                    'slotToElicit': 'FlowerColor', 'slots': {'FlowerType': 'roses'}}
+        for expected in (2, 1):
+            history = RunHistory(self.path, {fingerprint_name(BOT_NAME, BOT_ALIAS, 'OrderFlowers'): '1:a'})
+            test = LexBotTest()
+            with Stubber(ClientRegistry.get_client('lex-runtime')) as stubber:
+                for i in range(expected):
+                    # every conversation in its own session
+                    stubber.add_response('post_text', response, {'botName': BOT_NAME, 'botAlias': BOT_ALIAS,
+                                                                 'userId': derive_user_id('u1', i),
+                                                                 'inputText': mock.ANY, 'requestAttributes': {},
+                                                                 'sessionAttributes': {}})
+                with self.assertRaises(AssertionError):
+                    test.conversations_text(BOT_NAME, BOT_ALIAS, 'u1', [passes, fails], history=history)
+                stubber.assert_no_pending_responses()
+            self.assertEqual((history.selected, history.skipped), (expected, 2 - expected))
+        self.assertFalse(RunHistory(self.path).get(fails.get_key(BOT_NAME, BOT_ALIAS))['passed'])
+
+    def test_intent_fingerprints(self):
+        with mock.patch.object(LexModelsClient, 'get_intents_schemas',
+                               return_value=[{'name': 'OrderFlowers', 'version': '2', 'checksum': 'abc'},
+                                             {'name': 'Cancel', 'slots': []}]):
+            fingerprints = LexModelsClient().get_intent_fingerprints(BOT_NAME, BOT_ALIAS)
+        self.assertEqual(fingerprints[fingerprint_name(BOT_NAME, BOT_ALIAS, 'OrderFlowers')], '2:abc')
+        # no checksum in the export, the digest of the definition
+        cancel = fingerprints[fingerprint_name(BOT_NAME, BOT_ALIAS, 'Cancel')]
+        self.assertRegex(cancel, r'^\$LATEST:[0-9a-f]{40}$')
+
+
+if __name__ == '__main__':
+    unittest.main()
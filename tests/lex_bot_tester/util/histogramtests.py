@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+    Lex Bot Tester
+    Copyright (C) 2017-2018  Diego Torres Milano
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import json
+import random
+import unittest
+
+from lex_bot_tester.util.histogram import Histogram
+from lex_bot_tester.util.timing import Timings, Transport
+
+
+class HistogramTests(unittest.TestCase):
+
+    def test_percentiles(self):
+        h = Histogram()
+        for i in range(1, 1001):
+            h.record(i / 1000.0)
+        self.assertEqual(h.count, 1000)
+        for p, expected in ((50, 0.5), (90, 0.9), (99, 0.99)):
+            self.assertAlmostEqual(h.get_percentile(p), expected, delta=expected * 0.01)
+        self.assertEqual(h.get_percentile(100), 1.0)
+        self.assertEqual(h.get_min(), 0.001)
+        self.assertAlmostEqual(h.get_mean(), 0.5005)
+
+    def test_empty(self):
+        h = Histogram()
+        self.assertIsNone(h.get_percentile(50))
+        self.assertIsNone(h.get_max())
+
+    def test_merge(self):
+        values = [random.expovariate(10) for _ in range(2000)]
+        whole = Histogram()
+        halves = [Histogram(), Histogram()]
+        for i, v in enumerate(values):
+            whole.record(v)
+            halves[i % 2].record(v)
+        merged = halves[0].merge(halves[1])
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+        with self.assertRaises(ValueError):
+            merged.merge(Histogram(3))
+
+    def test_serialization(self):
+        h = Histogram()
+        for v in (0.01, 0.2, 3.5):
+            h.record(v)
+        other = Histogram.from_dict(json.loads(json.dumps(h.to_dict())))
+        self.assertEqual(other.to_dict(), h.to_dict())
+        self.assertEqual(other.get_percentile(99), h.get_percentile(99))
+
+
+class TimingsTests(unittest.TestCase):
+
+    def test_record(self):
+        timings = Timings()
+        timings.record('turn', 0.1, bot='OrderFlowers', intent='OrderFlowers', transport=Transport.TEXT)
+        timings.record('turn', 0.3, bot='OrderFlowers', intent='Cancel', transport=Transport.TEXT)
+        with timings.time('turn', bot='OrderFlowers', transport=Transport.TTS) as tags:
+            tags['intent'] = 'OrderFlowers'
+        self.assertEqual(timings.get('turn', bot='OrderFlowers', intent='Cancel', transport=Transport.TEXT).count, 1)
+        self.assertEqual(timings.get_merged('turn', intent='OrderFlowers').count, 2)
+        self.assertEqual(timings.get_merged('turn').count, 3)
+
+    def test_merge_and_export(self):
+        a = Timings()
+        a.record('turn', 0.1, bot='OrderFlowers')
+        b = Timings.from_dict(json.loads(a.to_json()))
+        b.record('turn', 0.2, bot='OrderFlowers')
+        a.merge(b)
+        self.assertEqual(a.get('turn', bot='OrderFlowers').count, 3)
+        text = a.to_openmetrics()
+        self.assertIn('# TYPE lex_bot_tester_turn_seconds summary', text)
+        self.assertIn('lex_bot_tester_turn_seconds{bot="OrderFlowers",quantile="0.5"}', text)
+        self.assertIn('lex_bot_tester_turn_seconds_count{bot="OrderFlowers"} 3', text)
+        self.assertTrue(text.endswith('# EOF\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()